@@ -0,0 +1,212 @@
+"""
+End-to-end latency benchmark for the EASE API, run against the fake LLM provider.
+
+Drives ``/api/v1/ease`` and each stage endpoint in-process (no network, no
+real provider) at several action counts and concurrency levels, and reports
+p50/p95/p99 latency, throughput and LLM calls per request.  Because the fake
+provider's latency is known, the numbers isolate the pipeline's own overhead
+and the effect of its concurrency.
+
+Usage:
+    python -m benchmarks.ease_latency --latency-ms 200 --concurrency 1,8 --actions 3,6
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+
+ENDPOINTS = ("environment", "actions", "safety", "election", "ease")
+
+
+@dataclass
+class Result:
+    endpoint: str
+    actions: int
+    concurrency: int
+    requests: int
+    errors: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    throughput_rps: float
+    llm_calls_per_request: float
+
+
+def _configure(args: argparse.Namespace) -> None:
+    """Point the app at the fake provider before ``src`` is imported."""
+    state_dir = tempfile.mkdtemp(prefix="ease-bench-")
+    os.environ.update(
+        LLM_PROVIDER="fake",
+        # Every iteration sends the same body: measure each one, not a replay
+        # from the response cache or a coalesced in-flight request.
+        LLM_CACHE_ENABLED="false",
+        COALESCE_ENABLED="false",
+        COALESCE_PATH=os.path.join(state_dir, "coalesce.sqlite3"),
+        LLM_LIMITER_PATH=os.path.join(state_dir, "limits.sqlite3"),
+        JOB_STORE_PATH=os.path.join(state_dir, "jobs.sqlite3"),
+        FAKE_LLM_LATENCY_MS=str(args.latency_ms),
+        FAKE_LLM_LATENCY_STDDEV_MS=str(args.latency_stddev_ms),
+        FAKE_LLM_LATENCY_DISTRIBUTION=args.distribution,
+        FAKE_LLM_FAILURE_RATE=str(args.failure_rate),
+        FAKE_LLM_SEED=str(args.seed),
+    )
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(pct) - 1]
+
+
+async def _payloads(client, actions: int) -> dict[str, dict]:
+    """Build a valid request body for every endpoint via the API itself."""
+    request = {
+        "request": "Decide whether to open-source our core ML model.",
+        "context": {"company_size": 50, "industry": "machine learning"},
+    }
+    environment = (await client.post("/api/v1/environment", json=request)).json()
+    actions_body = {"environment": environment, "min_actions": actions}
+    generated = (await client.post("/api/v1/actions", json=actions_body)).json()["actions"]
+    safety_body = {"actions": generated, "environment": environment}
+    evaluations = (await client.post("/api/v1/safety", json=safety_body)).json()
+    return {
+        "environment": request,
+        "actions": actions_body,
+        "safety": safety_body,
+        "election": {
+            "actions": generated,
+            "evaluations": evaluations,
+            "environment": environment,
+            "exclude_threshold": 0.0,
+        },
+        "ease": {**request, "min_actions": actions, "exclude_threshold": 0.0},
+    }
+
+
+async def _run_scenario(client, endpoint, body, actions, concurrency, requests) -> Result:
+    from src.utils import fake_llm
+
+    latencies: list[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(f"/api/v1/{endpoint}", json=body)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors += 1
+
+    fake_llm.reset_calls()
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    return Result(
+        endpoint=endpoint,
+        actions=actions,
+        concurrency=concurrency,
+        requests=requests,
+        errors=errors,
+        p50_ms=round(_percentile(latencies, 50), 1),
+        p95_ms=round(_percentile(latencies, 95), 1),
+        p99_ms=round(_percentile(latencies, 99), 1),
+        throughput_rps=round(requests / elapsed, 2),
+        llm_calls_per_request=round(sum(fake_llm.calls.values()) / requests, 1),
+    )
+
+
+async def run(args: argparse.Namespace) -> list[Result]:
+    import httpx
+
+    from src.main import app
+
+    results: list[Result] = []
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as client:
+            for actions in args.actions:
+                payloads = await _payloads(client, actions)
+                for endpoint in args.endpoints:
+                    for concurrency in args.concurrency:
+                        result = await _run_scenario(
+                            client,
+                            endpoint,
+                            payloads[endpoint],
+                            actions,
+                            concurrency,
+                            args.requests,
+                        )
+                        results.append(result)
+                        print(_format_row(result), flush=True)
+    return results
+
+
+_COLUMNS = (
+    ("endpoint", 12),
+    ("actions", 8),
+    ("concurrency", 12),
+    ("requests", 9),
+    ("errors", 7),
+    ("p50_ms", 10),
+    ("p95_ms", 10),
+    ("p99_ms", 10),
+    ("throughput_rps", 15),
+    ("llm_calls_per_request", 22),
+)
+
+
+def _format_row(result: Result) -> str:
+    values = asdict(result)
+    return "".join(str(values[name]).ljust(width) for name, width in _COLUMNS)
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--endpoints", type=lambda v: v.split(","), default=list(ENDPOINTS))
+    parser.add_argument("--actions", type=_int_list, default=[3, 6, 10])
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=20, help="Requests per scenario")
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--latency-stddev-ms", type=float, default=50.0)
+    parser.add_argument(
+        "--distribution",
+        choices=("fixed", "uniform", "normal", "lognormal"),
+        default="lognormal",
+    )
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    args = parser.parse_args()
+
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"Unknown endpoint(s): {', '.join(sorted(unknown))}")
+
+    _configure(args)
+    print("".join(name.ljust(width) for name, width in _COLUMNS))
+    results = asyncio.run(run(args))
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump([asdict(r) for r in results], f, indent=2)
+    if any(r.errors for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
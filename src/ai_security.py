@@ -12,7 +12,6 @@ Public API:
     llm_check_injection(text)           - accurate LLM-based injection check
 """
 
-import json
 import re
 import unicodedata
 from dataclasses import dataclass, field
@@ -268,7 +267,7 @@ async def llm_check_injection(text: str) -> InjectionCheckResult:
 
     Sends ``text`` to the configured LLM with
     :data:`PROMPT_INJECTION_DETECTION_PROMPT` as the system instruction
-    and parses the structured JSON response.
+    and validates its schema-constrained JSON response.
 
     This is slower than :func:`check_injection` but understands context,
     making it far less susceptible to false positives and better at catching
@@ -281,18 +280,14 @@ async def llm_check_injection(text: str) -> InjectionCheckResult:
         ``InjectionCheckResult`` populated from the LLM's JSON response.
 
     Raises:
-        json.JSONDecodeError: If the LLM returns malformed JSON.
-        ValueError:            If required fields are missing from the response.
+        ValueError: If the response contains no JSON or required fields are
+            missing (``pydantic.ValidationError`` is a ValueError).
     """
-    from src.utils.call_llm import call_llm  # lazy import to avoid circular deps
+    from src.utils.call_llm import call_llm_structured  # lazy import to avoid circular deps
 
-    response = await call_llm(PROMPT_INJECTION_DETECTION_PROMPT, text)
-    data = json.loads(response)
-
-    return InjectionCheckResult(
-        is_injection=bool(data["is_injection"]),
-        confidence=float(data["confidence"]),
-        attack_types=data.get("attack_types", []),
-        matched_signals=data.get("matched_signals", []),
-        reasoning=data.get("reasoning", ""),
+    return await call_llm_structured(
+        PROMPT_INJECTION_DETECTION_PROMPT,
+        text,
+        InjectionCheckResult,
+        stage="security.injection_check",
     )
@@ -8,6 +8,149 @@ class Settings(BaseSettings):
     llm_provider: str = "anthropic"
     llm_model: str = "claude-sonnet-4-20250514"
     llm_api_key: str = ""
+    # Per-provider keys, e.g. {"openai": "sk-..."}; others fall back to llm_api_key.
+    llm_api_keys: dict[str, str] = {}
+    # Per-stage provider/model, e.g. {"safety.principles": {"provider": "openai",
+    # "model": "gpt-5-mini"}}; see src/utils/routing.py.
+    llm_stage_routes: dict[str, dict[str, str]] = {}
+
+    llm_max_connections: int = 100
+    llm_max_keepalive_connections: int = 20
+    llm_keepalive_expiry: float = 30.0
+    llm_timeout: float = 600.0
+
+    llm_retry_max_attempts: int = 4
+    llm_retry_base_delay: float = 1.0
+    llm_retry_max_delay: float = 30.0
+    llm_retry_deadline_seconds: float = 300.0
+    llm_retry_overrides: dict[str, dict[str, float]] = {}
+
+    # Stage prefixes whose slow calls are hedged with a duplicate request, each
+    # mapped to {} (same route) or a secondary {"provider", "model"}; see
+    # src/utils/hedging.py.
+    llm_hedge_stages: dict[str, dict[str, str]] = {}
+    llm_hedge_quantile: float = 0.95
+    llm_hedge_min_delay_seconds: float = 1.0
+    llm_hedge_min_samples: int = 20
+    llm_hedge_window: int = 200
+    llm_hedge_max_ratio: float = 0.1  # at most this fraction of calls hedged
+
+    # Ordered {"provider", "model"} routes tried after a stage's own route when
+    # its provider fails or its circuit breaker is open; see
+    # src/utils/circuit_breaker.py.
+    llm_failover_chain: list[dict[str, str]] = []
+    llm_breaker_window: int = 20
+    llm_breaker_min_calls: int = 10
+    llm_breaker_error_rate: float = 0.5
+    llm_breaker_slow_call_seconds: float = 60.0
+    llm_breaker_slow_call_rate: float = 0.8
+    llm_breaker_open_seconds: float = 30.0
+    llm_breaker_half_open_probes: int = 1
+
+    llm_max_in_flight: int = 32
+    llm_requests_per_minute: int = 0
+    llm_tokens_per_minute: int = 0
+    llm_provider_limits: dict[str, dict[str, int]] = {}
+    llm_limiter_path: str = ".ease/llm_limits.sqlite3"
+    llm_limiter_poll_seconds: float = 0.05
+    llm_output_tokens_estimate: int = 2048
+
+    # Output token budget per call, overridable per stage (dotted-prefix
+    # lookup).  Truncated responses are retried with twice the budget, up to
+    # llm_max_output_tokens_ceiling.
+    llm_max_output_tokens: int = 4096
+    llm_stage_output_tokens: dict[str, int] = {
+        "environment": 4096,
+        "actions": 8192,
+        "safety.improve": 1024,
+        "safety.stakeholder_impacts": 2048,
+        "safety.principles": 256,
+        "safety.risk_assessment": 1024,
+        "safety.synthesis": 1024,
+        "safety.fast": 3072,
+        "safety.batch": 16384,
+        "election": 2048,
+        "security": 512,
+    }
+    llm_max_output_tokens_ceiling: int = 32768
+    # Added to the budget for OpenAI / Google, whose limits include reasoning tokens.
+    llm_reasoning_tokens_allowance: int = 4096
+
+    # Correction calls (stage "<stage>.repair") for structured responses that
+    # still fail validation after local fixes; 0 disables them.
+    llm_repair_reasks: int = 1
+
+    prompt_encoding: str = "compact"  # pretty, compact, terse
+
+    # USD per million tokens, used for the cost estimates in timings/metrics.
+    llm_pricing: dict[str, dict[str, float]] = {
+        "claude-sonnet-4-20250514": {
+            "input": 3.0, "cached_input": 0.30, "cache_write": 3.75, "output": 15.0,
+        },
+        "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.0},
+        "gpt-5-mini": {"input": 0.25, "cached_input": 0.025, "output": 2.0},
+        "gemini-2.0-flash": {"input": 0.10, "cached_input": 0.025, "output": 0.40},
+    }
+
+    llm_cache_enabled: bool = False
+    llm_cache_max_entries: int = 1024
+    llm_cache_ttl_seconds: float = 3600.0
+    llm_cache_path: str = ""
+    llm_cache_disk_max_entries: int = 100_000
+
+    # Only used when llm_provider == "fake" (offline testing / benchmarks).
+    fake_llm_latency_ms: float = 0.0
+    fake_llm_latency_stddev_ms: float = 0.0
+    fake_llm_latency_distribution: str = "fixed"  # fixed, uniform, normal, lognormal
+    fake_llm_failure_rate: float = 0.0
+    fake_llm_failure_status: int = 529
+    # Fraction of blocking calls answered with locally repairable malformed JSON.
+    fake_llm_malformed_rate: float = 0.0
+    fake_llm_seed: int = 0
+
+    # Assumed LLM call time for a stage before any call has been timed; used
+    # to plan degradations under a request deadline_seconds.
+    expected_llm_call_seconds: float = 10.0
+
+    safety_max_concurrency: int = 6
+    safety_batch_size: int = 8  # actions per call in mode="batched"
+    stream_heartbeat_seconds: float = 15.0
+
+    # Identical in-flight requests share one execution; see
+    # src/utils/single_flight.py.  An empty path coalesces within each worker only.
+    coalesce_enabled: bool = True
+    coalesce_path: str = ".ease/coalesce.sqlite3"
+    coalesce_poll_seconds: float = 0.1
+    coalesce_lease_seconds: float = 30.0
+    # How long a finished result stays readable by the workers waiting on it.
+    coalesce_result_ttl_seconds: float = 5.0
+
+    job_store_path: str = ".ease/jobs.sqlite3"
+    job_max_workers: int = 4
+    job_queue_depth: int = 32
+    job_ttl_seconds: float = 86400.0
+    job_cancel_poll_seconds: float = 1.0
+    # Queued/running jobs whose worker has not renewed them for this long are
+    # marked failed; keep well above job_cancel_poll_seconds.
+    job_lease_seconds: float = 30.0
+
+    # /api/v1/ease/batch: requests per batch, requests run at once, and LLM
+    # calls in flight at once per batch (see src/utils/call_pool.py).
+    ease_batch_max_items: int = 10000
+    ease_batch_concurrency: int = 16
+    ease_batch_llm_concurrency: int = 16
+
+    # Offline mode (python -m src.offline): LLM calls go through a provider
+    # batch API; see src/utils/offline_batch.py.  The "file" backend is a
+    # local stand-in that answers a batch itself after the turnaround (never
+    # when negative, leaving output.jsonl to another process).
+    offline_batch_backend: str = "file"
+    offline_batch_dir: str = ".ease/batches"
+    offline_journal_dir: str = ".ease/offline"
+    offline_collect_seconds: float = 0.5
+    offline_poll_seconds: float = 30.0
+    offline_batch_max_calls: int = 10000
+    offline_file_turnaround_seconds: float = 0.0
 
     default_min_actions: int = 5
     default_safety_threshold: float = 3.0
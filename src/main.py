@@ -3,21 +3,41 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
 from src.config import settings
-from src.routers import environment, actions, safety, election, ease
+from src.routers import environment, actions, safety, election, ease, jobs, metrics
+from src.utils.llm_providers import (
+    SUPPORTED_PROVIDERS,
+    api_key_for,
+    init_clients,
+    close_clients,
+)
+from src.utils.routing import check_routes, configured_providers
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    if not settings.llm_api_key:
-        raise RuntimeError(
-            "LLM_API_KEY is not set. Copy .env.example to .env and fill in your key."
-        )
-    if settings.llm_provider not in ("anthropic", "openai", "google"):
+    if settings.llm_provider not in SUPPORTED_PROVIDERS:
         raise RuntimeError(
-            f"LLM_PROVIDER must be 'anthropic', 'openai', or 'google', "
+            f"LLM_PROVIDER must be 'anthropic', 'openai', 'google', or 'fake', "
             f"got '{settings.llm_provider}'"
         )
-    yield
+    try:
+        check_routes()
+    except ValueError as e:
+        raise RuntimeError(str(e)) from e
+    providers = configured_providers()
+    for provider in providers:
+        if not api_key_for(provider) and provider != "fake":
+            raise RuntimeError(
+                f"No API key for provider '{provider}'. Set LLM_API_KEY (or "
+                f"LLM_API_KEYS) - copy .env.example to .env and fill in your key."
+            )
+    await init_clients(providers)
+    await jobs.start_executor()
+    try:
+        yield
+    finally:
+        await jobs.stop_executor()
+        await close_clients()
 
 
 app = FastAPI(
@@ -31,3 +51,5 @@ app.include_router(actions.router)
 app.include_router(safety.router)
 app.include_router(election.router)
 app.include_router(ease.router)
+app.include_router(jobs.router)
+app.include_router(metrics.router)
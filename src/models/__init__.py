@@ -4,15 +4,22 @@ from src.models.safety import (
     StakeholderImpact,
     SafetyPrinciples,
     RiskAssessment,
+    SafetySynthesis,
     SafetyEvaluation,
 )
-from src.models.election import DecisionMatrix, Election
+from src.models.election import DecisionMatrix, ElectionPlan, Election
+from src.models.jobs import JobStatus, JobSubmitResponse, JobInfo
+from src.models.timings import LLMCallOutcome, LLMCallTiming, StageTiming, PipelineTimings
 from src.models.requests import (
     EnvironmentRequest,
     ActionsRequest,
     ActionsResponse,
+    SafetyMode,
+    Degradation,
+    StageRoute,
     SafetyRequest,
     ElectionRequest,
     EASERequest,
     EASEResponse,
+    EASEBatchResult,
 )
@@ -12,6 +12,17 @@ class DecisionMatrix(BaseModel):
     final_score: float = Field(..., ge=0, le=10)
 
 
+class ElectionPlan(BaseModel):
+    """The LLM-written part of an Election, for the elected action."""
+
+    qualitative_factors: list[str]
+    rejected_alternatives: list[dict[str, str]]
+    implementation_plan: list[str]
+    success_metrics: list[str]
+    review_schedule: str
+    fallback_plan: str
+
+
 class Election(BaseModel):
     elected_action: Action
     decision_matrix: list[DecisionMatrix]
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import Literal, Optional
+
+JobStatus = Literal["queued", "running", "succeeded", "failed", "cancelled"]
+
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: JobStatus
+
+
+class JobInfo(BaseModel):
+    job_id: str
+    status: JobStatus
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
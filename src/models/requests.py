@@ -1,21 +1,63 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import Annotated, Any, Literal, Optional
 
 from src.models.environment import Environment
 from src.models.actions import Action
 from src.models.safety import SafetyEvaluation
 from src.models.election import Election
+from src.models.timings import PipelineTimings
+from src.utils.routing import configured_providers
+
+
+# "thorough": four LLM calls per action; "fast": one combined call per action;
+# "batched": the thorough sub-steps, each run once for a whole batch of actions.
+SafetyMode = Literal["thorough", "fast", "batched"]
+
+# Applied in order as a run's deadline gets tight: skip improving actions,
+# evaluate with the single-call "fast" mode, elect without the LLM plan.
+Degradation = Literal["skip_auto_improve", "fast_safety", "election_without_plan"]
+
+
+class StageRoute(BaseModel):
+    provider: Optional[str] = Field(
+        None,
+        description="One of the providers the server is configured with; "
+        "defaults to its LLM_PROVIDER",
+    )
+    model: str
+
+    @field_validator("provider")
+    @classmethod
+    def _configured(cls, provider: Optional[str]) -> Optional[str]:
+        # Requests may only pick providers the operator set up, with their
+        # own keys and clients.
+        if provider is not None and provider not in configured_providers():
+            raise ValueError(f"provider '{provider}' is not configured on this server")
+        return provider
+
+
+StageRoutes = Annotated[
+    Optional[dict[str, StageRoute]],
+    Field(
+        description="Per-stage model overrides keyed by stage or stage prefix, "
+        "e.g. 'safety.principles' or 'safety'",
+    ),
+]
 
 
 class EnvironmentRequest(BaseModel):
     request: str
     context: Optional[dict] = None
+    no_cache: bool = Field(False, description="Bypass the LLM response cache")
+    routes: StageRoutes = None
 
 
 class ActionsRequest(BaseModel):
     environment: Environment
     min_actions: int = Field(5, ge=3, le=20)
     include_null: bool = True
+    no_cache: bool = Field(False, description="Bypass the LLM response cache")
+    routes: StageRoutes = None
 
 
 class ActionsResponse(BaseModel):
@@ -26,6 +68,14 @@ class SafetyRequest(BaseModel):
     actions: list[Action]
     environment: Environment
     auto_improve: bool = True
+    max_concurrency: Optional[int] = Field(
+        None, ge=1, description="Max actions evaluated at once (defaults to server setting)"
+    )
+    mode: SafetyMode = Field(
+        "thorough", description="Safety evaluation mode: thorough, fast or batched"
+    )
+    no_cache: bool = Field(False, description="Bypass the LLM response cache")
+    routes: StageRoutes = None
 
 
 class ElectionRequest(BaseModel):
@@ -36,6 +86,13 @@ class ElectionRequest(BaseModel):
     exclude_threshold: float = Field(
         3.0, description="Exclude actions rated below this"
     )
+    include_plan: bool = Field(
+        True,
+        description="Have the LLM write the qualitative factors and implementation "
+        "plan; if false, only the decision matrix is used",
+    )
+    no_cache: bool = Field(False, description="Bypass the LLM response cache")
+    routes: StageRoutes = None
 
 
 class EASERequest(BaseModel):
@@ -44,6 +101,20 @@ class EASERequest(BaseModel):
     min_actions: int = 5
     weights: Optional[dict[str, float]] = None
     exclude_threshold: float = 3.0
+    mode: SafetyMode = Field(
+        "thorough", description="Safety evaluation mode: thorough, fast or batched"
+    )
+    no_cache: bool = Field(False, description="Bypass the LLM response cache")
+    routes: StageRoutes = None
+    include_timings: bool = Field(
+        False, description="Return per-stage and per-LLM-call timings, tokens and cost"
+    )
+    deadline_seconds: Optional[float] = Field(
+        None,
+        gt=0,
+        description="Time budget for the whole run; stages are degraded as needed "
+        "to answer within it",
+    )
 
 
 class EASEResponse(BaseModel):
@@ -52,3 +123,17 @@ class EASEResponse(BaseModel):
     evaluations: list[SafetyEvaluation]
     election: Election
     duration_seconds: float
+    timings: Optional[PipelineTimings] = None
+    degradations: list[Degradation] = Field(
+        default_factory=list,
+        description="Quality trade-offs applied to meet deadline_seconds",
+    )
+
+
+class EASEBatchResult(BaseModel):
+    """One NDJSON line of the /ease/batch response."""
+
+    index: int = Field(description="Position of the request in the batch")
+    status_code: int = Field(200, description="HTTP status the request alone would get")
+    response: Optional[EASEResponse] = None
+    error: Optional[Any] = Field(None, description="Error detail of a failed request")
@@ -29,6 +29,16 @@ class RiskAssessment(BaseModel):
     )
 
 
+class SafetySynthesis(BaseModel):
+    """The synthesis step's verdict, combined with the analyses into a SafetyEvaluation."""
+
+    action_id: str
+    improvements: list[str]
+    rating: float = Field(..., ge=0, le=10, description="Overall safety rating 0-10")
+    justification: str
+    remaining_concerns: list[str] = Field(default_factory=list)
+
+
 class SafetyEvaluation(BaseModel):
     action_id: str
     stakeholder_impacts: list[StakeholderImpact]
@@ -0,0 +1,44 @@
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+
+# How an LLM call was answered: by the provider, from the response cache, or
+# by an identical call already in flight in the same call pool.
+LLMCallOutcome = Literal["called", "cache_hit", "deduplicated"]
+
+
+class LLMCallTiming(BaseModel):
+    stage: str = Field(..., description="Pipeline step, e.g. safety.risk_assessment")
+    action_id: Optional[str] = None
+    provider: str
+    model: str
+    started_at: float = Field(..., description="Seconds since the pipeline started")
+    wall_seconds: float
+    time_to_first_token_seconds: Optional[float] = Field(
+        None, description="Only measured for streamed calls; null for the others"
+    )
+    input_tokens: int = 0
+    cached_input_tokens: int = 0
+    output_tokens: int = 0
+    prompt_tokens_saved: int = Field(
+        0, description="Estimated input tokens saved by compact prompt encoding"
+    )
+    estimated_cost_usd: float = 0.0
+    outcome: LLMCallOutcome = "called"
+    cache_hit: bool = False
+
+
+class StageTiming(BaseModel):
+    stage: str
+    started_at: float = Field(..., description="Seconds since the pipeline started")
+    wall_seconds: float
+
+
+class PipelineTimings(BaseModel):
+    stages: list[StageTiming]
+    llm_calls: list[LLMCallTiming]
+    total_llm_calls: int
+    total_input_tokens: int
+    total_cached_input_tokens: int
+    total_output_tokens: int
+    total_prompt_tokens_saved: int
+    total_estimated_cost_usd: float
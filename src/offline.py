@@ -0,0 +1,96 @@
+"""
+Run EASE requests offline, through a provider batch API.
+
+Reads EASE requests (a JSON array, or one request per line for ``.ndjson`` /
+``.jsonl`` files), runs them all in one offline session (see
+:mod:`src.utils.offline_batch`) and writes one ``EASEBatchResult`` line per
+request, in completion order, as ``/api/v1/ease/batch`` does.  Every LLM
+call goes through ``OFFLINE_BATCH_BACKEND``, so a run takes as long as the
+backend's batches do.
+
+Running the command again with the same ``--run-id`` resumes an interrupted
+run from its journal without resubmitting the batches already sent.
+
+Usage:
+    python -m src.offline requests.ndjson results.ndjson --run-id nightly-2026-10-18
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+from src.config import settings
+from src.routers.ease import parse_ndjson, run_ease_item
+from src.utils.llm_providers import close_clients, init_clients
+from src.utils.offline_batch import Journal, OfflineSession, get_backend, use_offline_session
+from src.utils.routing import check_routes, configured_providers
+
+
+def _read_items(path: Path) -> list[Any]:
+    text = path.read_text(encoding="utf-8")
+    if path.suffix in (".ndjson", ".jsonl"):
+        return parse_ndjson(text)
+    items = json.loads(text)
+    if not isinstance(items, list):
+        raise ValueError(f"{path} must hold a JSON array of EASE requests")
+    return items
+
+
+async def run_offline(items: list[Any], output: Path, run_id: str) -> dict[int, int]:
+    """Run ``items`` in the offline session ``run_id``, writing results to ``output``.
+
+    Returns the number of results per status code.
+    """
+    journal = Journal(str(Path(settings.offline_journal_dir) / f"{run_id}.sqlite3"))
+    session = OfflineSession(get_backend(), journal)
+    statuses: dict[int, int] = {}
+
+    async def work() -> None:
+        with use_offline_session(session):
+            tasks = [
+                asyncio.create_task(run_ease_item(index, item))
+                for index, item in enumerate(items)
+            ]
+        try:
+            with open(output, "w", encoding="utf-8") as f:
+                for next_done in asyncio.as_completed(tasks):
+                    result = await next_done
+                    statuses[result.status_code] = statuses.get(result.status_code, 0) + 1
+                    f.write(result.model_dump_json() + "\n")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    await session.run(work())
+    return statuses
+
+
+async def _main(args: argparse.Namespace) -> dict[int, int]:
+    check_routes()
+    await init_clients(configured_providers())
+    try:
+        return await run_offline(_read_items(args.requests), args.output, args.run_id)
+    finally:
+        await close_clients()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("requests", type=Path, help="JSON array or NDJSON file of EASE requests")
+    parser.add_argument("output", type=Path, help="NDJSON file to write the results to")
+    parser.add_argument(
+        "--run-id", required=True, help="Journal name; reuse it to resume an interrupted run"
+    )
+    args = parser.parse_args()
+    # A run can take hours; do not make online workers wait on its requests.
+    settings.coalesce_path = ""
+    statuses = asyncio.run(_main(args))
+    print(json.dumps({"results": statuses}), file=sys.stderr)
+    sys.exit(0 if set(statuses) <= {200} else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,20 @@
-import json
+from typing import Any, AsyncIterator, Optional
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from pydantic import ValidationError
 
-from src.utils.call_llm import call_llm
+from src.utils.call_llm import (
+    is_valid_response,
+    larger_budget,
+    stream_llm,
+    validate_llm_output,
+)
+from src.utils.llm_providers import OutputTruncatedError
+from src.utils.json_stream import iter_json_array
+from src.utils.llm_cache import bypass_cache
+from src.utils.routing import use_routes
+from src.utils.single_flight import single_flight
+from src.utils.prompt_encoding import encode, segment
 from src.models.actions import Action
 from src.models.requests import ActionsRequest, ActionsResponse
 
@@ -187,22 +199,81 @@ def _create_null_action() -> Action:
     )
 
 
+def _all_valid(text: str) -> bool:
+    """Whether every action of a streamed response validates on its own."""
+    return is_valid_response(text, list[Action])
+
+
+async def iter_actions(req: ActionsRequest) -> AsyncIterator[Action]:
+    """Yield each generated action as soon as the LLM has finished writing it.
+
+    The response is streamed and parsed incrementally, so downstream stages
+    can start on the first actions while later ones are still being
+    generated.  Actions that need a re-ask to the model are held back and
+    re-asked once the stream has closed, so the re-ask never waits on the
+    call slot the stream holds.  A truncated response is streamed again
+    with a larger output budget, skipping the actions already yielded.
+    The null action, if requested, is yielded last.
+    """
+    user_prompt = [
+        segment(
+            f"Generate at least {req.min_actions} actions for the following environment:\n\n",
+            encode(req.environment),
+        )
+    ]
+
+    yielded: set[str] = set()
+    budget: Optional[int] = None
+    with bypass_cache(req.no_cache), use_routes(req.routes):
+        while True:
+            chunks = stream_llm(
+                ACTIONS_SYSTEM_PROMPT,
+                user_prompt,
+                stage="actions",
+                max_tokens=budget,
+                cacheable=_all_valid,
+            )
+            invalid: list[Any] = []
+            try:
+                async for item in iter_json_array(chunks):
+                    try:
+                        action = await validate_llm_output(
+                            item, Action, stage="actions", reask=False
+                        )
+                    except ValidationError:
+                        invalid.append(item)
+                        continue
+                    if action.id not in yielded:
+                        yielded.add(action.id)
+                        yield action
+                break
+            except OutputTruncatedError as e:
+                # Stream the list again with room for all of it; the actions
+                # already yielded are skipped by id.
+                budget = larger_budget("actions", e.max_tokens)
+                if budget is None:
+                    raise
+
+        for item in invalid:
+            action = await validate_llm_output(item, Action, stage="actions")
+            if action.id not in yielded:
+                yielded.add(action.id)
+                yield action
+
+    if req.include_null and "A0" not in yielded:
+        yield _create_null_action()
+
+
 @router.post("/actions", response_model=ActionsResponse)
+@single_flight("actions")
 async def generate_actions(req: ActionsRequest) -> ActionsResponse:
     """Generate possible actions to achieve the goal.
 
     Uses LLM to brainstorm diverse approaches.
     Always includes a null action if include_null is True.
+    A response still truncated at the output token ceiling fails with a 502.
     """
-    user_prompt = (
-        f"Generate at least {req.min_actions} actions for the following environment:\n\n"
-        f"{req.environment.model_dump_json(indent=2)}"
-    )
-
-    response = await call_llm(ACTIONS_SYSTEM_PROMPT, user_prompt)
-    actions = [Action.model_validate(a) for a in json.loads(response)]
-
-    if req.include_null and not any(a.id == "A0" for a in actions):
-        actions.append(_create_null_action())
-
-    return ActionsResponse(actions=actions)
+    try:
+        return ActionsResponse(actions=[action async for action in iter_actions(req)])
+    except OutputTruncatedError as e:
+        raise HTTPException(status_code=502, detail=str(e))
@@ -1,62 +1,222 @@
 import asyncio
+import json
 import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Union
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
 
-from src.models import Action, ActionsResponse
+from src.config import settings
+from src.models import Action, ActionsResponse, SafetyEvaluation
 from src.models.requests import (
+    Degradation,
+    EASEBatchResult,
     EASERequest,
     EASEResponse,
     EnvironmentRequest,
     ActionsRequest,
-    SafetyRequest,
     ElectionRequest,
+    SafetyMode,
 )
-from src.routers.environment import analyze_environment
-from src.routers.actions import generate_actions
-from src.routers.safety import evaluate_safety
-from src.routers.election import elect_action
+from src.routers.environment import build_environment
+from src.routers.actions import iter_actions
+from src.routers.safety import improve_and_evaluate, improve_and_evaluate_batch
+from src.routers.election import run_election
+from src.utils.call_pool import CallPool, use_call_pool
+from src.utils.circuit_breaker import CircuitOpenError
+from src.utils.deadline import DeadlineExceededError, deadline, remaining
+from src.utils.llm_providers import OutputTruncatedError
+from src.utils.instrumentation import (
+    expected_call_seconds,
+    record_stage,
+    record_timings,
+    stage_timer,
+)
+from src.utils.concurrency import gather_bounded
+from src.utils.prompt_encoding import encode
+from src.utils.routing import use_routes
+from src.utils.single_flight import single_flight
 
 router = APIRouter(prefix="/api/v1", tags=["ease"])
 
+# Called with (event name, payload) as each pipeline result becomes available.
+EmitFn = Callable[[str, BaseModel], Awaitable[None]]
 
-@router.post("/ease", response_model=EASEResponse)
-async def run_ease_framework(req: EASERequest) -> EASEResponse:
-    """Execute the complete EASE framework pipeline.
+# LLM stages on the critical path of one action's safety evaluation, and the
+# stage improving it first, per mode.
+_SAFETY_STAGES: dict[str, tuple[str, ...]] = {
+    "thorough": ("safety.stakeholder_impacts", "safety.principles", "safety.synthesis"),
+    "fast": ("safety.fast",),
+    "batched": (
+        "safety.batch.stakeholder_impacts",
+        "safety.batch.principles",
+        "safety.batch.synthesis",
+    ),
+}
+_IMPROVE_STAGE = {
+    "thorough": "safety.improve",
+    "fast": "safety.improve",
+    "batched": "safety.batch.improve",
+}
 
-    Runs all four steps in sequence:
-    1. Environment analysis
-    2. Action generation
-    3. Safety evaluation (parallel across actions)
-    4. Election
+
+def _plan_safety(mode: SafetyMode) -> tuple[bool, SafetyMode, list[Degradation]]:
+    """Whether to improve, and the mode to evaluate in, for safety work starting now.
+
+    Without a deadline this is ``(True, mode, [])``.  Otherwise, when the
+    time left (less the expected election call) is too short, improvement
+    is skipped first, then the single-call ``"fast"`` mode is used.
     """
+    left = remaining()
+    if left is None:
+        return True, mode, []
+    left -= expected_call_seconds("election")
+    evaluate = sum(expected_call_seconds(stage) for stage in _SAFETY_STAGES[mode])
+    if left >= expected_call_seconds(_IMPROVE_STAGE[mode]) + evaluate:
+        return True, mode, []
+    if mode == "fast" or left >= evaluate:
+        return False, mode, ["skip_auto_improve"]
+    return False, "fast", ["skip_auto_improve", "fast_safety"]
+
+
+async def _run_pipeline(req: EASERequest, emit: Optional[EmitFn] = None) -> EASEResponse:
+    """Run the four EASE stages, reporting each result through ``emit``.
+
+    ``req.routes`` applies to every stage.  With ``req.include_timings`` the
+    response carries the stage and LLM call timings recorded along the way.
+    ``req.deadline_seconds`` bounds every LLM call of the run; a run that
+    still misses it fails with a 504, one left with no healthy provider
+    (every circuit breaker open) fails with a 503, and one whose LLM output
+    stays truncated at ``LLM_MAX_OUTPUT_TOKENS_CEILING`` fails with a 502.
+    """
+    with (
+        record_timings(req.include_timings) as recorder,
+        use_routes(req.routes),
+        deadline(req.deadline_seconds),
+    ):
+        try:
+            response = await _run_stages(req, emit)
+        except DeadlineExceededError as e:
+            raise HTTPException(
+                status_code=504,
+                detail=f"deadline_seconds={req.deadline_seconds} exceeded: {e}",
+            )
+        except CircuitOpenError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except OutputTruncatedError as e:
+            raise HTTPException(status_code=502, detail=str(e))
+    if recorder is not None:
+        response.timings = recorder.summary()
+    return response
+
+
+async def _run_stages(req: EASERequest, emit: Optional[EmitFn]) -> EASEResponse:
     start = time.time()
+    degradations: list[Degradation] = []
+
+    async def _emit(event: str, payload: BaseModel) -> None:
+        if emit is not None:
+            await emit(event, payload)
+
+    def _degrade(applied: list[Degradation]) -> None:
+        degradations.extend(d for d in applied if d not in degradations)
 
     # Step 1: Environment
-    environment = await analyze_environment(
-        EnvironmentRequest(request=req.request, context=req.context)
-    )
+    with stage_timer("environment"):
+        environment = await build_environment(
+            EnvironmentRequest(
+                request=req.request, context=req.context, no_cache=req.no_cache
+            )
+        )
+    await _emit("environment", environment)
 
-    # Step 2: Actions
-    actions_resp: ActionsResponse = await generate_actions(
-        ActionsRequest(environment=environment, min_actions=req.min_actions)
-    )
+    # Steps 2 + 3: Actions and Safety, pipelined.  Actions are parsed from
+    # the streamed LLM response one by one, and each starts its safety
+    # improvement/evaluation immediately while later actions are generated.
+    # In batched mode safety instead waits for the full list of actions.
+    environment_json = encode(environment)
+    semaphore = asyncio.Semaphore(settings.safety_max_concurrency)
 
-    # Step 3: Safety – evaluate all actions
-    evaluations = await evaluate_safety(
-        SafetyRequest(actions=actions_resp.actions, environment=environment, auto_improve=True)
-    )
+    async def _evaluate(action: Action, mode: SafetyMode) -> SafetyEvaluation:
+        async with semaphore:
+            auto_improve, mode, applied = _plan_safety(mode)
+            _degrade(applied)
+            return await improve_and_evaluate(
+                action,
+                environment_json,
+                auto_improve=auto_improve,
+                no_cache=req.no_cache,
+                mode=mode,
+            )
+
+    actions: list[Action] = []
+    tasks: list[asyncio.Task] = []
+    actions_started = time.perf_counter()
+    safety_started: Optional[float] = None
+    batched = req.mode == "batched"
+    try:
+        async for action in iter_actions(
+            ActionsRequest(
+                environment=environment, min_actions=req.min_actions, no_cache=req.no_cache
+            )
+        ):
+            actions.append(action)
+            if batched:
+                continue
+            if safety_started is None:
+                safety_started = time.perf_counter()
+            tasks.append(asyncio.create_task(_evaluate(action, req.mode)))
+        record_stage("actions", actions_started)
+        actions_resp = ActionsResponse(actions=actions)
+        await _emit("actions", actions_resp)
+
+        if batched:
+            safety_started = time.perf_counter()
+            auto_improve, mode, applied = _plan_safety(req.mode)
+            if mode == "batched":
+                _degrade(applied)
+                evaluations = await improve_and_evaluate_batch(
+                    actions, environment_json, auto_improve, no_cache=req.no_cache
+                )
+            else:
+                # Re-planned per action: the fast mode may leave time to improve.
+                _degrade(["fast_safety"])
+                evaluations = await gather_bounded(
+                    (_evaluate(action, "fast") for action in actions),
+                    settings.safety_max_concurrency,
+                )
+            for evaluation in evaluations:
+                await _emit("evaluation", evaluation)
+        else:
+            for next_done in asyncio.as_completed(tasks):
+                await _emit("evaluation", await next_done)
+            evaluations = [task.result() for task in tasks]
+        record_stage("safety", safety_started or time.perf_counter())
+    finally:
+        for task in tasks:
+            task.cancel()
 
-    # Step 4: Election
-    election = await elect_action(
-        ElectionRequest(
-            actions=actions_resp.actions,
-            evaluations=evaluations,
-            environment=environment,
-            weights=req.weights,
-            exclude_threshold=req.exclude_threshold,
+    # Step 4: Election, from the decision matrix alone if the LLM plan
+    # would not fit in the time left.
+    left = remaining()
+    include_plan = left is None or left >= expected_call_seconds("election")
+    if not include_plan:
+        degradations.append("election_without_plan")
+    with stage_timer("election"):
+        election = await run_election(
+            ElectionRequest(
+                actions=actions_resp.actions,
+                evaluations=evaluations,
+                environment=environment,
+                weights=req.weights,
+                exclude_threshold=req.exclude_threshold,
+                include_plan=include_plan,
+                no_cache=req.no_cache,
+            )
         )
-    )
+    await _emit("election", election)
 
     duration = time.time() - start
 
@@ -66,4 +226,188 @@ async def run_ease_framework(req: EASERequest) -> EASEResponse:
         evaluations=evaluations,
         election=election,
         duration_seconds=round(duration, 2),
+        degradations=degradations,
+    )
+
+
+@router.post("/ease", response_model=EASEResponse)
+@single_flight("ease")
+async def run_ease_framework(req: EASERequest) -> EASEResponse:
+    """Execute the complete EASE framework pipeline.
+
+    Runs all four steps:
+    1. Environment analysis
+    2. Action generation (streamed)
+    3. Safety evaluation (parallel across actions, each starting as soon
+       as its action has been generated)
+    4. Election
+    """
+    return await _run_pipeline(req)
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def _ease_events(req: EASERequest) -> AsyncIterator[str]:
+    """Run the pipeline in the background and relay its results as SSE.
+
+    A comment line is sent every ``settings.stream_heartbeat_seconds`` while
+    waiting so proxies do not close the idle connection.
+    """
+    queue: asyncio.Queue[Optional[str]] = asyncio.Queue()
+
+    async def emit(event: str, payload: BaseModel) -> None:
+        await queue.put(_sse(event, payload.model_dump_json()))
+
+    async def run() -> None:
+        try:
+            response = await _run_pipeline(req, emit)
+            done = {
+                "duration_seconds": response.duration_seconds,
+                "degradations": response.degradations,
+            }
+            await queue.put(_sse("done", json.dumps(done)))
+        except HTTPException as e:
+            await queue.put(
+                _sse("error", json.dumps({"status_code": e.status_code, "detail": e.detail}))
+            )
+        except Exception as e:
+            await queue.put(
+                _sse("error", json.dumps({"status_code": 500, "detail": str(e)}))
+            )
+        finally:
+            await queue.put(None)
+
+    task = asyncio.create_task(run())
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(
+                    queue.get(), timeout=settings.stream_heartbeat_seconds
+                )
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if message is None:
+                break
+            yield message
+    finally:
+        task.cancel()
+
+
+@router.post("/ease/stream")
+async def stream_ease_framework(req: EASERequest) -> StreamingResponse:
+    """Execute the complete EASE pipeline, streaming results as server-sent events.
+
+    Events, in order: ``environment``, ``actions``, one ``evaluation`` per
+    action (in completion order), ``election``, then ``done``.  A failure at
+    any stage ends the stream with an ``error`` event.
+    """
+    return StreamingResponse(
+        _ease_events(req),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
+
+
+@dataclass
+class MalformedLine:
+    """An NDJSON line of a batch that is not valid JSON."""
+
+    error: str
+
+
+def parse_ndjson(data: Union[bytes, str]) -> list[Any]:
+    """Split NDJSON into raw items, one per non-blank line.
+
+    A line that does not parse becomes a :class:`MalformedLine`, so it
+    fails only its own request.
+    """
+    items: list[Any] = []
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        try:
+            items.append(json.loads(line))
+        except ValueError as e:
+            items.append(MalformedLine(f"Invalid JSON line: {e}"))
+    return items
+
+
+def _parse_batch(body: bytes, content_type: str) -> list[Any]:
+    """Split a batch body into raw items: a JSON array, or NDJSON lines."""
+    if "ndjson" in content_type or "jsonl" in content_type:
+        items = parse_ndjson(body)
+    else:
+        try:
+            items = json.loads(body)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid batch body: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Batch body must be a JSON array")
+    if len(items) > settings.ease_batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch has {len(items)} requests; the limit is "
+            f"{settings.ease_batch_max_items}",
+        )
+    return items
+
+
+async def run_ease_item(index: int, item: Any) -> EASEBatchResult:
+    """Run one raw batch item through the pipeline, capturing any error in the result.
+
+    Items are not coalesced with identical requests in flight: they run in
+    their batch's call pool (or offline session), which a request outside
+    the batch must not share.
+    """
+    if isinstance(item, MalformedLine):
+        return EASEBatchResult(index=index, status_code=400, error=item.error)
+    try:
+        req = EASERequest.model_validate(item)
+        response = await _run_pipeline(req)
+    except ValidationError as e:
+        detail = e.errors(include_url=False, include_context=False)
+        return EASEBatchResult(index=index, status_code=422, error=detail)
+    except HTTPException as e:
+        return EASEBatchResult(index=index, status_code=e.status_code, error=e.detail)
+    except Exception as e:
+        return EASEBatchResult(index=index, status_code=500, error=str(e))
+    return EASEBatchResult(index=index, response=response)
+
+
+async def _batch_lines(items: list[Any]) -> AsyncIterator[str]:
+    """Run the batch and yield one NDJSON line per request as each finishes."""
+    pool = CallPool(settings.ease_batch_llm_concurrency)
+    semaphore = asyncio.Semaphore(max(1, settings.ease_batch_concurrency))
+
+    async def run(index: int, item: Any) -> EASEBatchResult:
+        async with semaphore:
+            with use_call_pool(pool):
+                return await run_ease_item(index, item)
+
+    tasks = [asyncio.create_task(run(index, item)) for index, item in enumerate(items)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield (await next_done).model_dump_json() + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/ease/batch")
+async def run_ease_batch(request: Request) -> StreamingResponse:
+    """Execute the EASE pipeline for many requests, streaming results as NDJSON.
+
+    The body is a JSON array of EASE requests, or one request per line with
+    an ``application/x-ndjson`` content type.  Requests run
+    ``settings.ease_batch_concurrency`` at a time, and their LLM calls share
+    one :class:`~src.utils.call_pool.CallPool`: at most
+    ``settings.ease_batch_llm_concurrency`` in flight, identical calls made
+    once.  Each finished request is sent as an :class:`EASEBatchResult`
+    line, in completion order; a failed request gets an error line and does
+    not affect the others.
+    """
+    items = _parse_batch(await request.body(), request.headers.get("content-type", ""))
+    return StreamingResponse(_batch_lines(items), media_type="application/x-ndjson")
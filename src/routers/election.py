@@ -1,12 +1,14 @@
-import json
-
 from fastapi import APIRouter, HTTPException
 
-from src.utils.call_llm import call_llm
+from src.utils.call_llm import call_llm_structured
+from src.utils.llm_cache import bypass_cache
+from src.utils.routing import use_routes
+from src.utils.single_flight import single_flight
+from src.utils.prompt_encoding import encode, segment
 from src.config import settings
 from src.models.actions import Action
 from src.models.safety import SafetyEvaluation
-from src.models.election import DecisionMatrix, Election
+from src.models.election import DecisionMatrix, ElectionPlan, Election
 from src.models.requests import ElectionRequest
 
 router = APIRouter(prefix="/api/v1", tags=["election"])
@@ -135,11 +137,33 @@ def _calculate_scores(
     return matrices
 
 
-@router.post("/election", response_model=Election)
-async def elect_action(req: ElectionRequest) -> Election:
+def _plan_from_scores(
+    decision_matrix: list[DecisionMatrix], best: DecisionMatrix
+) -> ElectionPlan:
+    """The part of an election the LLM would write, from the scores alone."""
+    return ElectionPlan(
+        qualitative_factors=[],
+        rejected_alternatives=[
+            {
+                "action_id": m.action_id,
+                "reason": f"Lower weighted score ({m.final_score} vs {best.final_score})",
+            }
+            for m in decision_matrix
+            if m.action_id != best.action_id
+        ],
+        implementation_plan=[],
+        success_metrics=[],
+        review_schedule="",
+        fallback_plan="",
+    )
+
+
+async def run_election(req: ElectionRequest) -> Election:
     """Elect the best action based on weighted scoring.
 
-    Automatically excludes actions below exclude_threshold.
+    Automatically excludes actions below exclude_threshold.  With
+    ``include_plan=False`` no LLM call is made: the election carries only
+    the decision matrix and the score of each rejected alternative.
     """
     weights = req.weights or settings.default_weights
 
@@ -162,32 +186,49 @@ async def elect_action(req: ElectionRequest) -> Election:
     elected_action = next(a for a, _ in safe_actions if a.id == best.action_id)
 
     # Build context for the LLM
-    matrix_json = json.dumps(
-        [m.model_dump() for m in decision_matrix], indent=2
-    )
     rejected_ids = [m.action_id for m in decision_matrix if m.action_id != best.action_id]
-    rejected_actions_json = json.dumps(
-        [a.model_dump() for a, _ in safe_actions if a.id in rejected_ids], indent=2
-    )
+    rejected_actions = [a for a, _ in safe_actions if a.id in rejected_ids]
+
+    if not req.include_plan:
+        return Election(
+            elected_action=elected_action,
+            decision_matrix=decision_matrix,
+            weights=weights,
+            **_plan_from_scores(decision_matrix, best).model_dump(),
+        )
 
-    user_prompt = (
-        f"Elected action:\n{elected_action.model_dump_json(indent=2)}\n\n"
-        f"Decision matrix:\n{matrix_json}\n\n"
-        f"Rejected actions:\n{rejected_actions_json}\n\n"
-        f"Environment:\n{req.environment.model_dump_json(indent=2)}"
-    )
+    user_prompt = [
+        segment(
+            "Elected action:\n",
+            encode(elected_action),
+            "\n\nDecision matrix:\n",
+            encode(decision_matrix),
+            "\n\nRejected actions:\n",
+            encode(rejected_actions),
+            "\n\nEnvironment:\n",
+            encode(req.environment),
+        )
+    ]
 
-    response = await call_llm(ELECTION_SYSTEM_PROMPT, user_prompt)
-    plan = json.loads(response)
+    with bypass_cache(req.no_cache), use_routes(req.routes):
+        plan = await call_llm_structured(
+            ELECTION_SYSTEM_PROMPT, user_prompt, ElectionPlan, stage="election"
+        )
 
     return Election(
         elected_action=elected_action,
         decision_matrix=decision_matrix,
         weights=weights,
-        qualitative_factors=plan["qualitative_factors"],
-        rejected_alternatives=plan["rejected_alternatives"],
-        implementation_plan=plan["implementation_plan"],
-        success_metrics=plan["success_metrics"],
-        review_schedule=plan["review_schedule"],
-        fallback_plan=plan["fallback_plan"],
+        **plan.model_dump(),
     )
+
+
+@router.post("/election", response_model=Election)
+@single_flight("election")
+async def elect_action(req: ElectionRequest) -> Election:
+    """Elect the best action based on weighted scoring.
+
+    Identical requests in flight share one run of :func:`run_election`,
+    which the full pipeline calls directly.
+    """
+    return await run_election(req)
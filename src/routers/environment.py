@@ -2,7 +2,10 @@ import json
 
 from fastapi import APIRouter
 
-from src.utils.call_llm import call_llm
+from src.utils.call_llm import call_llm_structured
+from src.utils.llm_cache import bypass_cache
+from src.utils.routing import use_routes
+from src.utils.single_flight import single_flight
 from src.models.environment import Environment
 from src.models.requests import EnvironmentRequest
 
@@ -115,8 +118,7 @@ Example — request: "Help me reduce customer churn by 20%", context: {"current_
 Return ONLY the JSON object. No explanation, no markdown fences."""
 
 
-@router.post("/environment", response_model=Environment)
-async def analyze_environment(req: EnvironmentRequest) -> Environment:
+async def build_environment(req: EnvironmentRequest) -> Environment:
     """Analyze the environment and define the goal.
 
     Uses LLM reasoning to parse the request, identify stakeholders,
@@ -127,5 +129,18 @@ async def analyze_environment(req: EnvironmentRequest) -> Environment:
         user_prompt_parts.append(f"Context: {json.dumps(req.context)}")
     user_prompt = "\n".join(user_prompt_parts)
 
-    response = await call_llm(ENVIRONMENT_SYSTEM_PROMPT, user_prompt)
-    return Environment.model_validate_json(response)
+    with bypass_cache(req.no_cache), use_routes(req.routes):
+        return await call_llm_structured(
+            ENVIRONMENT_SYSTEM_PROMPT, user_prompt, Environment, stage="environment"
+        )
+
+
+@router.post("/environment", response_model=Environment)
+@single_flight("environment")
+async def analyze_environment(req: EnvironmentRequest) -> Environment:
+    """Analyze the environment and define the goal.
+
+    Identical requests in flight share one run of :func:`build_environment`,
+    which the full pipeline calls directly.
+    """
+    return await build_environment(req)
@@ -0,0 +1,97 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Response
+
+from src.config import settings
+from src.models.jobs import JobInfo, JobSubmitResponse
+from src.models.requests import EASERequest, EASEResponse
+from src.routers.ease import _run_pipeline
+from src.utils.job_store import JobStore
+from src.utils.jobs import JobExecutor, QueueFullError
+
+router = APIRouter(prefix="/api/v1", tags=["jobs"])
+
+_executor: Optional[JobExecutor] = None
+
+
+async def _run_job(request_json: str) -> str:
+    # Not the /ease endpoint: jobs are not coalesced with HTTP requests.
+    response = await _run_pipeline(EASERequest.model_validate_json(request_json))
+    return response.model_dump_json()
+
+
+async def start_executor() -> None:
+    """Start this worker's job executor (called from the app lifespan)."""
+    global _executor
+    _executor = JobExecutor(
+        store=JobStore(
+            settings.job_store_path, settings.job_ttl_seconds, settings.job_lease_seconds
+        ),
+        run=_run_job,
+        max_workers=settings.job_max_workers,
+        queue_depth=settings.job_queue_depth,
+        cancel_poll_seconds=settings.job_cancel_poll_seconds,
+    )
+    await _executor.start()
+
+
+async def stop_executor() -> None:
+    global _executor
+    if _executor is not None:
+        await _executor.stop()
+        _executor = None
+
+
+def _get_executor() -> JobExecutor:
+    if _executor is None:
+        raise HTTPException(status_code=503, detail="Job executor is not running")
+    return _executor
+
+
+async def _get_job(job_id: str) -> JobInfo:
+    job = await _get_executor().store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id!r} not found")
+    return job
+
+
+@router.post("/ease/jobs", response_model=JobSubmitResponse, status_code=202)
+async def submit_ease_job(req: EASERequest) -> JobSubmitResponse:
+    """Queue a full EASE run and return its job id immediately.
+
+    Returns 429 when this worker's job queue is full.
+    """
+    try:
+        job_id = await _get_executor().submit(req.model_dump_json())
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    return JobSubmitResponse(job_id=job_id, status="queued")
+
+
+@router.get("/ease/jobs/{job_id}", response_model=JobInfo)
+async def get_ease_job(job_id: str) -> JobInfo:
+    """Return the status of a job."""
+    return await _get_job(job_id)
+
+
+@router.get("/ease/jobs/{job_id}/result", response_model=EASEResponse)
+async def get_ease_job_result(job_id: str) -> Response:
+    """Return the EASEResponse of a succeeded job (409 while it is unfinished or failed)."""
+    job = await _get_job(job_id)
+    if job.status != "succeeded":
+        raise HTTPException(
+            status_code=409,
+            detail={"status": job.status, "error": job.error},
+        )
+    result = await _get_executor().store.get_result(job_id)
+    return Response(content=result, media_type="application/json")
+
+
+@router.post("/ease/jobs/{job_id}/cancel", response_model=JobInfo)
+async def cancel_ease_job(job_id: str) -> JobInfo:
+    """Cancel a queued or running job.  Finished jobs are left unchanged."""
+    job = await _get_job(job_id)
+    if not JobStore.is_terminal(job.status):
+        await _get_executor().cancel(job_id)
+        job = await _get_job(job_id)
+    return job
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.utils import metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> str:
+    """Expose this worker's metrics in Prometheus text format."""
+    return metrics.render()
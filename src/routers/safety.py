@@ -1,17 +1,27 @@
-import json
-from typing import List
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional
 
 from fastapi import APIRouter
 
-from src.utils.call_llm import call_llm
+from src.config import settings
+from src.utils.call_llm import PromptSegment, call_llm_structured
+from src.utils.llm_cache import bypass_cache
+from src.utils.concurrency import Step, gather_bounded, run_dag
+from src.utils.prompt_encoding import encode, segment
+from src.utils.routing import use_routes
+from src.utils.single_flight import single_flight
 from src.models.actions import Action
 from src.models.safety import (
     StakeholderImpact,
     SafetyPrinciples,
     RiskAssessment,
+    SafetySynthesis,
     SafetyEvaluation,
 )
-from src.models.requests import SafetyRequest
+from src.models.requests import SafetyMode, SafetyRequest
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1", tags=["safety"])
 
@@ -334,22 +344,127 @@ Example — original action: "Deploy always-on camera monitoring of production f
 Return ONLY the JSON object. No explanation, no markdown fences."""
 
 
+# ---------------------------------------------------------------------------
+# Prompt 6 — Fast (single-call) Safety Evaluation
+# ---------------------------------------------------------------------------
+FAST_SAFETY_EVALUATION_SYSTEM_PROMPT = """\
+You are the Safety Evaluator for the EASE (Environment-Actions-Safety-Election) \
+decision-making framework.
+
+Given an action and its environment, perform a complete safety evaluation in one pass: \
+analyze the impact on every stakeholder, score the action against five safety \
+principles, assess its risks, and synthesize an overall safety rating.
+
+You MUST return a single JSON object (no markdown, no commentary) matching this schema:
+
+{
+  "action_id": "A1",
+  "stakeholder_impacts": [
+    {
+      "stakeholder_name": "Name matching a stakeholder from the environment",
+      "benefits": ["Concrete benefit 1"],
+      "harms": ["Concrete harm 1"],
+      "autonomy_respected": true,
+      "informed_consent": true,
+      "net_impact": 6.5
+    }
+  ],
+  "principles": {
+    "non_maleficence": 8.0,
+    "beneficence": 7.5,
+    "autonomy": 9.0,
+    "justice": 7.0,
+    "transparency": 8.5
+  },
+  "risks": {
+    "safety_risks": ["Physical or health risk description"],
+    "privacy_risks": ["Data or privacy risk description"],
+    "security_risks": ["Security vulnerability description"],
+    "societal_risks": ["Broader societal impact description"],
+    "overall_severity": "low",
+    "severity_score": 9.0
+  },
+  "improvements": ["Concrete improvement 1", "Concrete improvement 2"],
+  "rating": 7.5,
+  "justification": "2-3 sentence explanation of the overall safety rating",
+  "remaining_concerns": ["Unresolved concern 1"]
+}
+
+Rules:
+- "action_id" must match the action's id.
+- "stakeholder_impacts": one object per stakeholder in the environment. Do not skip any. \
+"net_impact" ranges from -10 (devastating harm) to +10 (transformative benefit). \
+"autonomy_respected" is true if the stakeholder retains meaningful choice; \
+"informed_consent" is true if the stakeholder is aware of and has agreed to the effects.
+- "principles": each score is 0-10, where 10 means no harm / transformative good / \
+full consent / perfectly equitable / fully transparent, and 0 the opposite.
+- "risks": list concrete risks per category (empty list [] if none). \
+"overall_severity" must be exactly one of: "low", "medium", "high", "critical". \
+"severity_score" is the INVERSE of risk severity: 10 = negligible, 0 = catastrophic.
+- "rating" is the overall safety rating (0-10), consistent with the analyses above:
+  9-10 = Excellent (minimal harms, strong benefits, full consent)
+  7-8  = Good (net positive, minor concerns addressed)
+  5-6  = Acceptable (benefits roughly equal harms, moderate concerns)
+  3-4  = Concerning (questionable benefit/harm ratio, autonomy compromised)
+  0-2  = Unacceptable (clear harm, rights violated — never elect)
+- "improvements" lists 2-5 concrete, actionable changes drawn from the risks and harms.
+- "justification" must reference the stakeholder impacts, principles, and risks.
+- "remaining_concerns" lists issues improvements cannot resolve; [] if none.
+
+Return ONLY the JSON object. No explanation, no markdown fences."""
+
+
+# ---------------------------------------------------------------------------
+# Batched variants — one call per sub-step for a whole list of actions
+# ---------------------------------------------------------------------------
+_BATCH_INSTRUCTIONS = """
+
+BATCH MODE: You are given SEVERAL actions at once, each identified by its "id". \
+Apply all of the instructions above to each action independently, exactly as if it \
+were the only action. Where prior analyses are provided, they are keyed by action id; \
+use only the ones for the action being analyzed.
+
+Return ONLY a single JSON object mapping every given action id to the result you \
+would have returned for that action alone, for example:
+
+{"A1": <result for A1>, "A2": <result for A2>}
+
+Include every action id exactly once. No explanation, no markdown fences."""
+
+BATCHED_STAKEHOLDER_IMPACT_SYSTEM_PROMPT = STAKEHOLDER_IMPACT_SYSTEM_PROMPT + _BATCH_INSTRUCTIONS
+BATCHED_SAFETY_PRINCIPLES_SYSTEM_PROMPT = SAFETY_PRINCIPLES_SYSTEM_PROMPT + _BATCH_INSTRUCTIONS
+BATCHED_RISK_ASSESSMENT_SYSTEM_PROMPT = RISK_ASSESSMENT_SYSTEM_PROMPT + _BATCH_INSTRUCTIONS
+BATCHED_SAFETY_EVALUATION_SYSTEM_PROMPT = SAFETY_EVALUATION_SYSTEM_PROMPT + _BATCH_INSTRUCTIONS
+BATCHED_SAFETY_IMPROVE_SYSTEM_PROMPT = SAFETY_IMPROVE_SYSTEM_PROMPT + _BATCH_INSTRUCTIONS
+
+
 # ---------------------------------------------------------------------------
 # Internal helpers
 # ---------------------------------------------------------------------------
 
+def _environment_segment(environment_json: str) -> PromptSegment:
+    """Shared, cacheable prompt prefix: the environment every sub-call sees."""
+    return segment("Environment:\n\n", environment_json, "\n\n", cacheable=True)
+
+
 async def _generate_stakeholder_impacts(
     action: Action, environment_json: str
 ) -> list[StakeholderImpact]:
     """LLM call 1: generate stakeholder impact analysis."""
-    user_prompt = (
-        f"Analyze stakeholder impacts for this action:\n\n"
-        f"{action.model_dump_json(indent=2)}\n\n"
-        f"In this environment:\n\n"
-        f"{environment_json}"
+    user_prompt = [
+        _environment_segment(environment_json),
+        segment(
+            "Analyze stakeholder impacts for this action in the environment above:\n\n",
+            encode(action),
+        ),
+    ]
+    return await call_llm_structured(
+        STAKEHOLDER_IMPACT_SYSTEM_PROMPT,
+        user_prompt,
+        list[StakeholderImpact],
+        stage="safety.stakeholder_impacts",
+        action_id=action.id,
     )
-    response = await call_llm(STAKEHOLDER_IMPACT_SYSTEM_PROMPT, user_prompt)
-    return [StakeholderImpact.model_validate(i) for i in json.loads(response)]
 
 
 async def _generate_safety_principles(
@@ -358,84 +473,352 @@ async def _generate_safety_principles(
     stakeholder_impacts: list[StakeholderImpact],
 ) -> SafetyPrinciples:
     """LLM call 2: score action against five safety principles."""
-    impacts_json = json.dumps(
-        [i.model_dump() for i in stakeholder_impacts], indent=2
-    )
-    user_prompt = (
-        f"Score safety principles for this action:\n\n"
-        f"{action.model_dump_json(indent=2)}\n\n"
-        f"In this environment:\n\n"
-        f"{environment_json}\n\n"
-        f"Stakeholder impact analysis:\n\n"
-        f"{impacts_json}"
+    user_prompt = [
+        _environment_segment(environment_json),
+        segment(
+            "Score safety principles for this action in the environment above:\n\n",
+            encode(action),
+            "\n\nStakeholder impact analysis:\n\n",
+            encode(stakeholder_impacts),
+        ),
+    ]
+    return await call_llm_structured(
+        SAFETY_PRINCIPLES_SYSTEM_PROMPT,
+        user_prompt,
+        SafetyPrinciples,
+        stage="safety.principles",
+        action_id=action.id,
     )
-    response = await call_llm(SAFETY_PRINCIPLES_SYSTEM_PROMPT, user_prompt)
-    return SafetyPrinciples.model_validate_json(response)
 
 
 async def _generate_risk_assessment(
     action: Action, environment_json: str
 ) -> RiskAssessment:
     """LLM call 3: identify and score risks."""
-    user_prompt = (
-        f"Assess risks for this action:\n\n"
-        f"{action.model_dump_json(indent=2)}\n\n"
-        f"In this environment:\n\n"
-        f"{environment_json}"
+    user_prompt = [
+        _environment_segment(environment_json),
+        segment(
+            "Assess risks for this action in the environment above:\n\n",
+            encode(action),
+        ),
+    ]
+    return await call_llm_structured(
+        RISK_ASSESSMENT_SYSTEM_PROMPT,
+        user_prompt,
+        RiskAssessment,
+        stage="safety.risk_assessment",
+        action_id=action.id,
     )
-    response = await call_llm(RISK_ASSESSMENT_SYSTEM_PROMPT, user_prompt)
-    return RiskAssessment.model_validate_json(response)
 
 
-async def _evaluate_action(action: Action, environment_json: str) -> SafetyEvaluation:
-    """Run a full safety evaluation for one action via 4 sequential LLM calls."""
-    # Call 1: stakeholder impacts
-    stakeholder_impacts = await _generate_stakeholder_impacts(action, environment_json)
-
-    # Call 2: safety principles (needs stakeholder impacts as context)
-    principles = await _generate_safety_principles(
-        action, environment_json, stakeholder_impacts
+async def _synthesize(
+    action: Action,
+    environment_json: str,
+    stakeholder_impacts: list[StakeholderImpact],
+    principles: SafetyPrinciples,
+    risks: RiskAssessment,
+) -> SafetySynthesis:
+    """LLM call 4: synthesize the analyses into a final rating."""
+    user_prompt = [
+        _environment_segment(environment_json),
+        segment(
+            "Synthesize a final safety evaluation for this action in the "
+            "environment above:\n\n",
+            encode(action),
+            "\n\nStakeholder impacts:\n",
+            encode(stakeholder_impacts),
+            "\n\nSafety principles:\n",
+            encode(principles),
+            "\n\nRisk assessment:\n",
+            encode(risks),
+        ),
+    ]
+    return await call_llm_structured(
+        SAFETY_EVALUATION_SYSTEM_PROMPT,
+        user_prompt,
+        SafetySynthesis,
+        stage="safety.synthesis",
+        action_id=action.id,
     )
 
-    # Call 3: risk assessment
-    risks = await _generate_risk_assessment(action, environment_json)
 
-    # Call 4: synthesize into final rating, improvements, justification
-    impacts_json = json.dumps(
-        [i.model_dump() for i in stakeholder_impacts], indent=2
-    )
-    user_prompt = (
-        f"Synthesize a final safety evaluation for this action:\n\n"
-        f"{action.model_dump_json(indent=2)}\n\n"
-        f"Environment:\n{environment_json}\n\n"
-        f"Stakeholder impacts:\n{impacts_json}\n\n"
-        f"Safety principles:\n{principles.model_dump_json(indent=2)}\n\n"
-        f"Risk assessment:\n{risks.model_dump_json(indent=2)}"
+async def _synthesize_evaluation(
+    action: Action,
+    environment_json: str,
+    stakeholder_impacts: list[StakeholderImpact],
+    principles: SafetyPrinciples,
+    risks: RiskAssessment,
+) -> SafetyEvaluation:
+    """Combine the analyses and their synthesis into the action's evaluation."""
+    synthesis = await _synthesize(
+        action, environment_json, stakeholder_impacts, principles, risks
     )
-    response = await call_llm(SAFETY_EVALUATION_SYSTEM_PROMPT, user_prompt)
-    synthesis = json.loads(response)
-
     return SafetyEvaluation(
-        action_id=synthesis["action_id"],
         stakeholder_impacts=stakeholder_impacts,
         principles=principles,
         risks=risks,
-        improvements=synthesis["improvements"],
-        rating=synthesis["rating"],
-        justification=synthesis["justification"],
-        remaining_concerns=synthesis.get("remaining_concerns", []),
+        **synthesis.model_dump(exclude={"action_id"}),
+        action_id=action.id,
+    )
+
+
+async def _evaluate_action(action: Action, environment_json: str) -> SafetyEvaluation:
+    """Run a full safety evaluation for one action via 4 LLM calls.
+
+    The calls form a dependency graph: stakeholder impacts and risk
+    assessment start together, principles waits only on the impacts, and
+    synthesis waits on all three — three round-trips on the critical path.
+    """
+    results = await run_dag({
+        "impacts": Step(
+            lambda: _generate_stakeholder_impacts(action, environment_json)
+        ),
+        "risks": Step(
+            lambda: _generate_risk_assessment(action, environment_json)
+        ),
+        "principles": Step(
+            lambda impacts: _generate_safety_principles(
+                action, environment_json, impacts
+            ),
+            after=("impacts",),
+        ),
+        "evaluation": Step(
+            lambda impacts, principles, risks: _synthesize_evaluation(
+                action, environment_json, impacts, principles, risks
+            ),
+            after=("impacts", "principles", "risks"),
+        ),
+    })
+    return results["evaluation"]
+
+
+async def _evaluate_action_fast(action: Action, environment_json: str) -> SafetyEvaluation:
+    """Run a full safety evaluation for one action in a single LLM call."""
+    user_prompt = [
+        _environment_segment(environment_json),
+        segment(
+            "Evaluate the safety of this action in the environment above:\n\n",
+            encode(action),
+        ),
+    ]
+    evaluation = await call_llm_structured(
+        FAST_SAFETY_EVALUATION_SYSTEM_PROMPT,
+        user_prompt,
+        SafetyEvaluation,
+        stage="safety.fast",
+        action_id=action.id,
     )
+    # The model may echo a different id; keep the one the caller asked about.
+    return evaluation.model_copy(update={"action_id": action.id})
 
 
 async def _improve_action(action: Action, environment_json: str) -> Action:
     """Ask the LLM to suggest an improved version of the action."""
-    user_prompt = (
-        f"Improve this action to be safer:\n\n"
-        f"Original action:\n{action.model_dump_json(indent=2)}\n\n"
-        f"Environment:\n{environment_json}"
+    user_prompt = [
+        _environment_segment(environment_json),
+        segment(
+            "Improve this action to be safer in the environment above:\n\n"
+            "Original action:\n",
+            encode(action),
+        ),
+    ]
+    return await call_llm_structured(
+        SAFETY_IMPROVE_SYSTEM_PROMPT,
+        user_prompt,
+        Action,
+        stage="safety.improve",
+        action_id=action.id,
+    )
+
+
+async def _call_batch(
+    system_prompt: str,
+    stage: str,
+    result_type: Any,
+    actions: list[Action],
+    environment_json: str,
+    instruction: str,
+    *details: tuple[str, dict[str, Any]],
+    fallback: Callable[[Action], Awaitable[Any]],
+) -> dict[str, Any]:
+    """Run one batched sub-step and return its ``result_type`` results by action id.
+
+    ``details`` are (heading, results-by-action-id) pairs from earlier
+    sub-steps to include in the prompt.  Actions the batched response
+    leaves out are run on their own through ``fallback``, the sub-step's
+    per-action call.
+    """
+    parts = [f"{instruction} in the environment above:\n\n", encode(actions)]
+    for heading, results in details:
+        parts += [f"\n\n{heading}, by action id:\n\n", encode(results)]
+    user_prompt = [_environment_segment(environment_json), segment(*parts)]
+    results = await call_llm_structured(
+        system_prompt,
+        user_prompt,
+        dict[str, result_type],
+        stage=stage,
+        action_id=",".join(a.id for a in actions),
+    )
+    missing = [a for a in actions if a.id not in results]
+    if missing:
+        logger.warning(
+            "Batched %s response is missing actions %s; running them one by one",
+            stage,
+            [a.id for a in missing],
+        )
+        retried = await asyncio.gather(*(fallback(a) for a in missing))
+        results.update({a.id: result for a, result in zip(missing, retried)})
+    return {a.id: results[a.id] for a in actions}
+
+
+async def _improve_actions_batch(
+    actions: list[Action], environment_json: str
+) -> list[Action]:
+    """Batched :func:`_improve_action`; improved actions keep their ids."""
+    results = await _call_batch(
+        BATCHED_SAFETY_IMPROVE_SYSTEM_PROMPT,
+        "safety.batch.improve",
+        Action,
+        actions,
+        environment_json,
+        "Improve each of these actions to be safer",
+        fallback=lambda a: _improve_action(a, environment_json),
     )
-    response = await call_llm(SAFETY_IMPROVE_SYSTEM_PROMPT, user_prompt)
-    return Action.model_validate_json(response)
+    return [results[a.id].model_copy(update={"id": a.id}) for a in actions]
+
+
+async def _evaluate_actions_batch(
+    actions: list[Action], environment_json: str
+) -> list[SafetyEvaluation]:
+    """Batched :func:`_evaluate_action`: the same four sub-steps, one call each."""
+
+    async def impacts() -> dict[str, list[StakeholderImpact]]:
+        return await _call_batch(
+            BATCHED_STAKEHOLDER_IMPACT_SYSTEM_PROMPT,
+            "safety.batch.stakeholder_impacts",
+            list[StakeholderImpact],
+            actions,
+            environment_json,
+            "Analyze stakeholder impacts for each of these actions",
+            fallback=lambda a: _generate_stakeholder_impacts(a, environment_json),
+        )
+
+    async def risks() -> dict[str, RiskAssessment]:
+        return await _call_batch(
+            BATCHED_RISK_ASSESSMENT_SYSTEM_PROMPT,
+            "safety.batch.risk_assessment",
+            RiskAssessment,
+            actions,
+            environment_json,
+            "Assess risks for each of these actions",
+            fallback=lambda a: _generate_risk_assessment(a, environment_json),
+        )
+
+    async def principles(
+        impacts: dict[str, list[StakeholderImpact]],
+    ) -> dict[str, SafetyPrinciples]:
+        return await _call_batch(
+            BATCHED_SAFETY_PRINCIPLES_SYSTEM_PROMPT,
+            "safety.batch.principles",
+            SafetyPrinciples,
+            actions,
+            environment_json,
+            "Score safety principles for each of these actions",
+            ("Stakeholder impact analysis", impacts),
+            fallback=lambda a: _generate_safety_principles(
+                a, environment_json, impacts[a.id]
+            ),
+        )
+
+    async def evaluations(
+        impacts: dict[str, list[StakeholderImpact]],
+        principles: dict[str, SafetyPrinciples],
+        risks: dict[str, RiskAssessment],
+    ) -> list[SafetyEvaluation]:
+        results = await _call_batch(
+            BATCHED_SAFETY_EVALUATION_SYSTEM_PROMPT,
+            "safety.batch.synthesis",
+            SafetySynthesis,
+            actions,
+            environment_json,
+            "Synthesize a final safety evaluation for each of these actions",
+            ("Stakeholder impacts", impacts),
+            ("Safety principles", principles),
+            ("Risk assessment", risks),
+            fallback=lambda a: _synthesize(
+                a, environment_json, impacts[a.id], principles[a.id], risks[a.id]
+            ),
+        )
+        return [
+            SafetyEvaluation(
+                stakeholder_impacts=impacts[a.id],
+                principles=principles[a.id],
+                risks=risks[a.id],
+                **results[a.id].model_dump(exclude={"action_id"}),
+                action_id=a.id,
+            )
+            for a in actions
+        ]
+
+    results = await run_dag({
+        "impacts": Step(impacts),
+        "risks": Step(risks),
+        "principles": Step(principles, after=("impacts",)),
+        "evaluations": Step(evaluations, after=("impacts", "principles", "risks")),
+    })
+    return results["evaluations"]
+
+
+async def improve_and_evaluate_batch(
+    actions: list[Action],
+    environment_json: str,
+    auto_improve: bool,
+    no_cache: bool = False,
+    max_concurrency: Optional[int] = None,
+) -> list[SafetyEvaluation]:
+    """Improve and evaluate many actions with one LLM call per sub-step.
+
+    Actions are split into chunks of ``settings.safety_batch_size``; each
+    chunk costs five calls (four without ``auto_improve``) however many
+    actions it holds, and up to ``max_concurrency`` chunks run at once.
+    Results are returned in the original action order.
+    """
+
+    async def run_chunk(chunk: list[Action]) -> list[SafetyEvaluation]:
+        with bypass_cache(no_cache):
+            if auto_improve:
+                chunk = await _improve_actions_batch(chunk, environment_json)
+            return await _evaluate_actions_batch(chunk, environment_json)
+
+    size = settings.safety_batch_size
+    chunks = [actions[i : i + size] for i in range(0, len(actions), size)]
+    results = await gather_bounded(
+        (run_chunk(chunk) for chunk in chunks),
+        max_concurrency or settings.safety_max_concurrency,
+    )
+    return [evaluation for chunk in results for evaluation in chunk]
+
+
+async def improve_and_evaluate(
+    action: Action,
+    environment_json: str,
+    auto_improve: bool,
+    no_cache: bool = False,
+    mode: SafetyMode = "thorough",
+) -> SafetyEvaluation:
+    """Optionally improve one action, then run its safety evaluation.
+
+    ``mode`` selects the evaluation: ``"thorough"`` (four LLM calls) or
+    ``"fast"`` (one combined call).  This is the per-action unit of work
+    behind :func:`evaluate_safety`; the full pipeline calls it directly to
+    start on each action as soon as it has been generated.
+    """
+    with bypass_cache(no_cache):
+        if auto_improve:
+            action = await _improve_action(action, environment_json)
+        if mode == "fast":
+            return await _evaluate_action_fast(action, environment_json)
+        return await _evaluate_action(action, environment_json)
 
 
 # ---------------------------------------------------------------------------
@@ -443,24 +826,34 @@ async def _improve_action(action: Action, environment_json: str) -> Action:
 # ---------------------------------------------------------------------------
 
 @router.post("/safety", response_model=List[SafetyEvaluation])
+@single_flight("safety")
 async def evaluate_safety(req: SafetyRequest) -> List[SafetyEvaluation]:
     """Evaluate and improve the safety of all actions.
 
     If auto_improve is True, each action is improved before evaluation.
+    ``mode="fast"`` evaluates each action with a single combined LLM call
+    instead of the default four-call ``"thorough"`` analysis, and
+    ``mode="batched"`` runs the thorough sub-steps once for a whole batch
+    of actions (see :func:`improve_and_evaluate_batch`).
+    Each action's improve-then-evaluate chain runs as its own task, with at
+    most ``max_concurrency`` (default ``settings.safety_max_concurrency``)
+    chains in flight.  Results are returned in the original action order.
     """
-    environment_json = req.environment.model_dump_json(indent=2)
-
-    improved_actions = []
-    for action in req.actions:
-        if req.auto_improve:
-            improved_action = await _improve_action(action, environment_json)
-            improved_actions.append(improved_action)
-        else:
-            improved_actions.append(action)
-
-    evaluated_actions: List[SafetyEvaluation] = []
-    for improved_action in improved_actions:
-        evaluated_action = await _evaluate_action(improved_action, environment_json)
-        evaluated_actions.append(evaluated_action)
-
-    return evaluated_actions
+    environment_json = encode(req.environment)
+    limit = req.max_concurrency or settings.safety_max_concurrency
+
+    with use_routes(req.routes):
+        if req.mode == "batched":
+            return await improve_and_evaluate_batch(
+                req.actions, environment_json, req.auto_improve, req.no_cache, limit
+            )
+
+        return await gather_bounded(
+            (
+                improve_and_evaluate(
+                    action, environment_json, req.auto_improve, req.no_cache, req.mode
+                )
+                for action in req.actions
+            ),
+            limit,
+        )
@@ -1,66 +1,557 @@
+import asyncio
+import functools
+import json
+import logging
+import time
+from contextlib import AsyncExitStack
+from typing import Any, AsyncIterator, Callable, Optional
+
+from pydantic import TypeAdapter, ValidationError
+
 from src.config import settings
+from src.utils import llm_providers
+from src.utils.call_pool import DEDUPLICATED, current_call_pool, pooled
+from src.utils.circuit_breaker import (
+    FAILOVERS,
+    breaker_for,
+    can_fail_over,
+    failover_routes,
+    guarded,
+    guarded_stream,
+    with_failover,
+)
+from src.utils.deadline import (
+    DeadlineExceededError,
+    enforce_deadline,
+    iter_within_deadline,
+    remaining,
+)
+from src.utils.hedging import hedged
+from src.utils.instrumentation import record_llm_call
+from src.utils.llm_cache import cache_active, get_cache, make_key
+from src.utils.llm_providers import (
+    LLMUsage,
+    OutputTruncatedError,
+    PromptSegment,
+    UserPrompt,
+    prompt_text,
+)
+from src.utils.metrics import Counter
+from src.utils.offline_batch import current_offline_session
+from src.utils.prompt_encoding import tokens_saved
+from src.utils.rate_limit import estimate_tokens, get_limiter
+from src.utils.retry import policy_for, retry_delay, stage_setting, with_retry
+from src.utils.routing import Route, route_for
+from src.utils.structured_output import (
+    REPAIR_SYSTEM_PROMPT,
+    error_lines,
+    load_response,
+    repair_prompt,
+    response_schema,
+    validate_repaired,
+)
+
+logger = logging.getLogger(__name__)
+
+TRUNCATIONS = Counter(
+    "ease_llm_truncations_total",
+    "LLM responses cut off at their output token budget",
+    ["stage"],
+)
+RESPONSE_REPAIRS = Counter(
+    "ease_llm_response_repairs_total",
+    "Structured LLM responses that failed validation, by how they were recovered",
+    ["stage", "outcome"],
+)
+
+
+def output_budget(stage: str) -> int:
+    """Output token budget for one call of ``stage``."""
+    budget = stage_setting(settings.llm_stage_output_tokens, stage)
+    return int(budget or settings.llm_max_output_tokens)
+
+
+def larger_budget(stage: str, budget: int) -> Optional[int]:
+    """Budget to retry a truncated response with, or None at the ceiling."""
+    ceiling = settings.llm_max_output_tokens_ceiling
+    if budget >= ceiling:
+        return None
+    larger = min(budget * 2, ceiling)
+    logger.warning(
+        "llm response truncated stage=%s max_tokens=%d; retrying with max_tokens=%d",
+        stage,
+        budget,
+        larger,
+    )
+    return larger
+
+
+def _estimated_tokens(system_prompt: str, user_prompt: UserPrompt, budget: int) -> int:
+    return (
+        estimate_tokens(system_prompt)
+        + estimate_tokens(prompt_text(user_prompt))
+        + min(budget, settings.llm_output_tokens_estimate)
+    )
+
 
+@functools.lru_cache(maxsize=None)
+def _structured(response_type: Any) -> tuple[TypeAdapter, dict, bool]:
+    adapter = TypeAdapter(response_type)
+    return (adapter, *response_schema(adapter))
 
-async def call_llm(system_prompt: str, user_prompt: str) -> str:
+
+def is_valid_response(text: str, response_type: Any) -> bool:
+    """Whether ``text`` holds a ``response_type`` value, allowing local repairs."""
+    adapter, _, wrapped = _structured(response_type)
+    try:
+        validate_repaired(load_response(text, wrapped), adapter)
+    except (ValueError, ValidationError):
+        return False
+    return True
+
+
+def _log_usage(provider: str, model: str, usage: LLMUsage, tokens_saved: int) -> None:
+    logger.info(
+        "llm call provider=%s model=%s input_tokens=%d cached_input_tokens=%d "
+        "uncached_input_tokens=%d cache_write_tokens=%d output_tokens=%d "
+        "encoding_tokens_saved=%d",
+        provider,
+        model,
+        usage.input_tokens,
+        usage.cached_input_tokens,
+        usage.uncached_input_tokens,
+        usage.cache_write_tokens,
+        usage.output_tokens,
+        tokens_saved,
+    )
+
+
+async def call_llm(
+    system_prompt: str,
+    user_prompt: UserPrompt,
+    *,
+    stage: str = "default",
+    action_id: Optional[str] = None,
+    json_schema: Optional[dict] = None,
+    cacheable: Optional[Callable[[str], bool]] = None,
+) -> str:
     """Call the configured LLM provider and return the response text.
 
-    The provider is selected via the ``LLM_PROVIDER`` environment variable
-    (or ``settings.llm_provider``).  Supported values: anthropic, openai, google.
+    The provider and model are resolved per stage by
+    :func:`~src.utils.routing.route_for`: per-request routes, then
+    ``LLM_STAGE_ROUTES``, then ``LLM_PROVIDER`` / ``LLM_MODEL``.  Supported
+    providers: anthropic, openai, google, fake.
 
     Args:
         system_prompt: Instructions for the LLM's role and output format.
-        user_prompt: The user-facing request content.
+        user_prompt: The user-facing request content, either a plain string
+            or a sequence of :class:`PromptSegment` whose cacheable prefix is
+            passed to the provider's prompt cache.
+        stage: Dotted name of the pipeline step making the call (for example
+            ``"safety.principles"``), used to pick per-stage policies.
+        action_id: The action the call is about, if any; only used to tag
+            the call in :mod:`timings <src.utils.instrumentation>`.
+        json_schema: Object JSON schema to constrain the response to with
+            the provider's native structured output; prefer
+            :func:`call_llm_structured`, which builds it from a type.
+        cacheable: Check a fresh response must pass to be cached, so that
+            output which failed validation is not served again from the
+            cache; see :func:`is_valid_response`.
 
     Returns:
         The raw text response from the LLM.
+
+    When ``LLM_CACHE_ENABLED`` is set, responses are served from and stored
+    in the response cache keyed on (provider, model, system prompt, user
+    prompt), unless the current request bypasses it.  Calls that reach the
+    provider first wait for a slot from the shared :mod:`rate limiter
+    <src.utils.rate_limit>`, and transient provider errors are retried
+    according to the stage's :mod:`retry policy <src.utils.retry>`.
+
+    Output is capped at the stage's :func:`output_budget`; a truncated
+    response is retried with a doubled budget up to
+    ``LLM_MAX_OUTPUT_TOKENS_CEILING``, after which
+    :class:`~src.utils.llm_providers.OutputTruncatedError` is raised.
+
+    Slow calls of stages in ``LLM_HEDGE_STAGES`` are hedged with a duplicate
+    request (see :mod:`src.utils.hedging`).  Inside a request
+    :func:`~src.utils.deadline.deadline`, the call gives up with
+    :class:`~src.utils.deadline.DeadlineExceededError` when it passes.
+
+    A provider whose :mod:`circuit breaker <src.utils.circuit_breaker>` is
+    open is skipped, and a call that still fails with a transient error
+    after its retries moves on to the next route of ``LLM_FAILOVER_CHAIN``.
+    Cache keys always use the stage's own route.
+
+    Inside a :func:`~src.utils.call_pool.use_call_pool` block the call is
+    scheduled through the pool, and shares the response of an identical
+    call already in flight there.  Inside an :class:`offline session
+    <src.utils.offline_batch.OfflineSession>` the call is answered through
+    the session's batch backend instead of the provider's online API.
     """
-    provider = settings.llm_provider
-
-    if provider == "anthropic":
-        return await _call_anthropic(system_prompt, user_prompt)
-    elif provider == "openai":
-        return await _call_openai(system_prompt, user_prompt)
-    elif provider == "google":
-        return await _call_google(system_prompt, user_prompt)
+    route = route_for(stage)
+    provider, model = route.provider, route.model
+    tags = dict(
+        stage=stage,
+        action_id=action_id,
+        provider=provider,
+        model=model,
+        tokens_saved=tokens_saved(user_prompt),
+    )
+    started = time.perf_counter()
+    use_cache = cache_active()
+    parts = [provider, model, system_prompt, prompt_text(user_prompt)]
+    if json_schema is not None:
+        parts.append(json.dumps(json_schema, sort_keys=True))
+    key = make_key(*parts)
+    if use_cache:
+        cached = await get_cache().get(key)
+        if cached is not None:
+            record_llm_call(started=started, **tags)
+            return cached
+
+    budget = output_budget(stage)
+
+    async def attempt(route: Route) -> tuple[str, LLMUsage]:
+        async with get_limiter().slot(
+            route.provider, _estimated_tokens(system_prompt, user_prompt, budget)
+        ) as slot:
+            with guarded(route.provider):
+                text, usage = await llm_providers.complete(
+                    route.provider,
+                    route.model,
+                    system_prompt,
+                    user_prompt,
+                    budget,
+                    json_schema,
+                )
+            if usage.input_tokens:
+                slot.actual_tokens = usage.input_tokens + usage.output_tokens
+        return text, usage
+
+    async def retried(route: Route) -> tuple[str, LLMUsage]:
+        return await with_retry(lambda: attempt(route), stage)
+
+    async def dispatched(route: Route) -> tuple[Route, tuple[str, LLMUsage]]:
+        return await hedged(stage, route, retried)
+
+    async def fetch() -> tuple[str, LLMUsage]:
+        nonlocal budget
+        while True:
+            try:
+                if offline is not None:
+                    served_by = route
+                    text, usage = await offline.complete(
+                        route, system_prompt, user_prompt, budget, json_schema
+                    )
+                else:
+                    served_by, (text, usage) = await with_failover(
+                        stage, failover_routes(route), dispatched
+                    )
+                break
+            except OutputTruncatedError:
+                TRUNCATIONS.inc(stage=stage)
+                budget = larger_budget(stage, budget)
+                if budget is None:
+                    raise
+        tags.update(provider=served_by.provider, model=served_by.model)
+        _log_usage(served_by.provider, served_by.model, usage, tags["tokens_saved"])
+        record_llm_call(started=started, usage=usage, **tags)
+
+        if use_cache and (cacheable is None or cacheable(text)):
+            await get_cache().set(key, text)
+        return text, usage
+
+    offline = current_offline_session()
+    pool = current_call_pool()
+    async with enforce_deadline(stage):
+        if pool is None:
+            text, _ = await fetch()
+            return text
+        # The pooled call runs outside this request's context: its timings
+        # are recorded here, and every caller waits under its own deadline.
+        (text, usage), shared = await pool.run(key, fetch)
+    if shared:
+        DEDUPLICATED.inc(stage=stage)
+        record_llm_call(started=started, deduplicated=True, **tags)
     else:
-        raise ValueError(f"Unsupported LLM provider: {provider!r}")
+        record_llm_call(started=started, usage=usage, observe=False, **tags)
+    return text
 
 
-async def _call_anthropic(system_prompt: str, user_prompt: str) -> str:
-    import anthropic
+async def call_llm_structured(
+    system_prompt: str,
+    user_prompt: UserPrompt,
+    response_type: Any,
+    *,
+    stage: str = "default",
+    action_id: Optional[str] = None,
+) -> Any:
+    """Call the LLM for a structured response and return it validated.
 
-    client = anthropic.AsyncAnthropic(api_key=settings.llm_api_key)
-    message = await client.messages.create(
-        model=settings.llm_model,
-        max_tokens=200000,
-        system=system_prompt,
-        messages=[{"role": "user", "content": user_prompt}],
-    )
-    return message.content[0].text
+    ``response_type`` is a Pydantic model or any type ``TypeAdapter``
+    accepts (``list[Action]``, ``dict[str, RiskAssessment]``, ...).  Its
+    JSON schema is passed to the provider's native structured output
+    (see :func:`call_llm`), and the response is parsed with the tolerant
+    :func:`~src.utils.structured_output.extract_json`, so fences or prose
+    around the JSON do not fail the call.
 
+    Responses that fail validation are recovered with
+    :func:`validate_llm_output`; a response with no JSON at all is re-asked
+    once under stage ``<stage>.repair``.  Only responses that validate
+    (allowing local repairs) are written to the response cache.
 
-async def _call_openai(system_prompt: str, user_prompt: str) -> str:
-    from openai import AsyncOpenAI
-    client = AsyncOpenAI(api_key=settings.llm_api_key)
+    Raises:
+        ValueError: If the response contains no JSON.
+        pydantic.ValidationError: If the JSON does not match ``response_type``.
+    """
+    _, schema, wrapped = _structured(response_type)
+    text = await call_llm(
+        system_prompt,
+        user_prompt,
+        stage=stage,
+        action_id=action_id,
+        json_schema=schema,
+        cacheable=functools.partial(is_valid_response, response_type=response_type),
+    )
+    try:
+        data = load_response(text, wrapped)
+    except ValueError as e:
+        if settings.llm_repair_reasks < 1:
+            raise
+        text = await _reask(text, [str(e)], response_type, stage, action_id)
+        data = load_response(text, wrapped)
+    return await validate_llm_output(
+        data, response_type, stage=stage, action_id=action_id
+    )
 
-    response = await client.responses.create(
-        model=settings.llm_model,
-        reasoning={"effort": "low"},
-        instructions=system_prompt,
-        input=user_prompt,
+
+async def _reask(
+    invalid: Any,
+    errors: list[str],
+    response_type: Any,
+    stage: str,
+    action_id: Optional[str],
+) -> str:
+    logger.warning(
+        "llm response failed validation stage=%s errors=%d; asking for a correction",
+        stage,
+        len(errors),
+    )
+    return await call_llm(
+        REPAIR_SYSTEM_PROMPT,
+        repair_prompt(invalid, errors),
+        stage=f"{stage}.repair",
+        action_id=action_id,
+        json_schema=_structured(response_type)[1],
+        cacheable=functools.partial(is_valid_response, response_type=response_type),
     )
 
-    return response.output_text
+
+async def _reask_invalid(
+    data: Any,
+    errors: list[dict],
+    response_type: Any,
+    stage: str,
+    action_id: Optional[str],
+) -> Any:
+    """Ask the model to fix the invalid parts of ``data``; returns the new data.
+
+    For list and dict responses only the items with errors are sent back,
+    and the corrections are spliced into ``data``.
+    """
+    wrapped = _structured(response_type)[2]
+    if not wrapped or not all(e["loc"] for e in errors):
+        text = await _reask(data, error_lines(errors), response_type, stage, action_id)
+        return load_response(text, wrapped)
+
+    keys = list(dict.fromkeys(e["loc"][0] for e in errors))
+    if isinstance(data, list):
+        position = {key: i for i, key in enumerate(keys)}
+        invalid: Any = [data[key] for key in keys]
+        errors = [{**e, "loc": (position[e["loc"][0]], *e["loc"][1:])} for e in errors]
+    else:
+        invalid = {key: data[key] for key in keys}
+    text = await _reask(invalid, error_lines(errors), response_type, stage, action_id)
+    fixed = load_response(text, wrapped)
+    if isinstance(data, list) and isinstance(fixed, list):
+        for key, item in zip(keys, fixed):
+            data[key] = item
+    elif isinstance(data, dict) and isinstance(fixed, dict):
+        data.update((key, fixed[key]) for key in keys if key in fixed)
+    return data
 
 
-async def _call_google(system_prompt: str, user_prompt: str) -> str:
-    from google import genai
-    from google.genai import types
+async def validate_llm_output(
+    data: Any,
+    response_type: Any,
+    *,
+    stage: str = "default",
+    action_id: Optional[str] = None,
+    reask: bool = True,
+) -> Any:
+    """Validate JSON produced by the LLM for ``stage``, recovering bad values.
+
+    Validation errors are first fixed locally (enum synonyms, numbers as
+    text or out of range, id formats; see
+    :func:`~src.utils.structured_output.validate_repaired`).  Whatever
+    remains is sent back to the model with just the failing objects and
+    their errors, under stage ``<stage>.repair``, up to
+    ``settings.llm_repair_reasks`` times, so one bad object costs one small
+    call rather than a rerun of the stage.  With ``reask=False`` only the
+    local fixes are tried; callers still holding a :func:`stream_llm`
+    response use it, since a re-ask could wait on the slot the stream holds.
+
+    Raises:
+        pydantic.ValidationError: If the data is still invalid.
+    """
+    adapter = _structured(response_type)[0]
+    reasks = settings.llm_repair_reasks if reask else 0
+    for attempt in range(reasks + 1):
+        try:
+            value, repaired = validate_repaired(data, adapter)
+        except ValidationError as e:
+            if attempt == reasks:
+                if reask:
+                    RESPONSE_REPAIRS.inc(stage=stage, outcome="failed")
+                raise
+            data = await _reask_invalid(data, e.errors(), response_type, stage, action_id)
+            continue
+        if attempt or repaired:
+            RESPONSE_REPAIRS.inc(stage=stage, outcome="reask" if attempt else "local")
+        return value
 
-    client = genai.Client(api_key=settings.llm_api_key)
-    response = await client.aio.models.generate_content(
-        model=settings.llm_model,
-        contents=user_prompt,
-        config=types.GenerateContentConfig(system_instruction=system_prompt),
+
+async def stream_llm(
+    system_prompt: str,
+    user_prompt: UserPrompt,
+    *,
+    stage: str = "default",
+    action_id: Optional[str] = None,
+    max_tokens: Optional[int] = None,
+    cacheable: Optional[Callable[[str], bool]] = None,
+) -> AsyncIterator[str]:
+    """Stream the response text from the configured LLM provider in chunks.
+
+    Takes the same arguments as :func:`call_llm` (except ``json_schema``),
+    plus ``max_tokens`` to override the stage's :func:`output_budget`.  A
+    cached response is replayed as a single chunk; a fresh one is cached
+    once fully received, if it passes ``cacheable``.  Transient errors are
+    retried only if they happen before the first chunk, since chunks
+    already yielded cannot be taken back.  For the same reason a truncated
+    stream is not retried here:
+    :class:`~src.utils.llm_providers.OutputTruncatedError` is raised after
+    the last chunk instead, and the caller, which knows what it has
+    already used, can stream again with :func:`larger_budget`.  Like
+    :func:`call_llm`, it raises
+    :class:`~src.utils.deadline.DeadlineExceededError` once the request
+    deadline passes, and fails over to the next route of
+    ``LLM_FAILOVER_CHAIN`` (again only before the first chunk).  Inside a
+    :func:`~src.utils.call_pool.use_call_pool` block each attempt holds one
+    of the pool's call slots.  Inside an offline session the whole response
+    arrives from the batch backend and is yielded as a single chunk.
+    """
+    route = route_for(stage)
+    provider, model = route.provider, route.model
+    tags = dict(
+        stage=stage,
+        action_id=action_id,
+        provider=provider,
+        model=model,
+        tokens_saved=tokens_saved(user_prompt),
     )
-    return response.text
+    started = time.perf_counter()
+    first_token: Optional[float] = None
+    use_cache = cache_active()
+    if use_cache:
+        key = make_key(provider, model, system_prompt, prompt_text(user_prompt))
+        cached = await get_cache().get(key)
+        if cached is not None:
+            record_llm_call(started=started, **tags)
+            yield cached
+            return
+
+    budget = max_tokens or output_budget(stage)
+    offline = current_offline_session()
+    if offline is not None:
+        text, usage = await offline.complete(route, system_prompt, user_prompt, budget)
+        _log_usage(provider, model, usage, tags["tokens_saved"])
+        record_llm_call(started=started, usage=usage, **tags)
+        if use_cache and (cacheable is None or cacheable(text)):
+            await get_cache().set(key, text)
+        yield text
+        return
+
+    policy = policy_for(stage)
+    deadline = time.monotonic() + policy.deadline_seconds
+    fallbacks = failover_routes(route)[1:]
+    attempt = 0
+    while True:
+        attempt += 1
+        usage = LLMUsage()
+        chunks: list[str] = []
+        try:
+            async with AsyncExitStack() as held:
+                # Only the wait for the slots is bounded here; the chunks
+                # are, one at a time, by iter_within_deadline.
+                async with enforce_deadline(stage):
+                    await held.enter_async_context(pooled())
+                    slot = await held.enter_async_context(
+                        get_limiter().slot(
+                            provider, _estimated_tokens(system_prompt, user_prompt, budget)
+                        )
+                    )
+                async for chunk in iter_within_deadline(
+                    guarded_stream(
+                        provider,
+                        llm_providers.stream(
+                            provider, model, system_prompt, user_prompt, usage, budget
+                        ),
+                    ),
+                    stage,
+                ):
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                    chunks.append(chunk)
+                    yield chunk
+                if usage.input_tokens:
+                    slot.actual_tokens = usage.input_tokens + usage.output_tokens
+            break
+        except OutputTruncatedError:
+            TRUNCATIONS.inc(stage=stage)
+            raise
+        except DeadlineExceededError:
+            raise
+        except Exception as exc:
+            delay = None if chunks else retry_delay(exc, stage, policy, attempt, deadline)
+            if delay is None:
+                if chunks or not can_fail_over(exc):
+                    raise
+                FAILOVERS.inc(stage=stage, provider=provider)
+                while fallbacks and not breaker_for(fallbacks[0].provider).available():
+                    FAILOVERS.inc(stage=stage, provider=fallbacks.pop(0).provider)
+                if not fallbacks:
+                    raise
+                route = fallbacks.pop(0)
+                provider, model = route.provider, route.model
+                logger.warning(
+                    "LLM stream for stage %s failing over to %s/%s after: %s",
+                    stage,
+                    provider,
+                    model,
+                    exc,
+                )
+                tags.update(provider=provider, model=model)
+                deadline = time.monotonic() + policy.deadline_seconds
+                attempt = 0
+                continue
+            left = remaining()
+            if left is not None and delay >= left:
+                raise DeadlineExceededError(stage) from exc
+            await asyncio.sleep(delay)
+    _log_usage(provider, model, usage, tags["tokens_saved"])
+    record_llm_call(started=started, usage=usage, first_token=first_token, **tags)
+
+    text = "".join(chunks)
+    if use_cache and (cacheable is None or cacheable(text)):
+        await get_cache().set(key, text)
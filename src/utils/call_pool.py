@@ -0,0 +1,115 @@
+"""
+Shared scheduling of the LLM calls of many pipeline runs.
+
+A :class:`CallPool` bounds how many LLM calls the runs using it have in
+flight at once, and runs identical calls (same route, prompts and schema)
+only once while one is in flight, sharing the response with every run that
+asked for it.  Runs opt in with :func:`use_call_pool`; ``call_llm`` and
+``stream_llm`` then schedule through the pool.  Streams are bounded but not
+shared, since their chunks are consumed as they arrive.
+
+Used by the ``/api/v1/ease/batch`` endpoint, so a large batch neither takes
+every slot of the worker's rate limiter nor repeats identical sub-prompts.
+"""
+
+import asyncio
+import contextvars
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional, TypeVar
+
+from src.utils.metrics import Counter
+
+T = TypeVar("T")
+
+DEDUPLICATED = Counter(
+    "ease_llm_deduplicated_calls_total",
+    "LLM calls served by an identical call already in flight in the same pool",
+    ["stage"],
+)
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class CallPool:
+    """A bounded executor for LLM calls that shares identical in-flight calls."""
+
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(max(1, limit))
+        self._flights: dict[str, _Flight] = {}
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def _bounded(self, call: Callable[[], Awaitable[T]]) -> T:
+        async with self.semaphore:
+            return await call()
+
+    async def run(self, key: str, call: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """Run ``call`` in the pool, or join the call with the same ``key`` in flight.
+
+        Returns the result and whether it came from a call already in
+        flight.  The call runs in an empty context, so it sees none of the
+        request-scoped state (deadline, timing recorder, ...) of the caller
+        that started it; each caller bounds its own wait instead.  It is
+        cancelled only when every caller waiting on it is.
+        """
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            task = asyncio.create_task(self._bounded(call), context=contextvars.Context())
+            flight = self._flights[key] = _Flight(task)
+            task.add_done_callback(lambda _: self._forget(key, flight))
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        except asyncio.CancelledError:
+            if flight.waiters == 1:
+                self._forget(key, flight)
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+
+_pool: ContextVar[Optional[CallPool]] = ContextVar("llm_call_pool", default=None)
+
+
+@contextmanager
+def use_call_pool(pool: Optional[CallPool]) -> Iterator[None]:
+    """Schedule the LLM calls made inside the block through ``pool``.
+
+    A no-op when ``pool`` is None.  Tasks started inside the block use it too.
+    """
+    if pool is None:
+        yield
+        return
+    previous = _pool.get()
+    _pool.set(pool)
+    try:
+        yield
+    finally:
+        _pool.set(previous)
+
+
+def current_call_pool() -> Optional[CallPool]:
+    """The pool LLM calls in the current context are scheduled through, if any."""
+    return _pool.get()
+
+
+@asynccontextmanager
+async def pooled() -> AsyncIterator[None]:
+    """Hold one call slot of the current pool for the block; a no-op without one."""
+    pool = _pool.get()
+    if pool is None:
+        yield
+        return
+    async with pool.semaphore:
+        yield
@@ -0,0 +1,256 @@
+"""
+Per-provider circuit breakers and the provider failover chain.
+
+Every provider request made by ``call_llm`` / ``stream_llm`` reports to its
+provider's :class:`CircuitBreaker`.  Over the last ``LLM_BREAKER_WINDOW``
+requests, a breaker opens when the share of transient failures reaches
+``LLM_BREAKER_ERROR_RATE`` or the share slower than
+``LLM_BREAKER_SLOW_CALL_SECONDS`` reaches ``LLM_BREAKER_SLOW_CALL_RATE``.
+While open, the provider is skipped.  After ``LLM_BREAKER_OPEN_SECONDS`` it
+turns half-open and lets ``LLM_BREAKER_HALF_OPEN_PROBES`` requests through:
+a fast success closes it, anything else opens it again.
+
+A call whose route fails (after its retries) or whose provider is open
+moves on to the next entry of ``LLM_FAILOVER_CHAIN``, an ordered list of
+``{"provider", "model"}`` routes tried after the stage's own route.
+
+Breakers are kept per worker process.
+"""
+
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterator, Optional, TypeVar
+
+from src.config import settings
+from src.utils.metrics import Counter, Gauge
+from src.utils.retry import classify
+from src.utils.routing import Route
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_STATE = Gauge(
+    "ease_llm_circuit_state",
+    "Provider circuit breaker state in this worker (0 closed, 1 half-open, 2 open)",
+    ["provider"],
+)
+CIRCUIT_TRANSITIONS = Counter(
+    "ease_llm_circuit_transitions_total",
+    "Provider circuit breaker state changes in this worker",
+    ["provider", "state"],
+)
+FAILOVERS = Counter(
+    "ease_llm_failovers_total",
+    "LLM calls moved past a provider that failed or whose circuit was open",
+    ["stage", "provider"],
+)
+
+
+class CircuitOpenError(Exception):
+    """The provider's circuit breaker is open; the request was not sent."""
+
+    def __init__(self, provider: str):
+        super().__init__(f"Circuit breaker for provider '{provider}' is open")
+        self.provider = provider
+
+
+class CircuitBreaker:
+    """Health of one provider, from the outcomes of its recent requests."""
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probes = 0
+        # (failed, slow) per request, most recent last.
+        self.outcomes: deque[tuple[bool, bool]] = deque(maxlen=settings.llm_breaker_window)
+        CIRCUIT_STATE.set(0, provider=provider)
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        self.state = state
+        self.probes = 0
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            logger.warning("circuit breaker for provider %s opened", self.provider)
+        elif state == CLOSED:
+            self.outcomes.clear()
+            logger.info("circuit breaker for provider %s closed", self.provider)
+        CIRCUIT_STATE.set(_STATE_VALUES[state], provider=self.provider)
+        CIRCUIT_TRANSITIONS.inc(provider=self.provider, state=state)
+
+    def available(self) -> bool:
+        """Whether a request to the provider would currently be let through."""
+        if self.state == OPEN:
+            return time.monotonic() - self.opened_at >= settings.llm_breaker_open_seconds
+        if self.state == HALF_OPEN:
+            return self.probes < settings.llm_breaker_half_open_probes
+        return True
+
+    def acquire(self) -> bool:
+        """Take permission to send one request; False while the circuit is open."""
+        if not self.available():
+            return False
+        if self.state == OPEN:
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            self.probes += 1
+        return True
+
+    def release(self) -> None:
+        """A request ended without telling anything about the provider's health."""
+        if self.state == HALF_OPEN:
+            self.probes = max(0, self.probes - 1)
+
+    def record(self, failed: bool, seconds: float) -> None:
+        """Report the outcome of a request let through by :meth:`acquire`."""
+        slow = seconds >= settings.llm_breaker_slow_call_seconds
+        if self.state == HALF_OPEN:
+            self.release()
+            self._transition(OPEN if failed or slow else CLOSED)
+            return
+        if self.state == OPEN:
+            return
+        self.outcomes.append((failed, slow))
+        if len(self.outcomes) < settings.llm_breaker_min_calls:
+            return
+        total = len(self.outcomes)
+        failures = sum(f for f, _ in self.outcomes)
+        slow_calls = sum(s for _, s in self.outcomes)
+        if (
+            failures / total >= settings.llm_breaker_error_rate
+            or slow_calls / total >= settings.llm_breaker_slow_call_rate
+        ):
+            self._transition(OPEN)
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def breaker_for(provider: str) -> CircuitBreaker:
+    """Return this process's breaker for ``provider``, creating it on first use."""
+    if provider not in _breakers:
+        _breakers[provider] = CircuitBreaker(provider)
+    return _breakers[provider]
+
+
+@contextmanager
+def guarded(provider: str) -> Iterator[None]:
+    """Send one request to ``provider`` through its circuit breaker.
+
+    Transient failures (see :func:`~src.utils.retry.classify`) and slow
+    requests count against the provider; other errors and cancellation do
+    not count either way.
+
+    Raises:
+        CircuitOpenError: If the breaker is open.
+    """
+    breaker = breaker_for(provider)
+    if not breaker.acquire():
+        raise CircuitOpenError(provider)
+    started = time.monotonic()
+    try:
+        yield
+    except Exception as exc:
+        if classify(exc) is None:
+            breaker.release()
+        else:
+            breaker.record(True, time.monotonic() - started)
+        raise
+    except BaseException:
+        breaker.release()
+        raise
+    breaker.record(False, time.monotonic() - started)
+
+
+async def guarded_stream(provider: str, chunks: AsyncIterable[T]) -> AsyncIterator[T]:
+    """Re-yield a streamed response from ``provider`` through its circuit breaker.
+
+    Like :func:`guarded`, but the request counts as done at its first chunk:
+    its latency is the time to first chunk, and errors after it (or the
+    consumer's own processing time) do not count against the provider.
+
+    Raises:
+        CircuitOpenError: If the breaker is open.
+    """
+    breaker = breaker_for(provider)
+    if not breaker.acquire():
+        raise CircuitOpenError(provider)
+    started = time.monotonic()
+    reported = False
+
+    def report(failed: bool) -> None:
+        nonlocal reported
+        if not reported:
+            reported = True
+            breaker.record(failed, time.monotonic() - started)
+
+    try:
+        async for chunk in chunks:
+            report(False)
+            yield chunk
+        report(False)
+    except Exception as exc:
+        if classify(exc) is not None:
+            report(True)
+        raise
+    finally:
+        if not reported:
+            breaker.release()
+
+
+def failover_routes(route: Route) -> list[Route]:
+    """``route`` followed by the failover chain, without duplicates."""
+    routes = [route]
+    for entry in settings.llm_failover_chain:
+        candidate = Route(provider=entry["provider"], model=entry["model"])
+        if candidate not in routes:
+            routes.append(candidate)
+    return routes
+
+
+def can_fail_over(exc: BaseException) -> bool:
+    """Whether a call that failed with ``exc`` should try the next route."""
+    return isinstance(exc, CircuitOpenError) or classify(exc) is not None
+
+
+async def with_failover(
+    stage: str, routes: list[Route], call: Callable[[Route], Awaitable[T]]
+) -> T:
+    """Run ``call`` on the first route whose provider is healthy and succeeds.
+
+    Routes whose breaker is open are skipped.  A route that fails with a
+    transient error (after ``call``'s own retries) hands over to the next.
+
+    Raises:
+        CircuitOpenError: If every route's breaker is open.
+        Exception: The last route's error if every route failed.
+    """
+    error: Optional[BaseException] = None
+    for route in routes:
+        if not breaker_for(route.provider).available():
+            error = CircuitOpenError(route.provider)
+            FAILOVERS.inc(stage=stage, provider=route.provider)
+            continue
+        try:
+            return await call(route)
+        except Exception as exc:
+            if not can_fail_over(exc):
+                raise
+            error = exc
+            FAILOVERS.inc(stage=stage, provider=route.provider)
+            logger.warning(
+                "LLM call for stage %s via %s/%s failed, failing over: %s",
+                stage,
+                route.provider,
+                route.model,
+                exc,
+            )
+    raise error
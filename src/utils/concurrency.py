@@ -0,0 +1,115 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable, Mapping, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Step:
+    """One node of a dependency graph run by :func:`run_dag`.
+
+    ``fn`` is called with the results of the steps named in ``after`` as
+    keyword arguments (keyed by step name) and must return an awaitable.
+    """
+
+    fn: Callable[..., Awaitable[Any]]
+    after: tuple[str, ...] = ()
+
+
+async def gather_bounded(aws: Iterable[Awaitable[T]], limit: int) -> list[T]:
+    """Run awaitables concurrently with at most ``limit`` in flight.
+
+    Results are returned in the same order as ``aws``, regardless of the
+    order in which they complete.  If any awaitable raises, the remaining
+    ones are cancelled and the exception propagates.
+
+    Args:
+        aws:   The awaitables (usually coroutines) to run.
+        limit: Maximum number running at the same time (values < 1 mean 1).
+
+    Returns:
+        The results, in input order.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def _run(aw: Awaitable[T]) -> T:
+        try:
+            await semaphore.acquire()
+        except asyncio.CancelledError:
+            if asyncio.iscoroutine(aw):
+                aw.close()  # cancelled before it started
+            raise
+        try:
+            return await aw
+        finally:
+            semaphore.release()
+
+    tasks = [asyncio.ensure_future(_run(aw)) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+def _check_graph(steps: Mapping[str, Step]) -> None:
+    """Raise ``ValueError`` for unknown dependencies or cycles."""
+    for name, step in steps.items():
+        missing = [dep for dep in step.after if dep not in steps]
+        if missing:
+            raise ValueError(f"Step {name!r} depends on unknown step(s): {missing}")
+
+    visiting: set[str] = set()
+    done: set[str] = set()
+
+    def _visit(name: str) -> None:
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle detected at step {name!r}")
+        visiting.add(name)
+        for dep in steps[name].after:
+            _visit(dep)
+        visiting.discard(name)
+        done.add(name)
+
+    for name in steps:
+        _visit(name)
+
+
+async def run_dag(steps: Mapping[str, Step]) -> dict[str, Any]:
+    """Run a small dependency graph of async steps as eagerly as possible.
+
+    Every step is launched as soon as all of the steps it depends on have
+    finished, so independent steps run concurrently and the total time is
+    set by the graph's critical path.  If any step raises, all unfinished
+    steps are cancelled and the exception propagates.
+
+    Args:
+        steps: Mapping of step name to :class:`Step`.
+
+    Returns:
+        Mapping of step name to that step's result.
+
+    Raises:
+        ValueError: If a step depends on an unknown step or the graph has a cycle.
+    """
+    _check_graph(steps)
+    tasks: dict[str, asyncio.Task] = {}
+
+    async def _run(name: str) -> Any:
+        step = steps[name]
+        deps = await asyncio.gather(*(tasks[dep] for dep in step.after))
+        return await step.fn(**dict(zip(step.after, deps)))
+
+    for name in steps:
+        tasks[name] = asyncio.ensure_future(_run(name))
+    try:
+        results = await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        raise
+    return dict(zip(tasks, results))
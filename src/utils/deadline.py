@@ -0,0 +1,98 @@
+"""
+End-to-end request deadlines.
+
+:func:`deadline` sets the time budget of a request for everything run
+inside it, including tasks started there; nested deadlines can only
+shorten it.  ``call_llm`` and ``stream_llm`` stop waiting on the provider
+(including retries and limiter waits) when it runs out, raising
+:class:`DeadlineExceededError`, and pipeline stages can check
+:func:`remaining` to trade quality for latency before starting work.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterable, AsyncIterator, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Absolute time.monotonic() deadline of the current request, if any.
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceededError(TimeoutError):
+    """The request's deadline passed before an LLM call could complete."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Request deadline exceeded during stage '{stage}'")
+        self.stage = stage
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    """Give everything inside the block at most ``seconds`` from now.
+
+    A no-op when ``seconds`` is None; an enclosing, earlier deadline is kept.
+    """
+    if seconds is None:
+        yield
+        return
+    previous = _deadline.get()
+    at = time.monotonic() + seconds
+    _deadline.set(at if previous is None else min(previous, at))
+    try:
+        yield
+    finally:
+        _deadline.set(previous)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline (may be negative), or None."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+@asynccontextmanager
+async def enforce_deadline(stage: str) -> AsyncIterator[None]:
+    """Cancel the block when the current deadline passes.
+
+    Raises:
+        DeadlineExceededError: If the deadline has passed or passes inside
+            the block.
+    """
+    left = remaining()
+    if left is None:
+        yield
+        return
+    if left <= 0:
+        raise DeadlineExceededError(stage)
+    timeout = asyncio.timeout(left)
+    try:
+        async with timeout:
+            yield
+    except TimeoutError as e:
+        if timeout.expired():
+            raise DeadlineExceededError(stage) from e
+        raise
+
+
+async def iter_within_deadline(chunks: AsyncIterable[T], stage: str) -> AsyncIterator[T]:
+    """Re-yield ``chunks``, giving up when the current deadline passes.
+
+    Raises:
+        DeadlineExceededError: If the deadline passes before the next chunk.
+    """
+    iterator = chunks.__aiter__()
+    while True:
+        left = remaining()
+        try:
+            if left is None:
+                chunk = await iterator.__anext__()
+            else:
+                chunk = await asyncio.wait_for(iterator.__anext__(), max(left, 0))
+        except StopAsyncIteration:
+            return
+        except TimeoutError as e:
+            raise DeadlineExceededError(stage) from e
+        yield chunk
@@ -0,0 +1,330 @@
+"""
+Deterministic fake LLM provider (``LLM_PROVIDER=fake``).
+
+Answers every system prompt used by the EASE routers and
+:mod:`src.ai_security` with canned, schema-valid JSON, so the pipeline can be
+exercised and benchmarked without calling a real provider.  Responses are
+derived from a hash of the prompt, so the same prompt always yields the same
+answer.  Latency, failures and malformed responses can be injected via the
+``FAKE_LLM_*`` settings.
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import math
+import random
+import re
+from collections import Counter
+from typing import AsyncIterator, Callable
+
+from src.config import settings
+
+# Number of calls answered, keyed by prompt name (see ``_handlers``).
+calls: Counter = Counter()
+
+_latency_rng = random.Random(settings.fake_llm_seed)
+
+_STAKEHOLDERS = ["Customers", "Employees", "Leadership", "Regulators"]
+
+
+class FakeProviderError(Exception):
+    """Injected provider failure; carries an HTTP-like ``status_code``."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"Injected fake provider error ({status_code})")
+        self.status_code = status_code
+
+
+def reset_calls() -> None:
+    calls.clear()
+
+
+def _rng(system_prompt: str, user_prompt: str) -> random.Random:
+    digest = hashlib.sha256((system_prompt + user_prompt).encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big") ^ settings.fake_llm_seed)
+
+
+def _score(rng: random.Random, low: float = 3.0, high: float = 9.5) -> float:
+    return round(rng.uniform(low, high), 1)
+
+
+def _action_ids(user_prompt: str) -> list[str]:
+    # Matches JSON ("id": "A1") and terse (id: A1) prompt encodings.
+    return re.findall(r'(?<!\w)"?id"?:\s*"?(A\d+)', user_prompt)
+
+
+def _action(action_id: str, rng: random.Random) -> dict:
+    return {
+        "id": action_id,
+        "name": f"Option {action_id}",
+        "description": f"Concrete course of action {action_id}.",
+        "prerequisites": ["Leadership approval"],
+        "expected_outcomes": ["Measurable progress toward the goal"],
+        "resources_required": ["$50,000", "2 months"],
+        "reversibility": rng.choice(["high", "medium", "low"]),
+        "time_to_effect": "1-3 months",
+        "goal_achievement_score": _score(rng),
+        "resource_efficiency_score": _score(rng),
+    }
+
+
+def _environment(user_prompt: str, rng: random.Random) -> dict:
+    return {
+        "goal": {
+            "objective": "Reach the requested outcome within 6 months",
+            "success_criteria": ["Primary metric improves by 10%"],
+            "constraints": ["Fixed budget"],
+            "time_horizon": "6 months",
+        },
+        "current_state": "The organization is evaluating how to respond to the request.",
+        "stakeholders": [
+            {
+                "name": name,
+                "interests": ["Fair treatment"],
+                "power_level": rng.choice(["high", "medium", "low"]),
+                "affected_degree": rng.choice(["primary", "secondary", "tertiary"]),
+            }
+            for name in _STAKEHOLDERS
+        ],
+        "resources": ["Budget", "Staff"],
+        "constraints": ["Regulatory compliance"],
+        "uncertainties": ["Market response"],
+    }
+
+
+def _actions(user_prompt: str, rng: random.Random) -> list:
+    match = re.search(r"at least (\d+) actions", user_prompt)
+    count = int(match.group(1)) if match else 5
+    return [_action(f"A{i}", rng) for i in range(1, count + 1)]
+
+
+def _improve(user_prompt: str, rng: random.Random) -> dict:
+    ids = _action_ids(user_prompt)
+    return _action(ids[-1] if ids else "A1", rng)
+
+
+def _stakeholder_impacts(user_prompt: str, rng: random.Random) -> list:
+    return [
+        {
+            "stakeholder_name": name,
+            "benefits": ["Clearer outcomes"],
+            "harms": ["Short-term disruption"],
+            "autonomy_respected": rng.random() > 0.2,
+            "informed_consent": rng.random() > 0.3,
+            "net_impact": round(rng.uniform(-3, 8), 1),
+        }
+        for name in _STAKEHOLDERS
+    ]
+
+
+def _principles(user_prompt: str, rng: random.Random) -> dict:
+    return {
+        "non_maleficence": _score(rng),
+        "beneficence": _score(rng),
+        "autonomy": _score(rng),
+        "justice": _score(rng),
+        "transparency": _score(rng),
+    }
+
+
+def _risks(user_prompt: str, rng: random.Random) -> dict:
+    severity_score = _score(rng, 2.0, 9.5)
+    if severity_score >= 7:
+        severity = "low"
+    elif severity_score >= 4:
+        severity = "medium"
+    else:
+        severity = "high"
+    return {
+        "safety_risks": [],
+        "privacy_risks": ["Data handling exposure"],
+        "security_risks": [],
+        "societal_risks": ["Uneven distribution of benefits"],
+        "overall_severity": severity,
+        "severity_score": severity_score,
+    }
+
+
+def _synthesis(user_prompt: str, rng: random.Random) -> dict:
+    ids = _action_ids(user_prompt)
+    return {
+        "action_id": ids[-1] if ids else "A1",
+        "improvements": ["Add an opt-out", "Pilot before full rollout"],
+        "rating": _score(rng, 4.0, 9.0),
+        "justification": "Benefits outweigh the identified, manageable risks.",
+        "remaining_concerns": [],
+    }
+
+
+def _fast_evaluation(user_prompt: str, rng: random.Random) -> dict:
+    return {
+        **_synthesis(user_prompt, rng),
+        "stakeholder_impacts": _stakeholder_impacts(user_prompt, rng),
+        "principles": _principles(user_prompt, rng),
+        "risks": _risks(user_prompt, rng),
+    }
+
+
+def _batched(build: Callable[[str, random.Random], object]):
+    """Wrap a per-action builder to answer the batched variant of its prompt."""
+
+    def build_batch(user_prompt: str, rng: random.Random) -> dict:
+        actions = user_prompt.split(", by action id:", 1)[0]
+        ids = list(dict.fromkeys(_action_ids(actions)))
+        return {
+            action_id: build(f'"id": "{action_id}"', rng) for action_id in ids
+        }
+
+    return build_batch
+
+
+def _election(user_prompt: str, rng: random.Random) -> dict:
+    matrix = user_prompt.split("Decision matrix:", 1)[-1]
+    elected = _action_ids(user_prompt)[:1]
+    rejected = sorted(set(re.findall(r'"?action_id"?:\s*"?(A\d+)', matrix)) - set(elected))
+    return {
+        "qualitative_factors": ["High reversibility", "Strong stakeholder buy-in"],
+        "rejected_alternatives": [
+            {"action_id": action_id, "reason": "Lower weighted score"}
+            for action_id in rejected
+        ],
+        "implementation_plan": ["Week 1: plan", "Weeks 2-6: pilot", "Month 3: review"],
+        "success_metrics": ["Primary metric: +10%"],
+        "review_schedule": "Monthly for 6 months",
+        "fallback_plan": "Revert to the status quo and re-run the analysis.",
+    }
+
+
+def _injection_check(user_prompt: str, rng: random.Random) -> dict:
+    return {
+        "reasoning": "No injection signals found.",
+        "confidence": 0.9,
+        "attack_types": [],
+        "matched_signals": [],
+        "is_injection": False,
+    }
+
+
+def _repair(user_prompt: str, rng: random.Random) -> object:
+    # The fake cannot correct anything; it returns the JSON it was sent.
+    return json.loads(user_prompt.split("JSON to correct:\n", 1)[-1])
+
+
+@functools.cache
+def _handlers() -> dict[str, tuple[str, Callable[[str, random.Random], object]]]:
+    """Map each known system prompt to (name, response builder)."""
+    # Imported lazily: the routers import call_llm, which imports this module.
+    from src.ai_security import PROMPT_INJECTION_DETECTION_PROMPT
+    from src.routers import actions, election, environment, safety
+    from src.utils.structured_output import REPAIR_SYSTEM_PROMPT
+
+    return {
+        environment.ENVIRONMENT_SYSTEM_PROMPT: ("environment", _environment),
+        actions.ACTIONS_SYSTEM_PROMPT: ("actions", _actions),
+        safety.SAFETY_IMPROVE_SYSTEM_PROMPT: ("safety.improve", _improve),
+        safety.STAKEHOLDER_IMPACT_SYSTEM_PROMPT: (
+            "safety.stakeholder_impacts",
+            _stakeholder_impacts,
+        ),
+        safety.SAFETY_PRINCIPLES_SYSTEM_PROMPT: ("safety.principles", _principles),
+        safety.RISK_ASSESSMENT_SYSTEM_PROMPT: ("safety.risk_assessment", _risks),
+        safety.SAFETY_EVALUATION_SYSTEM_PROMPT: ("safety.synthesis", _synthesis),
+        safety.FAST_SAFETY_EVALUATION_SYSTEM_PROMPT: ("safety.fast", _fast_evaluation),
+        safety.BATCHED_SAFETY_IMPROVE_SYSTEM_PROMPT: (
+            "safety.batch.improve",
+            _batched(_improve),
+        ),
+        safety.BATCHED_STAKEHOLDER_IMPACT_SYSTEM_PROMPT: (
+            "safety.batch.stakeholder_impacts",
+            _batched(_stakeholder_impacts),
+        ),
+        safety.BATCHED_SAFETY_PRINCIPLES_SYSTEM_PROMPT: (
+            "safety.batch.principles",
+            _batched(_principles),
+        ),
+        safety.BATCHED_RISK_ASSESSMENT_SYSTEM_PROMPT: (
+            "safety.batch.risk_assessment",
+            _batched(_risks),
+        ),
+        safety.BATCHED_SAFETY_EVALUATION_SYSTEM_PROMPT: (
+            "safety.batch.synthesis",
+            _batched(_synthesis),
+        ),
+        election.ELECTION_SYSTEM_PROMPT: ("election", _election),
+        PROMPT_INJECTION_DETECTION_PROMPT: ("security.injection_check", _injection_check),
+        REPAIR_SYSTEM_PROMPT: ("repair", _repair),
+    }
+
+
+def respond(system_prompt: str, user_prompt: str) -> str:
+    """Return the canned JSON response for a prompt (no latency or failures)."""
+    handler = _handlers().get(system_prompt)
+    if handler is None:
+        raise ValueError("Fake LLM provider has no response for this system prompt")
+    name, build = handler
+    calls[name] += 1
+    return json.dumps(build(user_prompt, _rng(system_prompt, user_prompt)))
+
+
+def sample_latency() -> float:
+    """Draw one simulated response latency, in seconds."""
+    mean = settings.fake_llm_latency_ms / 1000.0
+    spread = settings.fake_llm_latency_stddev_ms / 1000.0
+    distribution = settings.fake_llm_latency_distribution
+    if distribution == "uniform":
+        latency = _latency_rng.uniform(mean - spread, mean + spread)
+    elif distribution == "normal":
+        latency = _latency_rng.gauss(mean, spread)
+    elif distribution == "lognormal" and mean > 0:
+        # Parameterized so the distribution's mean and stddev match the settings.
+        sigma2 = math.log(1 + (spread / mean) ** 2)
+        mu = math.log(mean) - sigma2 / 2
+        latency = _latency_rng.lognormvariate(mu, math.sqrt(sigma2))
+    else:
+        latency = mean
+    return max(0.0, latency)
+
+
+def _maybe_fail() -> None:
+    if settings.fake_llm_failure_rate and _latency_rng.random() < settings.fake_llm_failure_rate:
+        raise FakeProviderError(settings.fake_llm_failure_status)
+
+
+def _malformed(text: str) -> str:
+    """Corrupt a response the way models commonly do (all locally repairable)."""
+    text = re.sub(r'"id": "A(\d+)"', r'"id": "Action \1"', text)
+    text = text.replace('"medium"', '"moderate"')
+    # Trailing commas: in the first nested object, and after the last value.
+    body = text[:-1].replace("}", ",}", 1)
+    return f"```json\n{body},{text[-1]}\n```"
+
+
+def _maybe_malformed(text: str) -> str:
+    if settings.fake_llm_malformed_rate and _latency_rng.random() < settings.fake_llm_malformed_rate:
+        return _malformed(text)
+    return text
+
+
+async def complete(system_prompt: str, user_prompt: str) -> str:
+    """Simulate a blocking provider call."""
+    await asyncio.sleep(sample_latency())
+    _maybe_fail()
+    return _maybe_malformed(respond(system_prompt, user_prompt))
+
+
+async def stream(system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+    """Simulate a streaming provider call.
+
+    About a third of the sampled latency passes before the first chunk; the
+    rest is spread evenly over the remaining chunks.
+    """
+    latency = sample_latency()
+    await asyncio.sleep(latency / 3)
+    _maybe_fail()
+    text = _maybe_malformed(respond(system_prompt, user_prompt))
+    chunks = [text[i : i + 64] for i in range(0, len(text), 64)]
+    for chunk in chunks:
+        yield chunk
+        await asyncio.sleep(latency * 2 / 3 / len(chunks))
@@ -0,0 +1,137 @@
+"""
+Hedged LLM requests, to cut the latency tail of ``call_llm``.
+
+For the stages listed in ``LLM_HEDGE_STAGES`` (dotted-prefix lookup, as for
+retry overrides), a call that has not completed within the stage's recent
+``LLM_HEDGE_QUANTILE`` latency (p95 by default) fires a duplicate request,
+optionally to another provider or model.  Whichever succeeds first is used
+and the other is cancelled.  An entry is ``{}`` to hedge with the same
+route, or ``{"provider": ..., "model": ...}`` for a secondary route::
+
+    LLM_HEDGE_STAGES='{"safety": {}, "election": {"model": "claude-haiku-4-5"}}'
+
+Latencies are tracked per stage in each worker, cancelled requests counting
+with the time they ran; a stage is not hedged until it has
+``LLM_HEDGE_MIN_SAMPLES`` of them.  Hedges are capped at
+``LLM_HEDGE_MAX_RATIO`` of the hedgeable calls made by the worker, so a
+provider-wide slowdown cannot double the load on it.
+"""
+
+import asyncio
+import math
+import time
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from src.config import settings
+from src.utils.metrics import Counter
+from src.utils.retry import stage_setting
+from src.utils.routing import Route
+
+T = TypeVar("T")
+
+HEDGES_FIRED = Counter(
+    "ease_llm_hedges_fired_total",
+    "LLM calls slow enough that a hedge request was sent",
+    ["stage"],
+)
+HEDGES_WON = Counter(
+    "ease_llm_hedges_won_total",
+    "Hedge requests that finished before the original call",
+    ["stage"],
+)
+HEDGES_SUPPRESSED = Counter(
+    "ease_llm_hedges_suppressed_total",
+    "Hedge requests not sent because the hedge budget was used up",
+    ["stage"],
+)
+
+_latencies: dict[str, deque[float]] = defaultdict(
+    lambda: deque(maxlen=settings.llm_hedge_window)
+)
+_calls = 0
+_hedges = 0
+
+
+def hedge_route(stage: str, primary: Route) -> Optional[Route]:
+    """The route to hedge ``stage`` with, or None if it is not hedged."""
+    entry = stage_setting(settings.llm_hedge_stages, stage)
+    if entry is None:
+        return None
+    return Route(
+        provider=entry.get("provider") or primary.provider,
+        model=entry.get("model") or primary.model,
+    )
+
+
+def hedge_delay(stage: str) -> Optional[float]:
+    """Seconds to wait before hedging a ``stage`` call, or None without enough data."""
+    samples = _latencies[stage]
+    if len(samples) < settings.llm_hedge_min_samples:
+        return None
+    ordered = sorted(samples)
+    rank = math.ceil(settings.llm_hedge_quantile * len(ordered)) - 1
+    return max(settings.llm_hedge_min_delay_seconds, ordered[min(rank, len(ordered) - 1)])
+
+
+def _timed(stage: str, call: Awaitable[T]) -> Awaitable[T]:
+    async def run() -> T:
+        started = time.monotonic()
+        try:
+            result = await call
+        except asyncio.CancelledError:
+            # The losing request of a hedged pair is cancelled; its elapsed
+            # time is a lower bound of its latency.  Dropping it would leave
+            # only the faster requests and pull the quantile down.
+            _latencies[stage].append(time.monotonic() - started)
+            raise
+        _latencies[stage].append(time.monotonic() - started)
+        return result
+
+    return run()
+
+
+async def hedged(
+    stage: str, route: Route, call: Callable[[Route], Awaitable[T]]
+) -> tuple[Route, T]:
+    """Run ``call(route)``, hedging it if ``stage`` is configured for hedging.
+
+    Returns the route that served the call and its result.  If both
+    requests fail, the original request's error is raised.
+    """
+    global _calls, _hedges
+    secondary = hedge_route(stage, route)
+    if secondary is None:
+        return route, await call(route)
+
+    _calls += 1
+    primary = asyncio.ensure_future(_timed(stage, call(route)))
+    delay = hedge_delay(stage)
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return route, primary.result()
+        if _hedges >= settings.llm_hedge_max_ratio * _calls:
+            HEDGES_SUPPRESSED.inc(stage=stage)
+            return route, await primary
+
+        _hedges += 1
+        HEDGES_FIRED.inc(stage=stage)
+        hedge = asyncio.ensure_future(_timed(stage, call(secondary)))
+        routes = {primary: route, hedge: secondary}
+        try:
+            pending = set(routes)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            HEDGES_WON.inc(stage=stage)
+                        return routes[task], task.result()
+            return route, primary.result()
+        finally:
+            hedge.cancel()
+    finally:
+        primary.cancel()
@@ -0,0 +1,227 @@
+"""
+Per-stage and per-LLM-call timing, token and cost instrumentation.
+
+Every LLM call and pipeline stage is observed into Prometheus histograms
+(see ``GET /metrics``).  When a request asks for timings, a
+:class:`TimingRecorder` is installed for the duration of that request with
+:func:`record_timings` and collects the same measurements so they can be
+returned alongside the result.
+
+Costs are estimates computed from ``settings.llm_pricing`` (USD per million
+tokens, keyed by model name); models without a pricing entry cost 0.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from src.config import settings
+from src.models.timings import LLMCallTiming, PipelineTimings, StageTiming
+from src.utils.llm_providers import LLMUsage
+from src.utils.metrics import Counter, Histogram
+
+LLM_CALL_SECONDS = Histogram(
+    "ease_llm_call_duration_seconds",
+    "Wall time of LLM calls, including limiter waits and retries",
+    ["stage", "provider", "model"],
+)
+LLM_TTFT_SECONDS = Histogram(
+    "ease_llm_time_to_first_token_seconds",
+    "Time until the first chunk of LLM calls; only streamed calls are observed",
+    ["stage", "provider", "model"],
+)
+LLM_TOKENS = Counter(
+    "ease_llm_tokens_total",
+    "Tokens consumed by LLM calls",
+    ["stage", "kind"],
+)
+PROMPT_TOKENS_SAVED = Counter(
+    "ease_prompt_tokens_saved_total",
+    "Estimated input tokens saved by compact prompt encoding",
+    ["stage"],
+)
+LLM_COST = Counter(
+    "ease_llm_estimated_cost_usd_total",
+    "Estimated LLM spend from settings.llm_pricing",
+    ["stage", "model"],
+)
+STAGE_SECONDS = Histogram(
+    "ease_stage_duration_seconds",
+    "Wall time of EASE pipeline stages",
+    ["stage"],
+)
+
+# Smoothing factor of the per-stage moving average of LLM call wall time.
+_LATENCY_ALPHA = 0.2
+_call_seconds: dict[str, float] = {}
+
+
+def expected_call_seconds(stage: str) -> float:
+    """Recent average wall time of ``stage`` LLM calls in this worker.
+
+    Falls back to ``settings.expected_llm_call_seconds`` before the first call.
+    """
+    return _call_seconds.get(stage, settings.expected_llm_call_seconds)
+
+
+def estimate_cost(model: str, usage: LLMUsage) -> float:
+    """Estimated USD cost of one call, or 0 if the model has no pricing entry."""
+    prices = settings.llm_pricing.get(model)
+    if not prices:
+        return 0.0
+    input_price = prices.get("input", 0.0)
+    total = (
+        usage.uncached_input_tokens * input_price
+        + usage.cached_input_tokens * prices.get("cached_input", input_price)
+        + usage.cache_write_tokens * prices.get("cache_write", 0.0)
+        + usage.output_tokens * prices.get("output", 0.0)
+    )
+    return total / 1_000_000
+
+
+class TimingRecorder:
+    """Collects the stage and LLM call timings of one request."""
+
+    def __init__(self) -> None:
+        self.origin = time.perf_counter()
+        self.stages: list[StageTiming] = []
+        self.calls: list[LLMCallTiming] = []
+
+    def offset(self, at: float) -> float:
+        return round(at - self.origin, 4)
+
+    def summary(self) -> PipelineTimings:
+        calls = sorted(self.calls, key=lambda c: c.started_at)
+        return PipelineTimings(
+            stages=sorted(self.stages, key=lambda s: s.started_at),
+            llm_calls=calls,
+            total_llm_calls=sum(c.outcome == "called" for c in calls),
+            total_input_tokens=sum(c.input_tokens for c in calls),
+            total_cached_input_tokens=sum(c.cached_input_tokens for c in calls),
+            total_output_tokens=sum(c.output_tokens for c in calls),
+            total_prompt_tokens_saved=sum(
+                c.prompt_tokens_saved for c in calls if c.outcome == "called"
+            ),
+            total_estimated_cost_usd=round(sum(c.estimated_cost_usd for c in calls), 6),
+        )
+
+
+_recorder: ContextVar[Optional[TimingRecorder]] = ContextVar(
+    "timing_recorder", default=None
+)
+
+
+@contextmanager
+def record_timings(enabled: bool = True) -> Iterator[Optional[TimingRecorder]]:
+    """Collect timings for everything run inside the block.
+
+    Yields the recorder, or ``None`` when ``enabled`` is false.  Tasks
+    created inside the block inherit it.
+    """
+    if not enabled:
+        yield None
+        return
+    recorder = TimingRecorder()
+    previous = _recorder.get()
+    _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.set(previous)
+
+
+def record_llm_call(
+    *,
+    stage: str,
+    action_id: Optional[str],
+    provider: str,
+    model: str,
+    started: float,
+    usage: Optional[LLMUsage] = None,
+    first_token: Optional[float] = None,
+    tokens_saved: int = 0,
+    deduplicated: bool = False,
+    observe: bool = True,
+) -> None:
+    """Record a finished LLM call that started at ``started`` (perf_counter).
+
+    ``usage`` is ``None`` for responses that did not come from the provider:
+    served from the response cache, or ``deduplicated`` onto an identical
+    call in flight in the same :mod:`call pool <src.utils.call_pool>`.
+    ``first_token`` is only known for streamed calls: non-streamed calls
+    have no time to first token and are left out of ``LLM_TTFT_SECONDS``.
+    ``tokens_saved`` is the prompt encoding's estimated input token saving.
+    With ``observe=False`` the call only goes to the request's timings, for
+    a call whose metrics were already observed where it ran.
+    """
+    now = time.perf_counter()
+    wall = now - started
+    ttft = first_token - started if first_token is not None else None
+    cost = 0.0 if usage is None else estimate_cost(model, usage)
+    if usage is not None and observe:
+        LLM_CALL_SECONDS.observe(wall, stage=stage, provider=provider, model=model)
+        average = _call_seconds.get(stage)
+        _call_seconds[stage] = (
+            wall if average is None else average + _LATENCY_ALPHA * (wall - average)
+        )
+        if ttft is not None:
+            LLM_TTFT_SECONDS.observe(ttft, stage=stage, provider=provider, model=model)
+        LLM_TOKENS.inc(usage.uncached_input_tokens, stage=stage, kind="input")
+        LLM_TOKENS.inc(usage.cached_input_tokens, stage=stage, kind="cached_input")
+        LLM_TOKENS.inc(usage.output_tokens, stage=stage, kind="output")
+        PROMPT_TOKENS_SAVED.inc(tokens_saved, stage=stage)
+        LLM_COST.inc(cost, stage=stage, model=model)
+
+    recorder = _recorder.get()
+    if recorder is None:
+        return
+    if usage is not None:
+        outcome = "called"
+    else:
+        outcome = "deduplicated" if deduplicated else "cache_hit"
+    usage = usage or LLMUsage()
+    recorder.calls.append(
+        LLMCallTiming(
+            stage=stage,
+            action_id=action_id,
+            provider=provider,
+            model=model,
+            started_at=recorder.offset(started),
+            wall_seconds=round(wall, 4),
+            time_to_first_token_seconds=round(ttft, 4) if ttft is not None else None,
+            input_tokens=usage.input_tokens,
+            cached_input_tokens=usage.cached_input_tokens,
+            output_tokens=usage.output_tokens,
+            prompt_tokens_saved=tokens_saved,
+            estimated_cost_usd=round(cost, 6),
+            outcome=outcome,
+            cache_hit=outcome == "cache_hit",
+        )
+    )
+
+
+def record_stage(stage: str, started: float, finished: Optional[float] = None) -> None:
+    """Record a pipeline stage that ran from ``started`` to ``finished`` (perf_counter)."""
+    if finished is None:
+        finished = time.perf_counter()
+    STAGE_SECONDS.observe(finished - started, stage=stage)
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.stages.append(
+            StageTiming(
+                stage=stage,
+                started_at=recorder.offset(started),
+                wall_seconds=round(finished - started, 4),
+            )
+        )
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Time the enclosed block as pipeline stage ``stage``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, started)
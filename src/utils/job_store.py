@@ -0,0 +1,200 @@
+"""
+SQLite-backed store for asynchronous EASE jobs.
+
+The database file (``JOB_STORE_PATH``) is shared by every uvicorn worker on
+the host, so any worker can answer a status/result poll or record a cancel
+request for a job that another worker is running.
+
+Queued and running jobs hold a lease that their worker renews while it is
+alive; a job whose lease lapses (its worker process died) is marked failed
+by the next worker to check, instead of being reported as running forever.
+"""
+
+import asyncio
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from src.models.jobs import JobInfo, JobStatus
+
+_TERMINAL: tuple[JobStatus, ...] = ("succeeded", "failed", "cancelled")
+
+
+class JobStore:
+    """Persistent job records: status, request, result and cancel flag."""
+
+    def __init__(self, path: str, ttl_seconds: float, lease_seconds: float = 30.0):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " request TEXT NOT NULL,"
+                " result TEXT,"
+                " error TEXT,"
+                " cancel_requested INTEGER NOT NULL DEFAULT 0,"
+                " created_at REAL NOT NULL,"
+                " started_at REAL,"
+                " finished_at REAL,"
+                " lease_expires_at REAL)"
+            )
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "lease_expires_at" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN lease_expires_at REAL")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # -- sync implementations (run in a thread) -------------------------------
+
+    def _create(self, request_json: str) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (now - self.ttl_seconds,),
+            )
+            conn.execute(
+                "INSERT INTO jobs (id, status, request, created_at, lease_expires_at)"
+                " VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, request_json, now, now + self.lease_seconds),
+            )
+        return job_id
+
+    def _get(self, job_id: str) -> Optional[sqlite3.Row]:
+        with self._connect() as conn:
+            return conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def _mark_running(self, job_id: str) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, lease_expires_at = ?"
+                " WHERE id = ? AND status = 'queued' AND cancel_requested = 0",
+                (now, now + self.lease_seconds, job_id),
+            )
+        return cursor.rowcount == 1
+
+    def _finish(
+        self,
+        job_id: str,
+        status: JobStatus,
+        result: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?"
+                " WHERE id = ? AND status NOT IN ('succeeded', 'failed', 'cancelled')",
+                (status, result, error, time.time(), job_id),
+            )
+
+    def _request_cancel(self, job_id: str) -> None:
+        # Queued jobs are cancelled on the spot; running ones are flagged and
+        # stopped by whichever worker is running them.
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ?"
+                " WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+
+    def _cancel_requested(self, job_ids: list[str]) -> list[str]:
+        if not job_ids:
+            return []
+        placeholders = ",".join("?" for _ in job_ids)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT id FROM jobs WHERE cancel_requested = 1 AND id IN ({placeholders})",
+                job_ids,
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def _renew(self, job_ids: list[str]) -> None:
+        if not job_ids:
+            return
+        placeholders = ",".join("?" for _ in job_ids)
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET lease_expires_at = ?"
+                f" WHERE status IN ('queued', 'running') AND id IN ({placeholders})",
+                [time.time() + self.lease_seconds, *job_ids],
+            )
+
+    def _expire_stale(self) -> int:
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Worker lost', finished_at = ?"
+                " WHERE status IN ('queued', 'running') AND lease_expires_at < ?",
+                (now, now),
+            )
+        return cursor.rowcount
+
+    # -- async API -------------------------------------------------------------
+
+    async def create(self, request_json: str) -> str:
+        """Record a new queued job and return its id."""
+        return await asyncio.to_thread(self._create, request_json)
+
+    async def get(self, job_id: str) -> Optional[JobInfo]:
+        row = await asyncio.to_thread(self._get, job_id)
+        if row is None:
+            return None
+        return JobInfo(
+            job_id=row["id"],
+            status=row["status"],
+            created_at=row["created_at"],
+            started_at=row["started_at"],
+            finished_at=row["finished_at"],
+            error=row["error"],
+        )
+
+    async def get_result(self, job_id: str) -> Optional[str]:
+        row = await asyncio.to_thread(self._get, job_id)
+        return row["result"] if row is not None else None
+
+    async def mark_running(self, job_id: str) -> bool:
+        """Move a queued job to running; False if it was cancelled meanwhile."""
+        return await asyncio.to_thread(self._mark_running, job_id)
+
+    async def finish(
+        self,
+        job_id: str,
+        status: JobStatus,
+        result: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        """Record a terminal state (ignored if the job already has one)."""
+        await asyncio.to_thread(self._finish, job_id, status, result, error)
+
+    async def request_cancel(self, job_id: str) -> None:
+        """Cancel a queued job, or flag a running one for cancellation."""
+        await asyncio.to_thread(self._request_cancel, job_id)
+
+    async def cancel_requested(self, job_ids: list[str]) -> list[str]:
+        """Return the subset of ``job_ids`` that have a pending cancel request."""
+        return await asyncio.to_thread(self._cancel_requested, job_ids)
+
+    async def renew(self, job_ids: list[str]) -> None:
+        """Extend the leases of this worker's queued and running jobs."""
+        await asyncio.to_thread(self._renew, job_ids)
+
+    async def expire_stale(self) -> int:
+        """Mark jobs whose lease lapsed as failed; returns how many there were."""
+        return await asyncio.to_thread(self._expire_stale)
+
+    @staticmethod
+    def is_terminal(status: JobStatus) -> bool:
+        return status in _TERMINAL
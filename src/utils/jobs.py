@@ -0,0 +1,146 @@
+"""
+Bounded background executor for asynchronous jobs.
+
+Each worker process runs ``max_workers`` job tasks fed from a queue of at
+most ``queue_depth`` pending jobs; :meth:`JobExecutor.submit` raises
+:class:`QueueFullError` when the queue is full so the API can answer 429.
+Job state lives in a :class:`~src.utils.job_store.JobStore` shared by all
+worker processes.  Every ``cancel_poll_seconds`` the executor renews the
+leases of its own jobs and fails those of dead workers.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+from src.utils.job_store import JobStore
+
+logger = logging.getLogger(__name__)
+
+# Runs one job: takes the stored request JSON, returns the result JSON.
+JobFn = Callable[[str], Awaitable[str]]
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the executor's queue is full."""
+
+
+class JobExecutor:
+    def __init__(
+        self,
+        store: JobStore,
+        run: JobFn,
+        max_workers: int,
+        queue_depth: int,
+        cancel_poll_seconds: float = 1.0,
+    ):
+        self.store = store
+        self.run = run
+        self.max_workers = max_workers
+        self.cancel_poll_seconds = cancel_poll_seconds
+        self._queue: asyncio.Queue[tuple[str, str]] = asyncio.Queue(maxsize=queue_depth)
+        self._running: dict[str, asyncio.Task] = {}
+        self._queued: set[str] = set()
+        self._workers: list[asyncio.Task] = []
+        self._poller: Optional[asyncio.Task] = None
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def running(self) -> int:
+        return len(self._running)
+
+    async def start(self) -> None:
+        expired = await self.store.expire_stale()
+        if expired:
+            logger.warning("Marked %d jobs of dead workers as failed", expired)
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.max_workers)
+        ]
+        self._poller = asyncio.create_task(self._poll_cancellations())
+
+    async def stop(self) -> None:
+        """Stop all workers; unfinished jobs of this process are marked failed."""
+        pending = list(self._running)
+        tasks = [*self._workers, *self._running.values()]
+        if self._poller is not None:
+            tasks.append(self._poller)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait()[0])
+        for job_id in pending:
+            await self.store.finish(job_id, "failed", error="Worker shut down")
+        self._running.clear()
+        self._queued.clear()
+        self._workers = []
+        self._poller = None
+
+    async def submit(self, request_json: str) -> str:
+        """Queue a job and return its id.
+
+        Raises:
+            QueueFullError: If ``queue_depth`` jobs are already waiting.
+        """
+        if self._queue.full():
+            raise QueueFullError("Job queue is full")
+        job_id = await self.store.create(request_json)
+        try:
+            self._queue.put_nowait((job_id, request_json))
+            self._queued.add(job_id)
+        except asyncio.QueueFull:
+            await self.store.finish(job_id, "failed", error="Job queue is full")
+            raise QueueFullError("Job queue is full")
+        return job_id
+
+    async def cancel(self, job_id: str) -> None:
+        """Cancel a job, wherever it is queued or running."""
+        await self.store.request_cancel(job_id)
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+
+    async def _worker(self) -> None:
+        while True:
+            job_id, request_json = await self._queue.get()
+            self._queued.discard(job_id)
+            if not await self.store.mark_running(job_id):
+                continue  # cancelled while queued
+
+            task = asyncio.create_task(self.run(request_json))
+            self._running[job_id] = task
+            try:
+                result = await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    raise  # the worker itself is being stopped
+                await self.store.finish(job_id, "cancelled")
+            except Exception as e:
+                logger.exception("Job %s failed", job_id)
+                detail = getattr(e, "detail", None) or str(e) or type(e).__name__
+                await self.store.finish(job_id, "failed", error=str(detail))
+            else:
+                await self.store.finish(job_id, "succeeded", result=result)
+            finally:
+                self._running.pop(job_id, None)
+
+    async def _poll_cancellations(self) -> None:
+        """Pick up cancel requests recorded by other worker processes.
+
+        Also renews this worker's job leases and fails jobs whose worker died.
+        """
+        while True:
+            await asyncio.sleep(self.cancel_poll_seconds)
+            try:
+                await self.store.renew([*self._running, *self._queued])
+                await self.store.expire_stale()
+                for job_id in await self.store.cancel_requested(list(self._running)):
+                    task = self._running.get(job_id)
+                    if task is not None:
+                        task.cancel()
+            except Exception:
+                logger.exception("Polling for job cancellations failed")
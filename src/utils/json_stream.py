@@ -0,0 +1,96 @@
+from typing import Any, AsyncIterable, AsyncIterator
+
+from src.utils.structured_output import extract_json
+
+
+class _ArrayScanner:
+    """Incremental scanner that cuts complete elements out of a JSON array.
+
+    Feed it text as it arrives; it tracks string/escape state and nesting
+    depth so it can tell where each top-level element of the array ends.
+    Anything before the opening ``[`` (such as a stray markdown fence) is
+    ignored.
+    """
+
+    def __init__(self) -> None:
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._element: list[str] = []
+
+    def feed(self, text: str) -> list[str]:
+        """Consume ``text`` and return the raw JSON of each completed element."""
+        completed: list[str] = []
+        for ch in text:
+            if self._finished:
+                break
+            if not self._started:
+                if ch == "[":
+                    self._started = True
+                continue
+
+            if self._in_string:
+                self._element.append(ch)
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if self._depth == 0 and ch in ",]":
+                element = "".join(self._element).strip()
+                if element:
+                    completed.append(element)
+                self._element = []
+                if ch == "]":
+                    self._finished = True
+                continue
+
+            self._element.append(ch)
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    # Emit containers as soon as they close, without waiting
+                    # for the following comma.
+                    completed.append("".join(self._element).strip())
+                    self._element = []
+        return completed
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+
+async def iter_json_array(chunks: AsyncIterable[str]) -> AsyncIterator[Any]:
+    """Parse a streamed JSON array, yielding each element as soon as it is complete.
+
+    Args:
+        chunks: Text chunks of a response whose payload is a JSON array.
+
+    Yields:
+        Each decoded top-level element, in order.  Elements are decoded with
+        the tolerant :func:`~src.utils.structured_output.extract_json`, so
+        trailing commas inside them are accepted.
+
+    Raises:
+        ValueError: If an element is malformed beyond that, or the stream
+            ends before the array is closed.
+    """
+    scanner = _ArrayScanner()
+    async for chunk in chunks:
+        # Keep draining after the array closes so the source stream runs to
+        # completion (it caches and records the response once exhausted).
+        if scanner.finished:
+            continue
+        for element in scanner.feed(chunk):
+            yield extract_json(element)
+    if not scanner.finished:
+        raise ValueError("Stream ended before the JSON array was closed")
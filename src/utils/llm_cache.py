@@ -0,0 +1,207 @@
+"""
+Response cache for ``call_llm``.
+
+Two tiers:
+    - an in-memory LRU, private to each worker process, and
+    - an optional SQLite file (``LLM_CACHE_PATH``) shared by every worker on
+      the host, so a response cached by one uvicorn worker is a hit for all.
+
+Entries expire after ``LLM_CACHE_TTL_SECONDS``.  Caching is off unless
+``LLM_CACHE_ENABLED`` is true, and can be bypassed for a single request with
+:func:`bypass_cache`.
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Iterator, Optional
+
+from src.config import settings
+from src.utils.metrics import Counter
+
+CACHE_LOOKUPS = Counter(
+    "ease_llm_cache_lookups_total",
+    "LLM response cache lookups in this worker",
+    ["result"],
+)
+
+_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+# Prune expired / excess rows from the SQLite tier every N writes.
+_DISK_PRUNE_INTERVAL = 100
+
+
+def make_key(*parts: str) -> str:
+    """Build a cache key from the parts that determine an LLM response."""
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def bypass_cache(enabled: bool = True) -> Iterator[None]:
+    """Skip the response cache for LLM calls made inside this block.
+
+    A no-op when ``enabled`` is false, so nested stages cannot re-enable
+    caching that an outer request turned off.
+    """
+    if not enabled:
+        yield
+        return
+    previous = _bypass.get()
+    _bypass.set(True)
+    try:
+        yield
+    finally:
+        # Restore by value rather than token: the block may span yields of
+        # an async generator that is finalized from a different context.
+        _bypass.set(previous)
+
+
+def cache_active() -> bool:
+    """Whether LLM calls in the current context should use the cache."""
+    return settings.llm_cache_enabled and not _bypass.get()
+
+
+class ResponseCache:
+    """Two-tier (memory LRU + optional SQLite) TTL cache of LLM responses."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        path: Optional[str] = None,
+        disk_max_entries: int = 100_000,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path or None
+        self.disk_max_entries = disk_max_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._writes = 0
+        if self.path:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    " key TEXT PRIMARY KEY,"
+                    " value TEXT NOT NULL,"
+                    " expires_at REAL NOT NULL)"
+                )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A connection that commits on success and is closed on exit."""
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # -- memory tier ---------------------------------------------------------
+
+    def _memory_get(self, key: str, now: float) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= now:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _memory_set(self, key: str, value: str, expires_at: float) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    # -- disk tier -----------------------------------------------------------
+
+    def _disk_get(self, key: str, now: float) -> Optional[tuple[float, str]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT expires_at, value FROM llm_cache WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+        return row
+
+    def _disk_set(self, key: str, value: str, expires_at: float, prune: bool) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            if prune:
+                conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    " SELECT key FROM llm_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_max_entries,),
+                )
+
+    # -- public API ----------------------------------------------------------
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached response for ``key``, or None (counted as a miss)."""
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is None and self.path:
+            row = await asyncio.to_thread(self._disk_get, key, now)
+            if row is not None:
+                expires_at, value = row
+                self._memory_set(key, value, expires_at)
+        if value is None:
+            self.misses += 1
+            CACHE_LOOKUPS.inc(result="miss")
+        else:
+            self.hits += 1
+            CACHE_LOOKUPS.inc(result="hit")
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        """Store ``value`` under ``key`` in every configured tier."""
+        expires_at = time.time() + self.ttl_seconds
+        self._memory_set(key, value, expires_at)
+        if self.path:
+            self._writes += 1
+            prune = self._writes % _DISK_PRUNE_INTERVAL == 0
+            await asyncio.to_thread(self._disk_set, key, value, expires_at, prune)
+
+    def clear_memory(self) -> None:
+        self._memory.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this worker process."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+_cache: Optional[ResponseCache] = None
+
+
+def get_cache() -> ResponseCache:
+    """Return this process's response cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache(
+            max_entries=settings.llm_cache_max_entries,
+            ttl_seconds=settings.llm_cache_ttl_seconds,
+            path=settings.llm_cache_path,
+            disk_max_entries=settings.llm_cache_disk_max_entries,
+        )
+    return _cache
@@ -0,0 +1,549 @@
+"""
+Provider adapters for ``call_llm``.
+
+Holds the pooled SDK clients (one per provider per worker process) and the
+per-provider request building, response parsing and streaming.  Callers
+should use :mod:`src.utils.call_llm`, which adds caching and logging on top.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterable, Optional, Sequence, Union
+
+import httpx
+
+from src.config import settings
+from src.utils import fake_llm
+
+SUPPORTED_PROVIDERS = ("anthropic", "openai", "google", "fake")
+
+
+@dataclass(frozen=True)
+class PromptSegment:
+    """A piece of a user prompt.
+
+    Segments marked ``cacheable`` form the static prefix of the prompt (for
+    example the environment shared by every safety sub-call).  They must
+    come before the variable segments; everything up to and including the
+    last cacheable segment is offered to the provider's prompt cache.
+    ``tokens_saved`` is the estimated saving from compact encoding of the
+    data in the segment (see :mod:`src.utils.prompt_encoding`).
+    """
+
+    text: str
+    cacheable: bool = False
+    tokens_saved: int = 0
+
+
+UserPrompt = Union[str, Sequence[PromptSegment]]
+
+
+@dataclass
+class LLMUsage:
+    """Token usage reported by the provider for one call.
+
+    ``input_tokens`` is the total prompt size; ``cached_input_tokens`` is
+    the part served from the provider's prompt cache.
+    """
+
+    input_tokens: int = 0
+    cached_input_tokens: int = 0
+    cache_write_tokens: int = 0
+    output_tokens: int = 0
+
+    @property
+    def uncached_input_tokens(self) -> int:
+        return self.input_tokens - self.cached_input_tokens
+
+
+class OutputTruncatedError(Exception):
+    """The response hit its output token limit before it was complete."""
+
+    def __init__(self, max_tokens: int, text: str = ""):
+        super().__init__(f"LLM response truncated at max_tokens={max_tokens}")
+        self.max_tokens = max_tokens
+        self.text = text
+
+
+def _segments(user_prompt: UserPrompt) -> list[PromptSegment]:
+    if isinstance(user_prompt, str):
+        return [PromptSegment(user_prompt)]
+    return list(user_prompt)
+
+
+def prompt_text(user_prompt: UserPrompt) -> str:
+    """Flatten a user prompt to plain text."""
+    if isinstance(user_prompt, str):
+        return user_prompt
+    return "".join(segment.text for segment in user_prompt)
+
+
+def _last_cacheable(segments: Sequence[PromptSegment]) -> int:
+    """Index of the last cacheable segment, or -1 if there is none."""
+    return max(
+        (i for i, segment in enumerate(segments) if segment.cacheable), default=-1
+    )
+
+
+def _cacheable_prefix(user_prompt: UserPrompt) -> str:
+    segments = _segments(user_prompt)
+    return "".join(
+        segment.text for segment in segments[: _last_cacheable(segments) + 1]
+    )
+
+
+# ---------------------------------------------------------------------------
+# Client pool
+#
+# Long-lived SDK clients, one per provider, shared by every request in this
+# worker process.  Created by ``init_clients`` from the FastAPI lifespan (or
+# lazily on first use) and closed by ``close_clients`` on shutdown.
+# ---------------------------------------------------------------------------
+
+_clients: dict[str, Any] = {}
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.llm_max_connections,
+        max_keepalive_connections=settings.llm_max_keepalive_connections,
+        keepalive_expiry=settings.llm_keepalive_expiry,
+    )
+
+
+def api_key_for(provider: str) -> str:
+    """The API key for ``provider``: its ``LLM_API_KEYS`` entry, else ``LLM_API_KEY``."""
+    return settings.llm_api_keys.get(provider) or settings.llm_api_key
+
+
+def _create_client(provider: str) -> Any:
+    if provider == "anthropic":
+        import anthropic
+
+        return anthropic.AsyncAnthropic(
+            api_key=api_key_for(provider),
+            max_retries=0,  # retried by src.utils.retry
+            http_client=anthropic.DefaultAsyncHttpxClient(
+                limits=_http_limits(), timeout=settings.llm_timeout
+            ),
+        )
+    elif provider == "openai":
+        import openai
+
+        return openai.AsyncOpenAI(
+            api_key=api_key_for(provider),
+            max_retries=0,  # retried by src.utils.retry
+            http_client=openai.DefaultAsyncHttpxClient(
+                limits=_http_limits(), timeout=settings.llm_timeout
+            ),
+        )
+    elif provider == "google":
+        from google import genai
+        from google.genai import types
+
+        return genai.Client(
+            api_key=api_key_for(provider),
+            http_options=types.HttpOptions(
+                timeout=int(settings.llm_timeout * 1000),
+                async_client_args={"limits": _http_limits()},
+            ),
+        )
+    else:
+        raise ValueError(f"Unsupported LLM provider: {provider!r}")
+
+
+def _get_client(provider: str) -> Any:
+    client = _clients.get(provider)
+    if client is None:
+        client = _clients[provider] = _create_client(provider)
+    return client
+
+
+async def init_clients(providers: Iterable[str]) -> None:
+    """Create the pooled clients for the configured providers.
+
+    Called once per worker from the FastAPI lifespan so the first request
+    does not pay for SDK import and connection-pool setup.
+    """
+    for provider in providers:
+        if provider != "fake":
+            _get_client(provider)
+
+
+async def close_clients() -> None:
+    """Close every pooled client and release its connections."""
+    while _clients:
+        provider, client = _clients.popitem()
+        if provider == "google":
+            await client.aio.aclose()
+        else:
+            await client.close()
+
+
+# ---------------------------------------------------------------------------
+# Dispatch
+# ---------------------------------------------------------------------------
+
+async def complete(
+    provider: str,
+    model: str,
+    system_prompt: str,
+    user_prompt: UserPrompt,
+    max_tokens: int,
+    json_schema: Optional[dict] = None,
+) -> tuple[str, LLMUsage]:
+    """Send one request to ``provider`` and return (text, usage).
+
+    With ``json_schema`` (an object schema, see
+    :mod:`src.utils.structured_output`) the provider's native structured
+    output constrains the response to JSON matching it.
+
+    Raises :class:`OutputTruncatedError` if the response is cut off at
+    ``max_tokens`` output tokens.
+    """
+    args = (model, system_prompt, user_prompt, max_tokens, json_schema)
+    if provider == "anthropic":
+        return await _complete_anthropic(*args)
+    elif provider == "openai":
+        return await _complete_openai(*args)
+    elif provider == "google":
+        return await _complete_google(*args)
+    elif provider == "fake":
+        return await _complete_fake(system_prompt, user_prompt, max_tokens)
+    else:
+        raise ValueError(f"Unsupported LLM provider: {provider!r}")
+
+
+def stream(
+    provider: str,
+    model: str,
+    system_prompt: str,
+    user_prompt: UserPrompt,
+    usage: LLMUsage,
+    max_tokens: int,
+) -> AsyncIterator[str]:
+    """Stream text chunks from ``provider``; ``usage`` is filled in at the end.
+
+    Raises :class:`OutputTruncatedError` after the last chunk if the
+    response was cut off at ``max_tokens`` output tokens.
+    """
+    if provider == "anthropic":
+        return _stream_anthropic(model, system_prompt, user_prompt, usage, max_tokens)
+    elif provider == "openai":
+        return _stream_openai(model, system_prompt, user_prompt, usage, max_tokens)
+    elif provider == "google":
+        return _stream_google(model, system_prompt, user_prompt, usage, max_tokens)
+    elif provider == "fake":
+        return _stream_fake(system_prompt, user_prompt, usage, max_tokens)
+    else:
+        raise ValueError(f"Unsupported LLM provider: {provider!r}")
+
+
+# ---------------------------------------------------------------------------
+# Anthropic
+# ---------------------------------------------------------------------------
+
+def _anthropic_request(
+    model: str, system_prompt: str, user_prompt: UserPrompt, max_tokens: int
+) -> dict:
+    # The system prompt and the cacheable user prefix each get a
+    # ``cache_control`` breakpoint so repeated calls reuse the cached prefix.
+    segments = _segments(user_prompt)
+    last_cacheable = _last_cacheable(segments)
+    content = []
+    for i, segment in enumerate(segments):
+        block = {"type": "text", "text": segment.text}
+        if i == last_cacheable:
+            block["cache_control"] = {"type": "ephemeral"}
+        content.append(block)
+
+    return {
+        "model": model,
+        "max_tokens": max_tokens,
+        "system": [
+            {
+                "type": "text",
+                "text": system_prompt,
+                "cache_control": {"type": "ephemeral"},
+            }
+        ],
+        "messages": [{"role": "user", "content": content}],
+    }
+
+
+_RESPONSE_TOOL = "respond"
+
+
+def _anthropic_text(message: Any) -> str:
+    for block in message.content:
+        if block.type == "tool_use" and block.name == _RESPONSE_TOOL:
+            return json.dumps(block.input)
+    return "".join(block.text for block in message.content if block.type == "text")
+
+
+def _anthropic_usage(raw: Any, usage: LLMUsage) -> None:
+    cache_read = raw.cache_read_input_tokens or 0
+    cache_write = raw.cache_creation_input_tokens or 0
+    usage.input_tokens = raw.input_tokens + cache_read + cache_write
+    usage.cached_input_tokens = cache_read
+    usage.cache_write_tokens = cache_write
+    usage.output_tokens = raw.output_tokens
+
+
+async def _complete_anthropic(
+    model: str,
+    system_prompt: str,
+    user_prompt: UserPrompt,
+    max_tokens: int,
+    json_schema: Optional[dict],
+) -> tuple[str, LLMUsage]:
+    client = _get_client("anthropic")
+    request = _anthropic_request(model, system_prompt, user_prompt, max_tokens)
+    if json_schema is not None:
+        # Structured output via a forced tool call whose input is the response.
+        request["tools"] = [
+            {
+                "name": _RESPONSE_TOOL,
+                "description": "Return the response.",
+                "input_schema": json_schema,
+            }
+        ]
+        request["tool_choice"] = {"type": "tool", "name": _RESPONSE_TOOL}
+    message = await client.messages.create(**request)
+    usage = LLMUsage()
+    _anthropic_usage(message.usage, usage)
+    text = _anthropic_text(message)
+    if message.stop_reason == "max_tokens":
+        raise OutputTruncatedError(max_tokens, text)
+    return text, usage
+
+
+async def _stream_anthropic(
+    model: str,
+    system_prompt: str,
+    user_prompt: UserPrompt,
+    usage: LLMUsage,
+    max_tokens: int,
+) -> AsyncIterator[str]:
+    client = _get_client("anthropic")
+    async with client.messages.stream(
+        **_anthropic_request(model, system_prompt, user_prompt, max_tokens)
+    ) as response:
+        async for text in response.text_stream:
+            yield text
+        message = await response.get_final_message()
+    _anthropic_usage(message.usage, usage)
+    if message.stop_reason == "max_tokens":
+        raise OutputTruncatedError(max_tokens)
+
+
+# ---------------------------------------------------------------------------
+# OpenAI
+# ---------------------------------------------------------------------------
+
+def _openai_request(
+    model: str, system_prompt: str, user_prompt: UserPrompt, max_tokens: int
+) -> dict:
+    # OpenAI caches identical prompt prefixes automatically; the cache key
+    # routes calls sharing a static prefix to the same cache.
+    cache_key = hashlib.sha256(
+        (system_prompt + _cacheable_prefix(user_prompt)).encode("utf-8")
+    ).hexdigest()[:32]
+    return {
+        "model": model,
+        "reasoning": {"effort": "low"},
+        # Reasoning tokens count against max_output_tokens.
+        "max_output_tokens": max_tokens + settings.llm_reasoning_tokens_allowance,
+        "instructions": system_prompt,
+        "input": prompt_text(user_prompt),
+        "prompt_cache_key": cache_key,
+    }
+
+
+def _openai_truncated(response: Any) -> bool:
+    details = response.incomplete_details
+    return (
+        response.status == "incomplete"
+        and details is not None
+        and details.reason == "max_output_tokens"
+    )
+
+
+def _openai_usage(raw: Any, usage: LLMUsage) -> None:
+    if raw is None:
+        return
+    details = raw.input_tokens_details
+    usage.input_tokens = raw.input_tokens
+    usage.cached_input_tokens = (details.cached_tokens or 0) if details else 0
+    usage.output_tokens = raw.output_tokens
+
+
+async def _complete_openai(
+    model: str,
+    system_prompt: str,
+    user_prompt: UserPrompt,
+    max_tokens: int,
+    json_schema: Optional[dict],
+) -> tuple[str, LLMUsage]:
+    client = _get_client("openai")
+    request = _openai_request(model, system_prompt, user_prompt, max_tokens)
+    if json_schema is not None:
+        # Not strict: strict mode rejects optional fields and open-ended maps.
+        request["text"] = {
+            "format": {
+                "type": "json_schema",
+                "name": "response",
+                "schema": json_schema,
+                "strict": False,
+            }
+        }
+    response = await client.responses.create(**request)
+    usage = LLMUsage()
+    _openai_usage(response.usage, usage)
+    if _openai_truncated(response):
+        raise OutputTruncatedError(max_tokens, response.output_text)
+    return response.output_text, usage
+
+
+async def _stream_openai(
+    model: str,
+    system_prompt: str,
+    user_prompt: UserPrompt,
+    usage: LLMUsage,
+    max_tokens: int,
+) -> AsyncIterator[str]:
+    client = _get_client("openai")
+    events = await client.responses.create(
+        **_openai_request(model, system_prompt, user_prompt, max_tokens), stream=True
+    )
+    async for event in events:
+        if event.type == "response.output_text.delta":
+            yield event.delta
+        elif event.type in ("response.completed", "response.incomplete"):
+            _openai_usage(event.response.usage, usage)
+            if _openai_truncated(event.response):
+                raise OutputTruncatedError(max_tokens)
+
+
+# ---------------------------------------------------------------------------
+# Google
+# ---------------------------------------------------------------------------
+
+def _google_request(
+    model: str, system_prompt: str, user_prompt: UserPrompt, max_tokens: int
+) -> dict:
+    # Gemini applies implicit prefix caching; keeping the static segments
+    # first in ``contents`` lets repeated calls hit it.
+    from google.genai import types
+
+    return {
+        "model": model,
+        "contents": [segment.text for segment in _segments(user_prompt)],
+        "config": types.GenerateContentConfig(
+            system_instruction=system_prompt,
+            # Thinking tokens count against max_output_tokens.
+            max_output_tokens=max_tokens + settings.llm_reasoning_tokens_allowance,
+        ),
+    }
+
+
+def _google_truncated(response: Any) -> bool:
+    from google.genai import types
+
+    candidates = response.candidates or []
+    return bool(candidates) and candidates[0].finish_reason == types.FinishReason.MAX_TOKENS
+
+
+def _google_usage(raw: Any, usage: LLMUsage) -> None:
+    if raw is None:
+        return
+    usage.input_tokens = raw.prompt_token_count or 0
+    usage.cached_input_tokens = raw.cached_content_token_count or 0
+    usage.output_tokens = raw.candidates_token_count or 0
+
+
+async def _complete_google(
+    model: str,
+    system_prompt: str,
+    user_prompt: UserPrompt,
+    max_tokens: int,
+    json_schema: Optional[dict],
+) -> tuple[str, LLMUsage]:
+    client = _get_client("google")
+    request = _google_request(model, system_prompt, user_prompt, max_tokens)
+    if json_schema is not None:
+        request["config"].response_mime_type = "application/json"
+        request["config"].response_json_schema = json_schema
+    response = await client.aio.models.generate_content(**request)
+    usage = LLMUsage()
+    _google_usage(response.usage_metadata, usage)
+    if _google_truncated(response):
+        raise OutputTruncatedError(max_tokens, response.text or "")
+    return response.text, usage
+
+
+async def _stream_google(
+    model: str,
+    system_prompt: str,
+    user_prompt: UserPrompt,
+    usage: LLMUsage,
+    max_tokens: int,
+) -> AsyncIterator[str]:
+    client = _get_client("google")
+    chunks = await client.aio.models.generate_content_stream(
+        **_google_request(model, system_prompt, user_prompt, max_tokens)
+    )
+    truncated = False
+    async for chunk in chunks:
+        if chunk.text:
+            yield chunk.text
+        if chunk.usage_metadata is not None:
+            _google_usage(chunk.usage_metadata, usage)
+        truncated = truncated or _google_truncated(chunk)
+    if truncated:
+        raise OutputTruncatedError(max_tokens)
+
+
+# ---------------------------------------------------------------------------
+# Fake (offline testing and benchmarks)
+# ---------------------------------------------------------------------------
+
+def _fake_usage(
+    system_prompt: str, user_prompt: UserPrompt, text: str, usage: LLMUsage
+) -> None:
+    # Approximate token counts at ~4 characters per token.
+    usage.input_tokens = (len(system_prompt) + len(prompt_text(user_prompt))) // 4
+    usage.output_tokens = len(text) // 4
+
+
+async def _complete_fake(
+    system_prompt: str, user_prompt: UserPrompt, max_tokens: int
+) -> tuple[str, LLMUsage]:
+    text = await fake_llm.complete(system_prompt, prompt_text(user_prompt))
+    # Cut off at the budget like a real provider would.
+    limit = max_tokens * 4
+    usage = LLMUsage()
+    _fake_usage(system_prompt, user_prompt, text[:limit], usage)
+    if len(text) > limit:
+        raise OutputTruncatedError(max_tokens, text[:limit])
+    return text, usage
+
+
+async def _stream_fake(
+    system_prompt: str, user_prompt: UserPrompt, usage: LLMUsage, max_tokens: int
+) -> AsyncIterator[str]:
+    limit = max_tokens * 4
+    chunks: list[str] = []
+    received = 0
+    async for chunk in fake_llm.stream(system_prompt, prompt_text(user_prompt)):
+        truncated = received + len(chunk) > limit
+        chunk = chunk[: limit - received]
+        received += len(chunk)
+        chunks.append(chunk)
+        if chunk:
+            yield chunk
+        if truncated:
+            _fake_usage(system_prompt, user_prompt, "".join(chunks), usage)
+            raise OutputTruncatedError(max_tokens)
+    _fake_usage(system_prompt, user_prompt, "".join(chunks), usage)
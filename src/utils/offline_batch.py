@@ -0,0 +1,376 @@
+"""
+Offline execution of EASE runs through a provider batch API.
+
+Providers' asynchronous batch APIs are cheaper than their online APIs and
+have separate quotas, at the cost of results arriving minutes to hours
+later.  In offline mode (``python -m src.offline``) the pipeline code runs
+unchanged; inside an :class:`OfflineSession`, ``call_llm`` and
+``stream_llm`` hand their prompts to the session instead of the provider
+and wait for the answer.
+
+The session drives runs as a resumable state machine:
+    - collecting: the runs go as far as they can; once no new LLM call has
+      been made for ``OFFLINE_COLLECT_SECONDS``, every waiting call is
+      submitted to the :class:`BatchBackend` as one batch,
+    - waiting: the batch is polled every ``OFFLINE_POLL_SECONDS`` until its
+      results arrive, then the calls waiting on it resume, and the runs
+      collect their next calls,
+    - done: every run has finished.
+
+Submitted batches and their results are recorded in a :class:`Journal`
+(SQLite, one file per run id).  Restarting an interrupted session with the
+same run id replays the runs: recorded results are returned immediately,
+and calls whose batch was already submitted wait for that batch instead of
+being submitted again.  Failed calls are not recorded, so they are retried
+on the next restart.
+
+The only backend here is :class:`FileBatchBackend`, a local stand-in that
+keeps batches as JSONL files; a provider backend implements the same two
+methods on the provider's batch API.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Awaitable, Iterator, Optional, TypeVar
+
+from src.config import settings
+from src.utils import llm_providers
+from src.utils.llm_cache import make_key
+from src.utils.llm_providers import LLMUsage, OutputTruncatedError, UserPrompt, prompt_text
+from src.utils.metrics import Counter
+from src.utils.routing import Route
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+BATCHES_SUBMITTED = Counter(
+    "ease_offline_batches_submitted_total",
+    "Batches of LLM calls submitted to the offline batch backend",
+    ["backend"],
+)
+BATCH_CALLS = Counter(
+    "ease_offline_batch_calls_total",
+    "LLM calls answered through the offline batch backend, by outcome",
+    ["outcome"],
+)
+
+
+@dataclass
+class BatchCall:
+    """One LLM request of a batch."""
+
+    custom_id: str
+    provider: str
+    model: str
+    system_prompt: str
+    user_prompt: str
+    max_tokens: int
+    json_schema: Optional[dict] = None
+
+
+@dataclass
+class BatchResult:
+    """The outcome of one :class:`BatchCall`; ``error`` is set if it failed."""
+
+    text: str = ""
+    truncated: bool = False
+    input_tokens: int = 0
+    output_tokens: int = 0
+    error: Optional[str] = None
+
+
+class BatchCallError(Exception):
+    """The batch backend reported an error for an LLM call."""
+
+
+class BatchBackend(ABC):
+    """Submits batches of LLM calls and fetches their results."""
+
+    name: str
+
+    @abstractmethod
+    async def submit(self, calls: list[BatchCall]) -> str:
+        """Submit ``calls`` as one batch and return its id."""
+
+    @abstractmethod
+    async def results(self, batch_id: str) -> Optional[dict[str, BatchResult]]:
+        """Results of a batch keyed by ``custom_id``, or None while it is running."""
+
+
+class FileBatchBackend(BatchBackend):
+    """Local stand-in for a provider batch API, for offline runs and testing.
+
+    A batch is a directory under ``directory`` holding ``input.jsonl`` (one
+    :class:`BatchCall` per line).  Its results are ``output.jsonl`` (one
+    ``{"custom_id", ...BatchResult}`` per line), written by whoever
+    processes the batch.  Unless ``turnaround_seconds`` is negative the
+    backend processes batches itself that long after submission, sending
+    each call to its provider's online API; use it with the fake provider.
+    """
+
+    name = "file"
+
+    def __init__(self, directory: str, turnaround_seconds: float):
+        self.directory = Path(directory)
+        self.turnaround_seconds = turnaround_seconds
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _write(self, path: Path, lines: list[dict]) -> None:
+        partial = path.with_suffix(".partial")
+        with open(partial, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(line) + "\n" for line in lines)
+        os.replace(partial, path)
+
+    def _read(self, path: Path) -> list[dict]:
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    async def submit(self, calls: list[BatchCall]) -> str:
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        (self.directory / batch_id).mkdir()
+        await asyncio.to_thread(
+            self._write, self.directory / batch_id / "input.jsonl", [asdict(c) for c in calls]
+        )
+        return batch_id
+
+    async def results(self, batch_id: str) -> Optional[dict[str, BatchResult]]:
+        batch = self.directory / batch_id
+        output = batch / "output.jsonl"
+        if not output.exists():
+            if self.turnaround_seconds < 0:
+                return None
+            submitted = (batch / "input.jsonl").stat().st_mtime
+            if time.time() - submitted < self.turnaround_seconds:
+                return None
+            await self._process(batch)
+        lines = await asyncio.to_thread(self._read, output)
+        return {line.pop("custom_id"): BatchResult(**line) for line in lines}
+
+    async def _process(self, batch: Path) -> None:
+        lines = await asyncio.to_thread(self._read, batch / "input.jsonl")
+        calls = [BatchCall(**line) for line in lines]
+
+        async def answer(call: BatchCall) -> dict:
+            try:
+                text, usage = await llm_providers.complete(
+                    call.provider,
+                    call.model,
+                    call.system_prompt,
+                    call.user_prompt,
+                    call.max_tokens,
+                    call.json_schema,
+                )
+                result = BatchResult(
+                    text=text,
+                    input_tokens=usage.input_tokens,
+                    output_tokens=usage.output_tokens,
+                )
+            except OutputTruncatedError as e:
+                result = BatchResult(text=e.text, truncated=True)
+            except Exception as e:
+                result = BatchResult(error=str(e))
+            return {"custom_id": call.custom_id, **asdict(result)}
+
+        answers = await asyncio.gather(*(answer(call) for call in calls))
+        await asyncio.to_thread(self._write, batch / "output.jsonl", list(answers))
+
+
+def get_backend() -> BatchBackend:
+    """The batch backend selected by ``OFFLINE_BATCH_BACKEND``."""
+    if settings.offline_batch_backend == "file":
+        return FileBatchBackend(
+            settings.offline_batch_dir, settings.offline_file_turnaround_seconds
+        )
+    raise ValueError(f"Unsupported offline batch backend: {settings.offline_batch_backend!r}")
+
+
+class Journal:
+    """Submitted batches and received results of one offline run id."""
+
+    def __init__(self, path: str):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS batches ("
+                " id TEXT PRIMARY KEY,"
+                " keys TEXT NOT NULL,"
+                " done INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY,"
+                " result TEXT NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    def load(self) -> tuple[dict[str, BatchResult], dict[str, list[str]]]:
+        """Recorded results by key, and the keys of each unfinished batch."""
+        with self._connect() as conn:
+            results = {
+                key: BatchResult(**json.loads(result))
+                for key, result in conn.execute("SELECT key, result FROM results")
+            }
+            open_batches = {
+                batch_id: json.loads(keys)
+                for batch_id, keys in conn.execute(
+                    "SELECT id, keys FROM batches WHERE done = 0"
+                )
+            }
+        return results, open_batches
+
+    def submitted(self, batch_id: str, keys: list[str]) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO batches (id, keys) VALUES (?, ?)", (batch_id, json.dumps(keys))
+            )
+
+    def finished(self, batch_id: str, results: dict[str, BatchResult]) -> None:
+        """Record a batch's successful results and mark it done, atomically."""
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO results (key, result) VALUES (?, ?)",
+                [
+                    (key, json.dumps(asdict(result)))
+                    for key, result in results.items()
+                    if result.error is None
+                ],
+            )
+            conn.execute("UPDATE batches SET done = 1 WHERE id = ?", (batch_id,))
+
+
+class OfflineSession:
+    """Collects the LLM calls of the runs it drives into batches (see module doc)."""
+
+    def __init__(self, backend: BatchBackend, journal: Journal):
+        self.backend = backend
+        self.journal = journal
+        self._results, self._open_batches = journal.load()
+        self._waiting: dict[str, tuple[BatchCall, asyncio.Future]] = {}
+        self._calls = 0
+
+    async def complete(
+        self,
+        route: Route,
+        system_prompt: str,
+        user_prompt: UserPrompt,
+        max_tokens: int,
+        json_schema: Optional[dict] = None,
+    ) -> tuple[str, LLMUsage]:
+        """Answer one LLM call through the batch backend.
+
+        Raises:
+            OutputTruncatedError: If the response hit ``max_tokens``.
+            BatchCallError: If the backend reported an error for the call.
+        """
+        user = prompt_text(user_prompt)
+        parts = [route.provider, route.model, system_prompt, user, str(max_tokens)]
+        if json_schema is not None:
+            parts.append(json.dumps(json_schema, sort_keys=True))
+        key = make_key(*parts)
+        result = self._results.get(key)
+        if result is None:
+            if key not in self._waiting:
+                call = BatchCall(
+                    key, route.provider, route.model, system_prompt, user, max_tokens, json_schema
+                )
+                self._waiting[key] = (call, asyncio.get_running_loop().create_future())
+                self._calls += 1
+            result = await asyncio.shield(self._waiting[key][1])
+        if result.error is not None:
+            raise BatchCallError(result.error)
+        if result.truncated:
+            raise OutputTruncatedError(max_tokens, result.text)
+        usage = LLMUsage(input_tokens=result.input_tokens, output_tokens=result.output_tokens)
+        return result.text, usage
+
+    async def run(self, work: Awaitable[T]) -> T:
+        """Drive ``work`` to completion, batching the LLM calls it makes."""
+        task = asyncio.ensure_future(work)
+        seen = -1
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=settings.offline_collect_seconds)
+                if done:
+                    return task.result()
+                if self._waiting and self._calls == seen:
+                    await self._flush()
+                seen = self._calls
+        finally:
+            task.cancel()
+
+    async def _flush(self) -> None:
+        """Submit the waiting calls, then resume them once a batch has results."""
+        waiting = dict(self._waiting)
+        resumed = [b for b, keys in self._open_batches.items() if waiting.keys() & set(keys)]
+        covered = {key for b in resumed for key in self._open_batches[b]}
+        new = [call for key, (call, _) in waiting.items() if key not in covered]
+        for start in range(0, len(new), settings.offline_batch_max_calls):
+            calls = new[start : start + settings.offline_batch_max_calls]
+            batch_id = await self.backend.submit(calls)
+            keys = [call.custom_id for call in calls]
+            await asyncio.to_thread(self.journal.submitted, batch_id, keys)
+            self._open_batches[batch_id] = keys
+            resumed.append(batch_id)
+            BATCHES_SUBMITTED.inc(backend=self.backend.name)
+            logger.info("submitted offline batch %s with %d calls", batch_id, len(calls))
+
+        pending = set(resumed)
+        while pending:
+            for batch_id in list(pending):
+                results = await self.backend.results(batch_id)
+                if results is not None:
+                    pending.discard(batch_id)
+                    await self._resolve(batch_id, results)
+            if pending:
+                await asyncio.sleep(settings.offline_poll_seconds)
+
+    async def _resolve(self, batch_id: str, results: dict[str, BatchResult]) -> None:
+        await asyncio.to_thread(self.journal.finished, batch_id, results)
+        for key in self._open_batches.pop(batch_id):
+            result = results.get(key) or BatchResult(error="Missing from the batch results")
+            BATCH_CALLS.inc(outcome="failed" if result.error else "succeeded")
+            if result.error is None:
+                self._results[key] = result
+            entry = self._waiting.pop(key, None)
+            if entry is not None and not entry[1].done():
+                entry[1].set_result(result)
+        logger.info("offline batch %s finished", batch_id)
+
+
+_session: ContextVar[Optional[OfflineSession]] = ContextVar("offline_session", default=None)
+
+
+@contextmanager
+def use_offline_session(session: Optional[OfflineSession]) -> Iterator[None]:
+    """Send the LLM calls made inside the block through ``session``.
+
+    A no-op when ``session`` is None.  Tasks started inside the block use it too.
+    """
+    if session is None:
+        yield
+        return
+    previous = _session.get()
+    _session.set(session)
+    try:
+        yield
+    finally:
+        _session.set(previous)
+
+
+def current_offline_session() -> Optional[OfflineSession]:
+    """The offline session LLM calls in the current context go through, if any."""
+    return _session.get()
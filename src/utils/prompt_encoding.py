@@ -0,0 +1,114 @@
+"""
+Serialization of models and data embedded in LLM user prompts.
+
+Three encodings, selected with ``PROMPT_ENCODING``:
+    - ``pretty``:  indented JSON with every field (the original format),
+    - ``compact``: minified JSON without None / empty fields (default),
+    - ``terse``:   an indented ``key: value`` rendering without JSON syntax.
+
+:func:`encode` returns an :class:`Encoded` string that remembers how many
+tokens it saved relative to ``pretty``; build prompt segments with
+:func:`segment` so the saving is carried through to ``call_llm``, which
+reports it per call.
+"""
+
+import json
+from typing import Any, Iterator, Optional
+
+from pydantic import BaseModel
+
+from src.config import settings
+from src.utils.llm_providers import PromptSegment, UserPrompt
+from src.utils.rate_limit import estimate_tokens
+
+ENCODINGS = ("pretty", "compact", "terse")
+
+
+class Encoded(str):
+    """Encoded prompt text; ``tokens_saved`` is relative to the pretty encoding."""
+
+    tokens_saved: int = 0
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, dict):
+        return {str(k): _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+
+def _prune(value: Any) -> Any:
+    """Drop None and empty strings / lists / dicts, recursively."""
+    if isinstance(value, dict):
+        pruned = {k: _prune(v) for k, v in value.items()}
+        return {k: v for k, v in pruned.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [_prune(v) for v in value if v is not None]
+    return value
+
+
+def _scalar(value: Any) -> str:
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def _terse_lines(value: Any, indent: str = "") -> Iterator[str]:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if isinstance(item, (dict, list)):
+                yield f"{indent}{key}:"
+                yield from _terse_lines(item, indent + "  ")
+            else:
+                yield f"{indent}{key}: {_scalar(item)}"
+    elif isinstance(value, list):
+        for item in value:
+            if isinstance(item, (dict, list)) and item:
+                first, *rest = _terse_lines(item, indent + "  ")
+                yield f"{indent}- {first.lstrip()}"
+                yield from rest
+            else:
+                yield f"{indent}- {_scalar(item)}"
+    else:
+        yield f"{indent}{_scalar(value)}"
+
+
+def encode(value: Any, encoding: Optional[str] = None) -> Encoded:
+    """Serialize a model, or a dict / list of models and plain data, for a prompt.
+
+    Args:
+        value: The data to embed.
+        encoding: One of :data:`ENCODINGS`; defaults to ``settings.prompt_encoding``.
+    """
+    encoding = encoding or settings.prompt_encoding
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown prompt encoding: {encoding}")
+    data = _plain(value)
+    pretty = json.dumps(data, indent=2, ensure_ascii=False)
+    if encoding == "pretty":
+        return Encoded(pretty)
+
+    data = _prune(data)
+    if encoding == "compact":
+        text = Encoded(json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+    else:
+        text = Encoded("\n".join(_terse_lines(data)))
+    text.tokens_saved = max(0, estimate_tokens(pretty) - estimate_tokens(text))
+    return text
+
+
+def segment(*parts: str, cacheable: bool = False) -> PromptSegment:
+    """Join prompt text and :class:`Encoded` values into one prompt segment."""
+    return PromptSegment(
+        "".join(parts),
+        cacheable=cacheable,
+        tokens_saved=sum(getattr(part, "tokens_saved", 0) for part in parts),
+    )
+
+
+def tokens_saved(user_prompt: UserPrompt) -> int:
+    """Total tokens saved by compact encoding across a prompt's segments."""
+    if isinstance(user_prompt, str):
+        return getattr(user_prompt, "tokens_saved", 0)
+    return sum(s.tokens_saved for s in user_prompt)
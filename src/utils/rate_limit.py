@@ -0,0 +1,268 @@
+"""
+Concurrency and rate limiting for LLM calls.
+
+Per provider, :class:`LLMLimiter` enforces:
+    - a maximum number of in-flight calls, and
+    - requests-per-minute and tokens-per-minute token buckets,
+
+all held in a SQLite file (``LLM_LIMITER_PATH``) so the limits are shared by
+every uvicorn worker on the host.  Within a worker, callers wait in FIFO
+order instead of failing; the number waiting is exported as a metric.
+A limit of 0 disables that particular check, and a provider with every
+limit at 0 does not touch the store at all.
+"""
+
+import asyncio
+import sqlite3
+import time
+import uuid
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from src.config import settings
+from src.utils.metrics import Counter, Gauge
+
+QUEUE_DEPTH = Gauge(
+    "ease_llm_limiter_queue_depth",
+    "LLM calls waiting for a limiter slot in this worker",
+    ["provider"],
+)
+IN_FLIGHT = Gauge(
+    "ease_llm_in_flight",
+    "LLM calls currently running in this worker",
+    ["provider"],
+)
+WAIT_SECONDS = Counter(
+    "ease_llm_limiter_wait_seconds_total",
+    "Total time LLM calls spent waiting for the limiter",
+    ["provider"],
+)
+
+
+@dataclass(frozen=True)
+class ProviderLimits:
+    max_in_flight: int
+    requests_per_minute: int
+    tokens_per_minute: int
+
+
+def limits_for(provider: str) -> ProviderLimits:
+    """Resolve the limits for ``provider``: global settings plus per-provider overrides."""
+    overrides = settings.llm_provider_limits.get(provider, {})
+    return ProviderLimits(
+        max_in_flight=overrides.get("max_in_flight", settings.llm_max_in_flight),
+        requests_per_minute=overrides.get(
+            "requests_per_minute", settings.llm_requests_per_minute
+        ),
+        tokens_per_minute=overrides.get(
+            "tokens_per_minute", settings.llm_tokens_per_minute
+        ),
+    )
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for rate-limit accounting (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+@dataclass
+class Slot:
+    """A granted limiter slot.  Set ``actual_tokens`` once usage is known."""
+
+    provider: str
+    lease_id: str
+    estimated_tokens: int
+    actual_tokens: Optional[int] = None
+
+
+class LLMLimiter:
+    def __init__(self, path: str, lease_seconds: float, poll_seconds: float):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        # Held for one store transaction at a time.
+        self._locks: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        # Held by the caller at the head of the queue while it waits for a slot.
+        self._queues: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._waiting: dict[str, int] = defaultdict(int)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                " provider TEXT NOT NULL,"
+                " kind TEXT NOT NULL,"
+                " level REAL NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (provider, kind))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                " id TEXT PRIMARY KEY,"
+                " provider TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    # -- sync store operations (run in a thread) -------------------------------
+
+    @staticmethod
+    def _refill(
+        conn: sqlite3.Connection, provider: str, kind: str, per_minute: int, now: float
+    ) -> float:
+        row = conn.execute(
+            "SELECT level, updated_at FROM buckets WHERE provider = ? AND kind = ?",
+            (provider, kind),
+        ).fetchone()
+        if row is None:
+            return float(per_minute)
+        level, updated_at = row
+        return min(float(per_minute), level + (now - updated_at) * per_minute / 60.0)
+
+    def _try_acquire(
+        self, provider: str, lease_id: str, tokens: int, limits: ProviderLimits
+    ) -> float:
+        """Take a slot if every limit allows it.
+
+        Returns 0 on success, otherwise the number of seconds to wait
+        before trying again.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+
+            wait = 0.0
+            if limits.max_in_flight:
+                (in_flight,) = conn.execute(
+                    "SELECT COUNT(*) FROM leases WHERE provider = ?", (provider,)
+                ).fetchone()
+                if in_flight >= limits.max_in_flight:
+                    wait = self.poll_seconds
+
+            levels: dict[str, tuple[float, float]] = {}
+            for kind, per_minute, need in (
+                ("requests", limits.requests_per_minute, 1),
+                ("tokens", limits.tokens_per_minute, tokens),
+            ):
+                if not per_minute:
+                    continue
+                level = self._refill(conn, provider, kind, per_minute, now)
+                levels[kind] = (level, need)
+                if level < need:
+                    wait = max(wait, (need - level) * 60.0 / per_minute)
+
+            for kind, (level, need) in levels.items():
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets (provider, kind, level, updated_at)"
+                    " VALUES (?, ?, ?, ?)",
+                    (provider, kind, level if wait else level - need, now),
+                )
+            if not wait:
+                conn.execute(
+                    "INSERT INTO leases (id, provider, expires_at) VALUES (?, ?, ?)",
+                    (lease_id, provider, now + self.lease_seconds),
+                )
+            conn.execute("COMMIT")
+            return wait
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _release(self, slot: Slot, tokens_per_minute: int) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM leases WHERE id = ?", (slot.lease_id,))
+            if tokens_per_minute and slot.actual_tokens is not None:
+                # Settle the difference between the estimate and actual usage.
+                conn.execute(
+                    "UPDATE buckets SET level = level - ?"
+                    " WHERE provider = ? AND kind = 'tokens'",
+                    (slot.actual_tokens - slot.estimated_tokens, slot.provider),
+                )
+
+    # -- async API -------------------------------------------------------------
+
+    async def _attempt(self, slot: Slot, limits: ProviderLimits) -> float:
+        async with self._locks[slot.provider]:
+            attempt = asyncio.ensure_future(
+                asyncio.to_thread(
+                    self._try_acquire,
+                    slot.provider,
+                    slot.lease_id,
+                    slot.estimated_tokens,
+                    limits,
+                )
+            )
+            try:
+                return await asyncio.shield(attempt)
+            except asyncio.CancelledError:
+                # The thread runs on and may still take the slot; hand it
+                # back rather than leave the lease until it expires.
+                if not await asyncio.shield(attempt):
+                    slot.actual_tokens = 0
+                    await asyncio.to_thread(self._release, slot, limits.tokens_per_minute)
+                raise
+
+    async def _acquire(self, slot: Slot, limits: ProviderLimits) -> None:
+        """Take a slot right away if nobody is waiting, else queue for one (FIFO)."""
+        provider = slot.provider
+        if not self._waiting[provider] and not await self._attempt(slot, limits):
+            return
+        start = time.monotonic()
+        self._waiting[provider] += 1
+        QUEUE_DEPTH.inc(provider=provider)
+        try:
+            async with self._queues[provider]:
+                while wait := await self._attempt(slot, limits):
+                    await asyncio.sleep(min(max(wait, self.poll_seconds), 1.0))
+        finally:
+            self._waiting[provider] -= 1
+            QUEUE_DEPTH.dec(provider=provider)
+            WAIT_SECONDS.inc(time.monotonic() - start, provider=provider)
+
+    @asynccontextmanager
+    async def slot(self, provider: str, estimated_tokens: int) -> AsyncIterator[Slot]:
+        """Wait (FIFO within this worker) for a slot, hold it for the block."""
+        limits = limits_for(provider)
+        limited = bool(
+            limits.max_in_flight or limits.requests_per_minute or limits.tokens_per_minute
+        )
+        if limits.tokens_per_minute:
+            # A single call larger than the bucket may take all of it.
+            estimated_tokens = min(estimated_tokens, limits.tokens_per_minute)
+        slot = Slot(provider, uuid.uuid4().hex, estimated_tokens)
+        if limited:
+            await self._acquire(slot, limits)
+
+        IN_FLIGHT.inc(provider=provider)
+        try:
+            yield slot
+        finally:
+            IN_FLIGHT.dec(provider=provider)
+            if limited:
+                await asyncio.shield(
+                    asyncio.to_thread(self._release, slot, limits.tokens_per_minute)
+                )
+
+
+_limiter: Optional[LLMLimiter] = None
+
+
+def get_limiter() -> LLMLimiter:
+    """Return this process's limiter, creating it on first use."""
+    global _limiter
+    if _limiter is None:
+        _limiter = LLMLimiter(
+            path=settings.llm_limiter_path,
+            lease_seconds=settings.llm_timeout + 60.0,
+            poll_seconds=settings.llm_limiter_poll_seconds,
+        )
+    return _limiter
@@ -0,0 +1,189 @@
+"""
+Retry policy for transient LLM provider errors.
+
+Retries rate limiting (429), overload (529), 5xx responses, timeouts and
+connection failures with capped exponential backoff and full jitter,
+honouring ``Retry-After`` when the provider sends one, within a total
+deadline.  Policies can be tuned per stage via ``LLM_RETRY_OVERRIDES``.
+"""
+
+import asyncio
+import email.utils
+import logging
+import random
+import time
+from dataclasses import dataclass, replace
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import httpx
+
+from src.config import settings
+from src.utils.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 425, 429, 500, 502, 503, 504, 529})
+
+# SDK exception class names for connection-level failures, matched by name
+# so this module does not need to import every provider SDK.
+_CONNECTION_ERROR_NAMES = frozenset({"APIConnectionError", "APITimeoutError"})
+
+RETRIES = Counter(
+    "ease_llm_retries_total",
+    "LLM call attempts that failed transiently and were retried",
+    ["stage", "reason"],
+)
+GIVE_UPS = Counter(
+    "ease_llm_retry_exhausted_total",
+    "LLM calls that failed after exhausting their retry policy",
+    ["stage", "reason"],
+)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int
+    base_delay: float
+    max_delay: float
+    deadline_seconds: float
+
+
+def stage_setting(overrides: dict, stage: str):
+    """Look up ``stage`` in a per-stage settings dict, falling back to parents.
+
+    ``"safety.principles"`` matches a ``"safety.principles"`` key first,
+    then ``"safety"``.  Returns None if nothing matches.
+    """
+    parts = stage.split(".")
+    for i in range(len(parts), 0, -1):
+        key = ".".join(parts[:i])
+        if key in overrides:
+            return overrides[key]
+    return None
+
+
+def policy_for(stage: str) -> RetryPolicy:
+    """Resolve the retry policy for ``stage``."""
+    policy = RetryPolicy(
+        max_attempts=settings.llm_retry_max_attempts,
+        base_delay=settings.llm_retry_base_delay,
+        max_delay=settings.llm_retry_max_delay,
+        deadline_seconds=settings.llm_retry_deadline_seconds,
+    )
+    overrides = stage_setting(settings.llm_retry_overrides, stage)
+    if overrides:
+        policy = replace(policy, **overrides)
+    return replace(policy, max_attempts=int(policy.max_attempts))
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    for attr in ("status_code", "code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def classify(exc: BaseException) -> Optional[str]:
+    """Return a short reason if ``exc`` is transient and worth retrying, else None."""
+    status = _status_code(exc)
+    if status is not None:
+        return str(status) if status in RETRYABLE_STATUS_CODES else None
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, httpx.TimeoutException)):
+        return "timeout"
+    if isinstance(exc, (ConnectionError, httpx.TransportError)):
+        return "connection"
+    if any(cls.__name__ in _CONNECTION_ERROR_NAMES for cls in type(exc).__mro__):
+        return "connection"
+    return None
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds the provider asked us to wait, from ``Retry-After`` headers."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, parsed.timestamp() - time.time())
+
+
+def backoff_delay(policy: RetryPolicy, attempt: int) -> float:
+    """Full-jitter exponential backoff for the given (1-based) failed attempt."""
+    ceiling = min(policy.max_delay, policy.base_delay * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling)
+
+
+def retry_delay(
+    exc: BaseException,
+    stage: str,
+    policy: RetryPolicy,
+    attempt: int,
+    deadline: float,
+) -> Optional[float]:
+    """Decide whether to retry after ``exc`` on the given (1-based) attempt.
+
+    Returns the seconds to wait before the next attempt, or None when the
+    error is not transient, attempts are exhausted, or waiting would overrun
+    ``deadline`` (a ``time.monotonic()`` value).  Records retry metrics.
+    """
+    reason = classify(exc)
+    if reason is None:
+        return None
+    delay = backoff_delay(policy, attempt)
+    hinted = retry_after(exc)
+    if hinted is not None:
+        delay = max(delay, hinted)
+    if attempt >= policy.max_attempts or time.monotonic() + delay > deadline:
+        GIVE_UPS.inc(stage=stage, reason=reason)
+        return None
+    RETRIES.inc(stage=stage, reason=reason)
+    logger.warning(
+        "LLM call for stage %s failed (%s), retry %d/%d in %.1fs",
+        stage,
+        reason,
+        attempt,
+        policy.max_attempts - 1,
+        delay,
+    )
+    return delay
+
+
+async def with_retry(
+    fn: Callable[[], Awaitable[T]], stage: str, policy: Optional[RetryPolicy] = None
+) -> T:
+    """Call ``fn`` until it succeeds, retrying transient errors per ``policy``.
+
+    Raises the last error once attempts are exhausted, the error is not
+    retryable, or the next wait would overrun the policy's deadline.
+    """
+    policy = policy or policy_for(stage)
+    deadline = time.monotonic() + policy.deadline_seconds
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return await fn()
+        except Exception as exc:
+            delay = retry_delay(exc, stage, policy, attempt, deadline)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
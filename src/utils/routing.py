@@ -0,0 +1,118 @@
+"""
+Per-stage model routing for ``call_llm``.
+
+Each LLM call names its pipeline stage (``"safety.principles"``,
+``"election"``, ...).  The provider and model for a stage are resolved,
+most specific first, from:
+    1. per-request overrides installed with :func:`use_routes`,
+    2. ``settings.llm_stage_routes``,
+    3. ``settings.llm_provider`` / ``settings.llm_model``.
+
+Routes are looked up with the same dotted-prefix fallback as retry
+overrides, so a ``"safety"`` entry covers every safety sub-step.  An entry
+is ``{"model": ...}`` with an optional ``"provider"`` (defaulting to
+``settings.llm_provider``).
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, Mapping, Optional
+
+from src.config import settings
+from src.utils.llm_providers import SUPPORTED_PROVIDERS
+from src.utils.retry import stage_setting
+
+_request_routes: ContextVar[Mapping[str, Mapping[str, Optional[str]]]] = ContextVar(
+    "llm_request_routes", default={}
+)
+
+
+@dataclass(frozen=True)
+class Route:
+    provider: str
+    model: str
+
+
+def _route(entry: Mapping[str, Optional[str]]) -> Route:
+    return Route(
+        provider=entry.get("provider") or settings.llm_provider,
+        model=entry["model"],
+    )
+
+
+def route_for(stage: str) -> Route:
+    """Resolve the provider and model that serve ``stage``."""
+    for routes in (_request_routes.get(), settings.llm_stage_routes):
+        entry = stage_setting(routes, stage)
+        if entry:
+            return _route(entry)
+    return Route(settings.llm_provider, settings.llm_model)
+
+
+@contextmanager
+def use_routes(routes: Optional[Mapping[str, object]]) -> Iterator[None]:
+    """Apply per-request stage routes to every LLM call made inside the block.
+
+    ``routes`` maps stage prefixes to ``{"provider", "model"}`` entries (dicts
+    or models with those attributes); they are layered over any routes
+    already in effect.  A no-op when ``routes`` is empty, so nested routers
+    keep the routes of the request that called them.
+    """
+    if not routes:
+        yield
+        return
+    entries = {
+        stage: entry if isinstance(entry, Mapping) else entry.model_dump()
+        for stage, entry in routes.items()
+    }
+    previous = _request_routes.get()
+    _request_routes.set({**previous, **entries})
+    try:
+        yield
+    finally:
+        _request_routes.set(previous)
+
+
+def current_routes() -> Mapping[str, Mapping[str, Optional[str]]]:
+    """The per-request route overrides in effect (see :func:`use_routes`)."""
+    return _request_routes.get()
+
+
+def configured_providers() -> set[str]:
+    """Providers used by the default route or any stage, hedge or failover route."""
+    return {settings.llm_provider} | {
+        _route(entry).provider for entry in settings.llm_stage_routes.values()
+    } | {
+        entry["provider"]
+        for entry in settings.llm_hedge_stages.values()
+        if entry.get("provider")
+    } | {entry["provider"] for entry in settings.llm_failover_chain}
+
+
+def check_routes() -> None:
+    """Validate the stage, hedge and failover routes; raises ValueError on a bad entry."""
+    for stage, entry in settings.llm_stage_routes.items():
+        if not entry.get("model"):
+            raise ValueError(f"LLM_STAGE_ROUTES['{stage}'] must set a model")
+        provider = _route(entry).provider
+        if provider not in SUPPORTED_PROVIDERS:
+            raise ValueError(
+                f"LLM_STAGE_ROUTES['{stage}'] has unsupported provider '{provider}'"
+            )
+    for stage, entry in settings.llm_hedge_stages.items():
+        provider = entry.get("provider")
+        if provider and provider not in SUPPORTED_PROVIDERS:
+            raise ValueError(
+                f"LLM_HEDGE_STAGES['{stage}'] has unsupported provider '{provider}'"
+            )
+    for position, entry in enumerate(settings.llm_failover_chain):
+        if not entry.get("provider") or not entry.get("model"):
+            raise ValueError(
+                f"LLM_FAILOVER_CHAIN[{position}] must set a provider and a model"
+            )
+        if entry["provider"] not in SUPPORTED_PROVIDERS:
+            raise ValueError(
+                f"LLM_FAILOVER_CHAIN[{position}] has unsupported provider"
+                f" '{entry['provider']}'"
+            )
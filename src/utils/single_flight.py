@@ -0,0 +1,317 @@
+"""
+Request coalescing (single-flight) for the EASE endpoints.
+
+Identical requests that arrive while one is already running share its
+execution and all receive its result.  Requests are identical when their
+canonical JSON, the stage routes in effect and the cache setting match (see
+:func:`request_key`).
+
+Two levels:
+    - within a worker, waiters share one task; each waits on it through
+      ``asyncio.shield``, so a waiter that is cancelled (client
+      disconnected) leaves the others running, and the task itself is
+      cancelled only when its last waiter goes away, and
+    - across workers, a SQLite file (``COALESCE_PATH``) records which worker
+      leads each in-flight request.  Other workers poll it for the result
+      instead of running the request.  A leader renews its lease while it
+      runs; if it is cancelled, fails with an unexpected error or dies, its
+      entry is removed (or its lease lapses) and a waiting worker takes over.
+
+Only running requests can be joined: a request arriving after the leader
+has finished runs afresh.  The result (or ``HTTPException`` error) is kept
+for ``COALESCE_RESULT_TTL_SECONDS`` only so that the workers already polling
+for it can read it.  Apply with the :func:`single_flight` decorator.
+"""
+
+import asyncio
+import functools
+import json
+import os
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional, TypeVar, get_type_hints
+
+from fastapi import HTTPException
+from pydantic import BaseModel, TypeAdapter
+
+from src.config import settings
+from src.utils.llm_cache import cache_active, make_key
+from src.utils.metrics import Counter
+from src.utils.routing import current_routes
+
+COALESCED = Counter(
+    "ease_coalesced_requests_total",
+    "Requests served by an identical request already in flight",
+    ["endpoint", "scope"],
+)
+
+T = TypeVar("T")
+
+
+def request_key(endpoint: str, req: BaseModel) -> str:
+    """Canonical hash of a request, including the routes and cache setting in effect."""
+    return make_key(
+        endpoint,
+        json.dumps(req.model_dump(mode="json"), sort_keys=True),
+        json.dumps(current_routes(), sort_keys=True),
+        str(cache_active()),
+    )
+
+
+class FlightStore:
+    """In-flight request leases and their results, shared by every worker."""
+
+    def __init__(self, path: str, lease_seconds: float, result_ttl_seconds: float):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.result_ttl_seconds = result_ttl_seconds
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(flights)")}
+            if "status" in columns:
+                # Earlier layout, which kept finished results in this table;
+                # it only ever holds in-flight leases, so start it afresh.
+                conn.execute("DROP TABLE flights")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS flights ("
+                " key TEXT PRIMARY KEY,"
+                " owner TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " owner TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " result TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    # -- sync store operations (run in a thread) -------------------------------
+
+    def claim(self, key: str, owner: str) -> str:
+        """Lead ``key`` if nobody is running it; returns the owner of its flight.
+
+        The result is ``owner`` itself when ``owner`` now leads it.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM flights WHERE expires_at <= ?", (now,))
+            conn.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+            row = conn.execute("SELECT owner FROM flights WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO flights (key, owner, expires_at) VALUES (?, ?, ?)",
+                    (key, owner, now + self.lease_seconds),
+                )
+                row = (owner,)
+            conn.execute("COMMIT")
+            return row[0]
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def poll(self, key: str, leader: str) -> tuple[str, Optional[str]]:
+        """State of the flight ``leader`` runs for ``key``.
+
+        Returns ``("running", None)`` while it runs, the finished
+        ``(status, result)`` (``"succeeded"`` or ``"failed"``), or
+        ``("gone", None)`` if it was abandoned or its lease lapsed.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT status, result FROM results WHERE owner = ?", (leader,)
+            ).fetchone()
+            if row is not None:
+                return row
+            running = conn.execute(
+                "SELECT 1 FROM flights WHERE key = ? AND owner = ? AND expires_at > ?",
+                (key, leader, time.time()),
+            ).fetchone()
+        return ("running", None) if running else ("gone", None)
+
+    def renew(self, key: str, owner: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE flights SET expires_at = ? WHERE key = ? AND owner = ?",
+                (time.time() + self.lease_seconds, key, owner),
+            )
+
+    def finish(self, key: str, owner: str, status: str, result: str) -> None:
+        """End the flight, leaving its result only for the workers polling ``owner``."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM flights WHERE key = ? AND owner = ?", (key, owner))
+            conn.execute(
+                "INSERT OR REPLACE INTO results (owner, status, result, expires_at)"
+                " VALUES (?, ?, ?, ?)",
+                (owner, status, result, time.time() + self.result_ttl_seconds),
+            )
+
+    def abandon(self, key: str, owner: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM flights WHERE key = ? AND owner = ?", (key, owner))
+
+
+_store: Optional[FlightStore] = None
+
+
+def get_store() -> Optional[FlightStore]:
+    """Return this process's flight store, or None when ``COALESCE_PATH`` is empty."""
+    global _store
+    if _store is None and settings.coalesce_path:
+        _store = FlightStore(
+            path=settings.coalesce_path,
+            lease_seconds=settings.coalesce_lease_seconds,
+            result_ttl_seconds=settings.coalesce_result_ttl_seconds,
+        )
+    return _store
+
+
+async def _lead(
+    store: FlightStore,
+    key: str,
+    owner: str,
+    run: Callable[[], Awaitable[T]],
+    adapter: TypeAdapter,
+) -> T:
+    async def _renew() -> None:
+        while True:
+            await asyncio.sleep(store.lease_seconds / 3)
+            await asyncio.to_thread(store.renew, key, owner)
+
+    renewer = asyncio.create_task(_renew())
+    try:
+        result = await run()
+    except HTTPException as e:
+        # Deterministic for this request: every waiting worker gets it too.
+        error = json.dumps({"status_code": e.status_code, "detail": e.detail})
+        await asyncio.shield(
+            asyncio.to_thread(store.finish, key, owner, "failed", error)
+        )
+        raise
+    except BaseException:
+        # Cancelled or failed unexpectedly: let a waiting worker run it instead.
+        await asyncio.shield(asyncio.to_thread(store.abandon, key, owner))
+        raise
+    finally:
+        renewer.cancel()
+    payload = adapter.dump_json(result).decode("utf-8")
+    await asyncio.shield(
+        asyncio.to_thread(store.finish, key, owner, "succeeded", payload)
+    )
+    return result
+
+
+async def _run_across_workers(
+    endpoint: str, key: str, run: Callable[[], Awaitable[T]], adapter: TypeAdapter
+) -> T:
+    """Run ``run`` unless another worker is running the same request."""
+    store = get_store()
+    if store is None:
+        return await run()
+    owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+    counted = False
+    while True:
+        leader = await asyncio.to_thread(store.claim, key, owner)
+        if leader == owner:
+            return await _lead(store, key, owner, run, adapter)
+        if not counted:
+            COALESCED.inc(endpoint=endpoint, scope="host")
+            counted = True
+        status, result = "running", None
+        while status == "running":
+            await asyncio.sleep(settings.coalesce_poll_seconds)
+            status, result = await asyncio.to_thread(store.poll, key, leader)
+        if status == "succeeded":
+            return adapter.validate_json(result)
+        if status == "failed":
+            raise HTTPException(**json.loads(result))
+        # The leader went away without a result: claim the request again.
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+_flights: dict[str, _Flight] = {}
+
+
+def _forget(key: str, flight: _Flight) -> None:
+    if _flights.get(key) is flight:
+        del _flights[key]
+
+
+async def coalesce(
+    endpoint: str,
+    req: BaseModel,
+    run: Callable[[], Awaitable[T]],
+    response_type: Any,
+) -> T:
+    """Run ``run`` for ``req``, or join an identical request already in flight.
+
+    ``response_type`` is the type of the result, used to pass it between
+    workers.  Every waiter receives the same result object or exception.
+    """
+    key = request_key(endpoint, req)
+    flight = _flights.get(key)
+    if flight is None:
+        adapter = _adapter(response_type)
+        task = asyncio.create_task(_run_across_workers(endpoint, key, run, adapter))
+        flight = _flights[key] = _Flight(task)
+        task.add_done_callback(lambda _: _forget(key, flight))
+    else:
+        COALESCED.inc(endpoint=endpoint, scope="process")
+
+    flight.waiters += 1
+    try:
+        return await asyncio.shield(flight.task)
+    except asyncio.CancelledError:
+        if flight.waiters == 1:
+            # Last waiter gone: stop the work, and let later requests start afresh.
+            _forget(key, flight)
+            flight.task.cancel()
+        raise
+    finally:
+        flight.waiters -= 1
+
+
+@functools.lru_cache(maxsize=None)
+def _adapter(response_type: Any) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+
+def single_flight(endpoint: str) -> Callable:
+    """Coalesce identical in-flight calls of an ``async def handler(req)`` endpoint.
+
+    Apply it to HTTP endpoints only.  Waiters get a result computed in the
+    leader's context, and request-scoped context (deadline, timing
+    recorder, call pool, offline session) is not part of
+    :func:`request_key`; code running inside a request calls the
+    undecorated stage functions instead.  A no-op when
+    ``COALESCE_ENABLED`` is false.
+    """
+
+    def decorate(handler: Callable[[Any], Awaitable[T]]) -> Callable[[Any], Awaitable[T]]:
+        response_type = get_type_hints(handler)["return"]
+
+        @functools.wraps(handler)
+        async def wrapper(req: BaseModel) -> T:
+            if not settings.coalesce_enabled:
+                return await handler(req)
+            return await coalesce(endpoint, req, lambda: handler(req), response_type)
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,225 @@
+"""
+Structured (schema-constrained) LLM output.
+
+:func:`response_schema` turns a response type (a Pydantic model or any type
+``TypeAdapter`` accepts, such as ``list[Action]``) into a JSON schema every
+provider's native structured-output feature accepts: ``$ref``s are
+inlined and non-object roots are wrapped in ``{"result": ...}``.
+
+:func:`extract_json` is the tolerant local fallback used on every
+response: it accepts markdown fences, prose around the JSON value and
+trailing commas, for providers (or models) that ignore the schema.
+
+:func:`validate_repaired` recovers values that fail validation with cheap
+local fixes driven by the validation errors: enum synonyms ("moderate" ->
+"medium"), numbers given as text ("7/10") or out of range (clamped), and
+ids in the wrong format ("Action 1" -> "A1").  What it cannot fix is sent
+back to the model with :func:`repair_prompt` (see ``call_llm_structured``).
+"""
+
+import json
+import re
+from typing import Any, Optional
+
+from pydantic import TypeAdapter, ValidationError
+
+# Key wrapping non-object roots; providers' structured output needs an object.
+WRAPPER_KEY = "result"
+
+_FENCE = re.compile(r"```[a-zA-Z]*\s*\n?(.*?)```", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+# Enum-like string patterns, e.g. "^(high|medium|low|none)$".
+_CHOICES_PATTERN = re.compile(r"\^\(([\w|]+)\)\$")
+# Id patterns, e.g. "^A[0-9]+$".
+_ID_PATTERN = re.compile(r"\^([A-Za-z]+)\[0-9\]\+\$")
+# Validation passes before giving up; one fix can expose another (a number
+# parsed from text can then be out of range).
+_REPAIR_PASSES = 3
+
+# Out-of-vocabulary values models commonly use for the enum fields; only
+# applied when the synonym is one of the field's allowed values.
+ENUM_SYNONYMS = {
+    "moderate": "medium",
+    "med": "medium",
+    "mid": "medium",
+    "partial": "medium",
+    "partially reversible": "medium",
+    "minimal": "low",
+    "minor": "low",
+    "negligible": "low",
+    "slight": "low",
+    "significant": "high",
+    "major": "high",
+    "severe": "high",
+    "fully reversible": "high",
+    "very high": "critical",
+    "extreme": "critical",
+    "irreversible": "none",
+    "not reversible": "none",
+}
+
+REPAIR_SYSTEM_PROMPT = """\
+You correct JSON that failed schema validation for the EASE \
+(Environment-Actions-Safety-Election) decision-making framework.
+
+You are given a JSON value and the validation errors found in it. Return the \
+same JSON value with ONLY the listed errors fixed, keeping every other field \
+exactly as it is. Return only the JSON (no markdown, no commentary)."""
+
+
+def _inline_refs(node: Any, defs: dict) -> Any:
+    if isinstance(node, dict):
+        if "$ref" in node:
+            name = node["$ref"].rsplit("/", 1)[-1]
+            resolved = _inline_refs(defs[name], defs)
+            extra = {k: v for k, v in node.items() if k != "$ref"}
+            return {**resolved, **_inline_refs(extra, defs)}
+        return {k: _inline_refs(v, defs) for k, v in node.items() if k != "$defs"}
+    if isinstance(node, list):
+        return [_inline_refs(v, defs) for v in node]
+    return node
+
+
+def response_schema(adapter: TypeAdapter) -> tuple[dict, bool]:
+    """JSON schema for a structured response, and whether it was wrapped."""
+    schema = adapter.json_schema()
+    schema = _inline_refs(schema, schema.get("$defs", {}))
+    if schema.get("type") == "object" and "properties" in schema:
+        return schema, False
+    wrapped = {
+        "type": "object",
+        "properties": {WRAPPER_KEY: schema},
+        "required": [WRAPPER_KEY],
+    }
+    return wrapped, True
+
+
+def extract_json(text: str) -> Any:
+    """Parse the JSON value in an LLM response, tolerating fences and prose.
+
+    Raises:
+        ValueError: If the text contains no complete JSON object or array.
+    """
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    decoder = json.JSONDecoder()
+    for candidate in [*(m.group(1) for m in _FENCE.finditer(text)), text]:
+        candidate = _TRAILING_COMMA.sub(r"\1", candidate)
+        for start, char in enumerate(candidate):
+            if char not in "{[":
+                continue
+            try:
+                value, _ = decoder.raw_decode(candidate, start)
+            except json.JSONDecodeError:
+                continue
+            return value
+    raise ValueError("No JSON value found in the LLM response")
+
+
+def load_response(text: str, wrapped: bool) -> Any:
+    """Extract the JSON value of a structured response, unwrapping it if needed.
+
+    Raises:
+        ValueError: If no JSON can be extracted.
+    """
+    data = extract_json(text)
+    if wrapped and isinstance(data, dict) and set(data) == {WRAPPER_KEY}:
+        data = data[WRAPPER_KEY]
+    return data
+
+
+def _choice(value: str, choices: list[str]) -> Optional[str]:
+    by_name = {c.lower(): c for c in choices}
+    name = re.sub(r"[\s_-]+", " ", value).strip().lower()
+    return by_name.get(name) or by_name.get(ENUM_SYNONYMS.get(name, ""))
+
+
+def _fixed(value: Any, error: dict) -> Optional[Any]:
+    """A corrected value for one validation error, or None if there is none."""
+    kind = error["type"]
+    ctx = error.get("ctx", {})
+    if kind == "string_pattern_mismatch" and isinstance(value, str):
+        pattern = str(ctx.get("pattern", ""))
+        choices = _CHOICES_PATTERN.fullmatch(pattern)
+        if choices:
+            return _choice(value, choices.group(1).split("|"))
+        prefix = _ID_PATTERN.fullmatch(pattern)
+        number = re.search(r"\d+", value)
+        if prefix and number:
+            return f"{prefix.group(1)}{int(number.group())}"
+    elif kind == "literal_error" and isinstance(value, str):
+        return _choice(value, re.findall(r"'([^']*)'", str(ctx.get("expected", ""))))
+    elif kind in ("float_parsing", "int_parsing") and isinstance(value, str):
+        number = _NUMBER.search(value)
+        if number:
+            return float(number.group()) if kind == "float_parsing" else int(float(number.group()))
+    elif kind == "greater_than_equal" and isinstance(value, (int, float)):
+        return ctx["ge"]
+    elif kind == "less_than_equal" and isinstance(value, (int, float)):
+        return ctx["le"]
+    return None
+
+
+def _apply_fixes(data: Any, errors: list[dict]) -> bool:
+    """Fix ``data`` in place where possible; returns whether anything changed."""
+    changed = False
+    for error in errors:
+        *path, last = error["loc"] or (None,)
+        if last is None:
+            continue
+        parent = data
+        try:
+            for key in path:
+                parent = parent[key]
+            value = parent[last]
+        except (KeyError, IndexError, TypeError):
+            continue
+        fixed = _fixed(value, error)
+        if fixed is not None and fixed != value:
+            parent[last] = fixed
+            changed = True
+    return changed
+
+
+def validate_repaired(data: Any, adapter: TypeAdapter) -> tuple[Any, bool]:
+    """Validate ``data``, applying local fixes for its validation errors.
+
+    Returns the validated value and whether any fix was needed.  ``data``
+    is modified in place.
+
+    Raises:
+        pydantic.ValidationError: The errors no local fix resolves.
+    """
+    repaired = False
+    for _ in range(_REPAIR_PASSES):
+        try:
+            return adapter.validate_python(data), repaired
+        except ValidationError as e:
+            if not _apply_fixes(data, e.errors()):
+                raise
+            repaired = True
+    return adapter.validate_python(data), repaired
+
+
+def _location(loc: tuple) -> str:
+    path = "".join(f"[{part}]" if isinstance(part, int) else f".{part}" for part in loc)
+    return path.lstrip(".")
+
+
+def repair_prompt(invalid: Any, errors: list[str]) -> str:
+    """User prompt asking the model to fix ``invalid`` (a JSON value or text)."""
+    body = invalid if isinstance(invalid, str) else json.dumps(invalid, ensure_ascii=False)
+    problems = "\n".join(f"- {error}" for error in errors)
+    return f"Validation errors:\n{problems}\n\nJSON to correct:\n{body}"
+
+
+def error_lines(errors: list[dict]) -> list[str]:
+    """Describe validation errors for :func:`repair_prompt`."""
+    return [
+        f"{_location(tuple(e['loc'])) or 'value'}: {e['msg']}"
+        f" (got {json.dumps(e['input'], default=str)[:80]})"
+        for e in errors
+    ]
@@ -0,0 +1,56 @@
+"""
+Shared fixtures: the app on the fake LLM provider (``LLM_PROVIDER=fake``),
+with every SQLite store in a temporary directory.
+"""
+
+import os
+import tempfile
+
+_STATE_DIR = tempfile.mkdtemp(prefix="ease-tests-")
+
+# Read once when src.config is imported, so set before any src import.
+os.environ.update(
+    LLM_PROVIDER="fake",
+    LLM_LIMITER_PATH=os.path.join(_STATE_DIR, "llm_limits.sqlite3"),
+    COALESCE_PATH=os.path.join(_STATE_DIR, "coalesce.sqlite3"),
+    JOB_STORE_PATH=os.path.join(_STATE_DIR, "jobs.sqlite3"),
+    OFFLINE_BATCH_DIR=os.path.join(_STATE_DIR, "batches"),
+    OFFLINE_JOURNAL_DIR=os.path.join(_STATE_DIR, "offline"),
+    LLM_RETRY_BASE_DELAY="0.01",
+    LLM_RETRY_MAX_DELAY="0.05",
+)
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+import pytest_asyncio  # noqa: E402
+
+from src.main import app  # noqa: E402
+from src.utils import circuit_breaker, fake_llm, instrumentation  # noqa: E402
+
+
+def pytest_collection_modifyitems(items):
+    # A worker runs on one event loop, and some per-worker state (the rate
+    # limiter's locks) is bound to it; run every test on one loop as well.
+    marker = pytest.mark.asyncio(loop_scope="session")
+    for item in items:
+        if pytest_asyncio.is_async_test(item):
+            item.add_marker(marker, append=False)
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    """Forget the per-worker state earlier tests built up."""
+    fake_llm.reset_calls()
+    circuit_breaker._breakers.clear()
+    instrumentation._call_seconds.clear()
+    yield
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def client():
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test", timeout=60
+        ) as c:
+            yield c
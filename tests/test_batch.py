@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from src.config import settings
+from src.utils import fake_llm
+
+
+def _lines(text: str) -> dict[int, dict]:
+    results = [json.loads(line) for line in text.splitlines()]
+    return {result["index"]: result for result in results}
+
+
+@pytest.mark.asyncio
+async def test_failed_lines_do_not_affect_the_rest(client):
+    body = "\n".join([
+        json.dumps({"request": "Reduce customer churn", "min_actions": 3}),
+        '{"request": "Hire a CFO",',
+        json.dumps({"request": "Open a second office", "min_actions": 99}),
+        json.dumps({"request": "Open a second office", "min_actions": 3}),
+    ])
+
+    r = await client.post(
+        "/api/v1/ease/batch",
+        content=body,
+        headers={"content-type": "application/x-ndjson"},
+    )
+
+    assert r.status_code == 200
+    results = _lines(r.text)
+    assert {i: result["status_code"] for i, result in results.items()} == {
+        0: 200,
+        1: 400,
+        2: 422,
+        3: 200,
+    }
+    assert "Invalid JSON line" in results[1]["error"]
+    assert results[0]["response"]["election"]["elected_action"]["id"]
+
+
+@pytest.mark.asyncio
+async def test_identical_calls_in_a_batch_are_made_once(client, monkeypatch):
+    monkeypatch.setattr(settings, "fake_llm_latency_ms", 50.0)
+    item = {"request": "Reduce customer churn", "min_actions": 3, "no_cache": True}
+
+    r = await client.post("/api/v1/ease/batch", json=[item, item, item])
+
+    assert [result["status_code"] for result in _lines(r.text).values()] == [200] * 3
+    assert fake_llm.calls["environment"] == 1
+    assert fake_llm.calls["actions"] == 3  # streams are bounded but not shared
+
+
+@pytest.mark.asyncio
+async def test_body_that_is_not_an_array_is_rejected(client):
+    r = await client.post("/api/v1/ease/batch", json={"request": "Reduce customer churn"})
+
+    assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_oversized_batch_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(settings, "ease_batch_max_items", 2)
+    item = {"request": "Reduce customer churn"}
+
+    r = await client.post("/api/v1/ease/batch", json=[item] * 3)
+
+    assert r.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_shared_calls_keep_each_items_own_deadline(client, monkeypatch):
+    monkeypatch.setattr(settings, "fake_llm_latency_ms", 200.0)
+    item = {"request": "Reduce customer churn", "min_actions": 3, "no_cache": True}
+    hurried = {**item, "deadline_seconds": 0.1}
+
+    r = await client.post("/api/v1/ease/batch", json=[hurried, item])
+
+    results = _lines(r.text)
+    assert results[0]["status_code"] == 504
+    assert results[1]["status_code"] == 200
+    assert fake_llm.calls["environment"] == 1
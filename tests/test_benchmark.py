@@ -0,0 +1,36 @@
+import argparse
+import os
+
+import pytest
+
+from benchmarks import ease_latency
+from src.config import settings
+from src.utils import fake_llm
+
+
+def test_benchmark_measures_every_request(monkeypatch):
+    monkeypatch.setattr(os, "environ", {})
+    args = argparse.Namespace(
+        latency_ms=0.0, latency_stddev_ms=0.0, distribution="fixed", failure_rate=0.0, seed=0
+    )
+
+    ease_latency._configure(args)
+
+    assert os.environ["COALESCE_ENABLED"] == "false"
+    assert os.environ["LLM_CACHE_ENABLED"] == "false"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_each_make_their_calls(client, monkeypatch):
+    monkeypatch.setattr(settings, "coalesce_enabled", False)
+    monkeypatch.setattr(settings, "fake_llm_latency_ms", 20.0)
+    body = {"request": "Reduce customer churn", "min_actions": 3}
+    await client.post("/api/v1/ease", json=body)
+    calls_per_request = sum(fake_llm.calls.values())
+
+    result = await ease_latency._run_scenario(
+        client, "ease", body, actions=3, concurrency=4, requests=4
+    )
+
+    assert result.errors == 0
+    assert result.llm_calls_per_request == calls_per_request
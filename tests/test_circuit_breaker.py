@@ -0,0 +1,137 @@
+import pytest
+
+from src.config import settings
+from src.utils import circuit_breaker
+from src.utils.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    breaker_for,
+    with_failover,
+)
+from src.utils.fake_llm import FakeProviderError
+from src.utils.routing import Route
+
+
+@pytest.fixture(autouse=True)
+def small_window(monkeypatch):
+    monkeypatch.setattr(settings, "llm_breaker_window", 4)
+    monkeypatch.setattr(settings, "llm_breaker_min_calls", 4)
+    monkeypatch.setattr(settings, "llm_breaker_error_rate", 0.5)
+    monkeypatch.setattr(settings, "llm_breaker_slow_call_seconds", 1.0)
+    monkeypatch.setattr(settings, "llm_breaker_open_seconds", 30.0)
+
+
+def _open(breaker: CircuitBreaker) -> None:
+    for _ in range(4):
+        breaker.record(True, 0.1)
+
+
+def test_breaker_opens_on_errors():
+    breaker = CircuitBreaker("fake")
+    breaker.record(False, 0.1)
+    breaker.record(True, 0.1)
+    breaker.record(False, 0.1)
+    assert breaker.state == CLOSED
+
+    breaker.record(True, 0.1)
+
+    assert breaker.state == OPEN
+    assert not breaker.acquire()
+
+
+def test_breaker_opens_on_slow_calls(monkeypatch):
+    monkeypatch.setattr(settings, "llm_breaker_slow_call_rate", 0.75)
+    breaker = CircuitBreaker("fake")
+
+    for seconds in (2.0, 2.0, 0.1, 2.0):
+        breaker.record(False, seconds)
+
+    assert breaker.state == OPEN
+
+
+def test_half_open_probe_success_closes(monkeypatch):
+    breaker = CircuitBreaker("fake")
+    _open(breaker)
+    monkeypatch.setattr(settings, "llm_breaker_open_seconds", 0.0)
+
+    assert breaker.acquire()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.acquire()  # one probe at a time
+    breaker.record(False, 0.1)
+
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_failure_reopens(monkeypatch):
+    breaker = CircuitBreaker("fake")
+    _open(breaker)
+    monkeypatch.setattr(settings, "llm_breaker_open_seconds", 0.0)
+
+    assert breaker.acquire()
+    breaker.record(True, 0.1)
+
+    assert breaker.state == OPEN
+
+
+def test_guarded_ignores_permanent_errors():
+    with pytest.raises(ValueError):
+        with circuit_breaker.guarded("fake"):
+            raise ValueError("bad schema")
+
+    assert list(breaker_for("fake").outcomes) == []
+
+
+PRIMARY = Route(provider="openai", model="primary")
+BACKUP = Route(provider="fake", model="backup")
+
+
+def _provider(failing: set[str], called: list[str]):
+    async def call(route: Route) -> str:
+        called.append(route.provider)
+        if route.provider in failing:
+            raise FakeProviderError(503)
+        return route.model
+
+    return call
+
+
+@pytest.mark.asyncio
+async def test_failover_moves_to_the_next_route_on_transient_errors():
+    called: list[str] = []
+
+    result = await with_failover("environment", [PRIMARY, BACKUP], _provider({"openai"}, called))
+
+    assert result == "backup"
+    assert called == ["openai", "fake"]
+
+
+@pytest.mark.asyncio
+async def test_failover_skips_providers_whose_breaker_is_open():
+    _open(breaker_for("openai"))
+    called: list[str] = []
+
+    result = await with_failover("environment", [PRIMARY, BACKUP], _provider(set(), called))
+
+    assert result == "backup"
+    assert called == ["fake"]
+
+
+@pytest.mark.asyncio
+async def test_failover_with_every_breaker_open_raises():
+    _open(breaker_for("openai"))
+    _open(breaker_for("fake"))
+
+    with pytest.raises(CircuitOpenError):
+        await with_failover("environment", [PRIMARY, BACKUP], _provider(set(), []))
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_without_failover_is_a_503(client):
+    _open(breaker_for("fake"))
+
+    r = await client.post("/api/v1/ease", json={"request": "Reduce customer churn"})
+
+    assert r.status_code == 503
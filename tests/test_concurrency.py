@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+
+from src.utils.concurrency import Step, gather_bounded, run_dag
+
+
+@pytest.mark.asyncio
+async def test_gather_bounded_holds_the_bound():
+    running, peak = 0, 0
+
+    async def work() -> None:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    await gather_bounded([work() for _ in range(10)], limit=3)
+
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_gather_bounded_keeps_input_order():
+    async def work(i: int) -> int:
+        await asyncio.sleep(0.01 * (5 - i))  # later inputs finish first
+        return i
+
+    assert await gather_bounded([work(i) for i in range(5)], limit=5) == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_gather_bounded_cancels_the_rest_on_failure():
+    started, cancelled = [], []
+
+    async def fail() -> None:
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def slow(i: int) -> None:
+        started.append(i)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(i)
+            raise
+
+    with pytest.raises(ValueError, match="boom"):
+        await asyncio.wait_for(
+            gather_bounded([fail(), *(slow(i) for i in range(4))], limit=2), timeout=5
+        )
+    await asyncio.sleep(0.01)
+
+    assert started
+    assert cancelled == started
+    assert len(started) < 4  # the last ones never got a slot
+
+
+@pytest.mark.asyncio
+async def test_gather_bounded_treats_a_limit_below_one_as_one():
+    order = []
+
+    async def work(i: int) -> None:
+        order.append(("start", i))
+        await asyncio.sleep(0.01)
+        order.append(("end", i))
+
+    await gather_bounded([work(0), work(1)], limit=0)
+
+    assert order == [("start", 0), ("end", 0), ("start", 1), ("end", 1)]
+
+
+def _value(value):
+    async def fn(**deps):
+        await asyncio.sleep(0.01)
+        return value, deps
+
+    return fn
+
+
+@pytest.mark.asyncio
+async def test_run_dag_passes_dependency_results():
+    results = await run_dag(
+        {
+            "b": Step(_value("b"), after=("a",)),
+            "a": Step(_value("a")),
+            "c": Step(_value("c"), after=("a", "b")),
+        }
+    )
+
+    assert results["a"] == ("a", {})
+    assert results["c"] == ("c", {"a": results["a"], "b": results["b"]})
+
+
+@pytest.mark.asyncio
+async def test_run_dag_runs_independent_steps_concurrently():
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    await run_dag({name: Step(_value(name)) for name in "abcdef"})
+
+    assert loop.time() - started < 0.05
+
+
+@pytest.mark.asyncio
+async def test_run_dag_rejects_a_cycle():
+    steps = {
+        "a": Step(_value("a"), after=("c",)),
+        "b": Step(_value("b"), after=("a",)),
+        "c": Step(_value("c"), after=("b",)),
+    }
+
+    with pytest.raises(ValueError, match="cycle"):
+        await run_dag(steps)
+
+
+@pytest.mark.asyncio
+async def test_run_dag_rejects_an_unknown_dependency():
+    with pytest.raises(ValueError, match="unknown step"):
+        await run_dag({"a": Step(_value("a"), after=("missing",))})
+
+
+@pytest.mark.asyncio
+async def test_run_dag_cancels_unfinished_steps_when_one_fails():
+    cancelled, ran = [], []
+
+    async def fail() -> None:
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def slow() -> None:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append("slow")
+            raise
+
+    async def dependent(**deps) -> None:
+        ran.append("dependent")
+
+    with pytest.raises(ValueError, match="boom"):
+        await asyncio.wait_for(
+            run_dag(
+                {
+                    "fail": Step(fail),
+                    "slow": Step(slow),
+                    "dependent": Step(dependent, after=("fail",)),
+                }
+            ),
+            timeout=5,
+        )
+    await asyncio.sleep(0.01)
+
+    assert cancelled == ["slow"]
+    assert ran == []
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from src.config import settings
+from src.routers.actions import ACTIONS_SYSTEM_PROMPT
+from src.utils import fake_llm
+from src.utils.call_llm import stream_llm
+from src.utils.deadline import DeadlineExceededError, deadline
+from src.utils.rate_limit import get_limiter
+
+
+@pytest.mark.asyncio
+async def test_tight_deadline_degrades_instead_of_failing(client):
+    # Before any call is timed every stage is assumed to take
+    # EXPECTED_LLM_CALL_SECONDS (10 s), far more than the budget.
+    r = await client.post(
+        "/api/v1/ease",
+        json={"request": "Reduce customer churn", "min_actions": 3, "deadline_seconds": 5},
+    )
+
+    assert r.status_code == 200
+    assert r.json()["degradations"] == [
+        "skip_auto_improve",
+        "fast_safety",
+        "election_without_plan",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_no_deadline_means_no_degradation(client):
+    r = await client.post("/api/v1/ease", json={"request": "Reduce customer churn"})
+
+    assert r.status_code == 200
+    assert r.json()["degradations"] == []
+
+
+@pytest.mark.asyncio
+async def test_missed_deadline_is_a_504(client, monkeypatch):
+    monkeypatch.setattr(settings, "fake_llm_latency_ms", 300.0)
+
+    r = await client.post(
+        "/api/v1/ease", json={"request": "Reduce customer churn", "deadline_seconds": 0.2}
+    )
+
+    assert r.status_code == 504
+
+
+@pytest.mark.asyncio
+async def test_deadline_does_not_leak_into_an_identical_request(client, monkeypatch):
+    # Both runs analyze the same environment at the same time; the one
+    # without a deadline must not share the other's.
+    monkeypatch.setattr(settings, "fake_llm_latency_ms", 300.0)
+    body = {"request": "Open a second office", "min_actions": 3}
+
+    hurried, patient = await asyncio.gather(
+        client.post("/api/v1/ease", json={**body, "deadline_seconds": 0.2}),
+        client.post("/api/v1/ease", json=body),
+    )
+
+    assert hurried.status_code == 504
+    assert patient.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_stream_gives_up_waiting_for_the_limiter_at_the_deadline(monkeypatch):
+    monkeypatch.setattr(settings, "llm_max_in_flight", 1)
+
+    async def consume() -> None:
+        with deadline(0.1):
+            async for _ in stream_llm(ACTIONS_SYSTEM_PROMPT, "Queued", stage="actions"):
+                pass
+
+    async with get_limiter().slot("fake", 1):
+        with pytest.raises(DeadlineExceededError):
+            await asyncio.wait_for(consume(), timeout=5)
+    assert fake_llm.calls["actions"] == 0
@@ -0,0 +1,85 @@
+import asyncio
+from collections import defaultdict, deque
+
+import pytest
+
+from src.config import settings
+from src.utils import hedging
+from src.utils.routing import Route
+
+PRIMARY = Route(provider="fake", model="primary")
+
+
+@pytest.fixture
+def hedge_environment(monkeypatch):
+    monkeypatch.setattr(settings, "llm_hedge_stages", {"environment": {"model": "hedge"}})
+    monkeypatch.setattr(settings, "llm_hedge_min_samples", 5)
+    monkeypatch.setattr(settings, "llm_hedge_min_delay_seconds", 0.01)
+    monkeypatch.setattr(settings, "llm_hedge_max_ratio", 1.0)
+    monkeypatch.setattr(hedging, "_latencies", defaultdict(lambda: deque(maxlen=200)))
+    monkeypatch.setattr(hedging, "_calls", 0)
+    monkeypatch.setattr(hedging, "_hedges", 0)
+    hedging._latencies["environment"].extend([0.02] * 5)
+
+
+def _provider(latencies: dict[str, float], cancelled: list[str]):
+    async def call(route: Route) -> str:
+        try:
+            await asyncio.sleep(latencies[route.model])
+        except asyncio.CancelledError:
+            cancelled.append(route.model)
+            raise
+        return route.model
+
+    return call
+
+
+@pytest.mark.asyncio
+async def test_unlisted_stage_is_not_hedged(hedge_environment):
+    cancelled: list[str] = []
+    call = _provider({"primary": 0.05, "hedge": 0.0}, cancelled)
+
+    route, result = await hedging.hedged("election", PRIMARY, call)
+
+    assert (route, result) == (PRIMARY, "primary")
+    assert hedging.HEDGES_FIRED.value(stage="election") == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_call_is_hedged_and_the_loser_cancelled(hedge_environment):
+    won = hedging.HEDGES_WON.value(stage="environment")
+    cancelled: list[str] = []
+    call = _provider({"primary": 0.5, "hedge": 0.01}, cancelled)
+
+    route, result = await hedging.hedged("environment", PRIMARY, call)
+    await asyncio.sleep(0)
+
+    assert result == "hedge"
+    assert route.model == "hedge"
+    assert cancelled == ["primary"]
+    assert hedging.HEDGES_WON.value(stage="environment") == won + 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_call_still_counts_as_a_latency_sample(hedge_environment):
+    call = _provider({"primary": 0.5, "hedge": 0.05}, [])
+
+    await hedging.hedged("environment", PRIMARY, call)
+    await asyncio.sleep(0)
+
+    samples = list(hedging._latencies["environment"])[5:]
+    # The hedge's own time, and the primary's time until it was cancelled.
+    assert len(samples) == 2
+    assert min(samples) >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_fast_call_is_not_hedged(hedge_environment):
+    cancelled: list[str] = []
+    call = _provider({"primary": 0.0, "hedge": 0.0}, cancelled)
+
+    route, result = await hedging.hedged("environment", PRIMARY, call)
+
+    assert (route, result) == (PRIMARY, "primary")
+    assert cancelled == []
+    assert hedging._hedges == 0
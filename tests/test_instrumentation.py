@@ -0,0 +1,161 @@
+import time
+
+import pytest
+
+from src.config import settings
+from src.routers.actions import ACTIONS_SYSTEM_PROMPT
+from src.routers.environment import ENVIRONMENT_SYSTEM_PROMPT
+from src.utils import metrics
+from src.utils.call_llm import call_llm, stream_llm
+from src.utils.instrumentation import (
+    LLM_TOKENS,
+    LLM_TTFT_SECONDS,
+    estimate_cost,
+    record_llm_call,
+    record_timings,
+    stage_timer,
+)
+from src.utils.llm_cache import bypass_cache
+from src.utils.llm_providers import LLMUsage
+
+USAGE = LLMUsage(
+    input_tokens=1_000, cached_input_tokens=600, cache_write_tokens=100, output_tokens=200
+)
+
+
+@pytest.fixture
+def pricing(monkeypatch):
+    monkeypatch.setattr(
+        settings,
+        "llm_pricing",
+        {
+            "priced": {
+                "input": 2.0,
+                "cached_input": 0.5,
+                "cache_write": 3.0,
+                "output": 10.0,
+            },
+            "no-cache-price": {"input": 2.0},
+        },
+    )
+
+
+@pytest.fixture
+def registry(monkeypatch) -> list:
+    """An empty registry, so metrics made in a test stay out of /metrics."""
+    registry = []
+    monkeypatch.setattr(metrics, "_registry", registry)
+    return registry
+
+
+def _call(stage: str, **kwargs) -> None:
+    record_llm_call(
+        stage=stage,
+        action_id=None,
+        provider="fake",
+        model="priced",
+        started=time.perf_counter(),
+        **kwargs,
+    )
+
+
+def test_estimate_cost(pricing):
+    # 400 uncached * 2 + 600 cached * 0.5 + 100 written * 3 + 200 out * 10, per million.
+    assert estimate_cost("priced", USAGE) == pytest.approx(3_400 / 1_000_000)
+    # Cached input falls back to the input price.
+    assert estimate_cost("no-cache-price", USAGE) == pytest.approx(2_000 / 1_000_000)
+    assert estimate_cost("unpriced", USAGE) == 0.0
+
+
+def test_timings_summarize_calls_by_outcome(pricing):
+    with record_timings() as recorder:
+        _call("test.called", usage=USAGE, tokens_saved=50)
+        _call("test.cache_hit", tokens_saved=50)
+        _call("test.shared", deduplicated=True, tokens_saved=50)
+        with stage_timer("test.stage"):
+            pass
+
+    summary = recorder.summary()
+    outcomes = [c.outcome for c in summary.llm_calls]
+    assert outcomes == ["called", "cache_hit", "deduplicated"]
+    assert [c.cache_hit for c in summary.llm_calls] == [False, True, False]
+    assert summary.total_llm_calls == 1
+    assert summary.total_input_tokens == 1_000
+    assert summary.total_cached_input_tokens == 600
+    assert summary.total_prompt_tokens_saved == 50
+    assert summary.total_estimated_cost_usd == pytest.approx(0.0034)
+    assert [s.stage for s in summary.stages] == ["test.stage"]
+
+
+def test_calls_outside_a_recorder_are_only_observed():
+    with record_timings(enabled=False) as recorder:
+        _call("test.unrecorded", usage=USAGE)
+
+    assert recorder is None
+    assert LLM_TOKENS.value(stage="test.unrecorded", kind="output") == 200
+
+
+def test_calls_observed_elsewhere_are_recorded_but_not_observed_again():
+    with record_timings() as recorder:
+        _call("test.unobserved", usage=USAGE, observe=False)
+
+    assert recorder.summary().total_llm_calls == 1
+    assert LLM_TOKENS.value(stage="test.unobserved", kind="output") == 0
+
+
+def test_stage_timer_records_failed_stages():
+    with record_timings() as recorder, pytest.raises(ValueError):
+        with stage_timer("test.failing"):
+            raise ValueError("boom")
+
+    assert [s.stage for s in recorder.stages] == ["test.failing"]
+
+
+@pytest.mark.asyncio
+async def test_time_to_first_token_is_only_measured_for_streamed_calls():
+    with record_timings() as recorder, bypass_cache():
+        await call_llm(ENVIRONMENT_SYSTEM_PROMPT, "Request: ttft", stage="test.plain")
+        async for _ in stream_llm(
+            ACTIONS_SYSTEM_PROMPT, "Environment: ttft", stage="test.stream"
+        ):
+            pass
+
+    plain, streamed = sorted(recorder.calls, key=lambda c: c.stage)
+    assert plain.time_to_first_token_seconds is None
+    assert 0 <= streamed.time_to_first_token_seconds <= streamed.wall_seconds
+    exposition = LLM_TTFT_SECONDS.render()
+    assert 'stage="test.stream"' in exposition
+    assert 'stage="test.plain"' not in exposition
+
+
+def test_counter_and_gauge_exposition(registry):
+    requests = metrics.Counter("test_requests_total", "Requests", ["path"])
+    in_flight = metrics.Gauge("test_in_flight", "In flight")
+    requests.inc(path='/a"b')
+    requests.inc(2, path='/a"b')
+    in_flight.inc(3)
+    in_flight.dec()
+
+    assert requests.value(path='/a"b') == 3.0
+    assert metrics.render() == (
+        "# HELP test_requests_total Requests\n"
+        "# TYPE test_requests_total counter\n"
+        'test_requests_total{path="/a\\"b"} 3.0\n'
+        "# HELP test_in_flight In flight\n"
+        "# TYPE test_in_flight gauge\n"
+        "test_in_flight 2.0\n"
+    )
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    latency = metrics.Histogram("test_seconds", "Latency", ["stage"], buckets=(1.0, 0.5))
+    for value in (0.25, 0.75, 3.0):
+        latency.observe(value, stage="s")
+
+    assert latency.render().splitlines()[2:] == [
+        'test_seconds_bucket{stage="s",le="0.5"} 1',
+        'test_seconds_bucket{stage="s",le="1.0"} 2',
+        'test_seconds_bucket{stage="s",le="+Inf"} 3',
+        'test_seconds_sum{stage="s"} 4.0',
+        'test_seconds_count{stage="s"} 3',
+    ]
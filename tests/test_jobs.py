@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+from src.config import settings
+from src.routers import jobs
+from src.utils import fake_llm
+from src.utils.job_store import JobStore
+from src.utils.jobs import JobExecutor
+
+REQUEST = {"request": "Reduce customer churn", "min_actions": 3}
+
+
+async def _wait_for(client, job_id: str, *statuses: str) -> dict:
+    async def poll() -> dict:
+        while True:
+            job = (await client.get(f"/api/v1/ease/jobs/{job_id}")).json()
+            if job["status"] in statuses:
+                return job
+            await asyncio.sleep(0.02)
+
+    return await asyncio.wait_for(poll(), timeout=10)
+
+
+@pytest.mark.asyncio
+async def test_submit_poll_and_fetch_the_result(client):
+    r = await client.post("/api/v1/ease/jobs", json=REQUEST)
+
+    assert r.status_code == 202
+    job_id = r.json()["job_id"]
+    job = await _wait_for(client, job_id, "succeeded", "failed")
+    assert job["status"] == "succeeded"
+    result = await client.get(f"/api/v1/ease/jobs/{job_id}/result")
+    assert result.status_code == 200
+    assert result.json()["election"]["elected_action"]["id"]
+
+
+@pytest.mark.asyncio
+async def test_result_of_an_unfinished_job_is_a_409(client, monkeypatch):
+    monkeypatch.setattr(settings, "fake_llm_latency_ms", 200.0)
+    job_id = (await client.post("/api/v1/ease/jobs", json=REQUEST)).json()["job_id"]
+
+    r = await client.get(f"/api/v1/ease/jobs/{job_id}/result")
+
+    assert r.status_code == 409
+    assert r.json()["detail"]["status"] in ("queued", "running")
+
+
+@pytest.mark.asyncio
+async def test_unknown_job_is_a_404(client):
+    r = await client.get("/api/v1/ease/jobs/missing")
+
+    assert r.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_cancel_a_running_job(client, monkeypatch):
+    monkeypatch.setattr(settings, "fake_llm_latency_ms", 5000.0)
+    job_id = (await client.post("/api/v1/ease/jobs", json=REQUEST)).json()["job_id"]
+    await _wait_for(client, job_id, "running")
+
+    r = await client.post(f"/api/v1/ease/jobs/{job_id}/cancel")
+
+    assert r.status_code == 200
+    job = await _wait_for(client, job_id, "cancelled", "failed", "succeeded")
+    assert job["status"] == "cancelled"
+
+
+@pytest.mark.asyncio
+async def test_jobs_are_not_coalesced_with_http_requests(client, monkeypatch):
+    monkeypatch.setattr(settings, "fake_llm_latency_ms", 100.0)
+    body = {**REQUEST, "no_cache": True}
+
+    job_id = (await client.post("/api/v1/ease/jobs", json=body)).json()["job_id"]
+    await client.post("/api/v1/ease", json=body)
+
+    assert (await _wait_for(client, job_id, "succeeded", "failed"))["status"] == "succeeded"
+    assert fake_llm.calls["environment"] == 2
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_a_429(client, monkeypatch, tmp_path):
+    async def never_run(request_json: str) -> str:
+        raise AssertionError("no worker should pick up the job")
+
+    executor = JobExecutor(
+        store=JobStore(str(tmp_path / "jobs.sqlite3"), ttl_seconds=60),
+        run=never_run,
+        max_workers=0,
+        queue_depth=1,
+    )
+    monkeypatch.setattr(jobs, "_executor", executor)
+
+    first = await client.post("/api/v1/ease/jobs", json=REQUEST)
+    second = await client.post("/api/v1/ease/jobs", json=REQUEST)
+
+    assert first.status_code == 202
+    assert second.status_code == 429
+    assert second.headers["retry-after"] == "5"
+
+
+@pytest.mark.asyncio
+async def test_job_of_a_dead_worker_is_failed_by_another(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    started = asyncio.Event()
+
+    async def hang(request_json: str) -> str:
+        started.set()
+        await asyncio.Event().wait()
+
+    def executor() -> JobExecutor:
+        return JobExecutor(
+            store=JobStore(path, ttl_seconds=60, lease_seconds=0.2),
+            run=hang,
+            max_workers=1,
+            queue_depth=1,
+            cancel_poll_seconds=0.05,
+        )
+
+    dying, survivor = executor(), executor()
+    await dying.start()
+    try:
+        job_id = await dying.submit("{}")
+        await started.wait()
+        await asyncio.sleep(0.4)
+        # Renewed while its worker is alive.
+        assert (await dying.store.get(job_id)).status == "running"
+
+        dying._poller.cancel()  # the worker stops renewing, as if it died
+        await asyncio.sleep(0.4)
+        await survivor.start()
+
+        job = await survivor.store.get(job_id)
+        assert job.status == "failed"
+        assert job.error == "Worker lost"
+    finally:
+        await survivor.stop()
+        await dying.stop()
@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+from src.config import settings
+from src.models.environment import Environment
+from src.routers.actions import ACTIONS_SYSTEM_PROMPT
+from src.routers.environment import ENVIRONMENT_SYSTEM_PROMPT
+from src.utils import fake_llm, llm_cache
+from src.utils.call_llm import call_llm, call_llm_structured, stream_llm
+from src.utils.llm_cache import ResponseCache, bypass_cache
+from src.utils.structured_output import REPAIR_SYSTEM_PROMPT
+
+
+@pytest.fixture
+def cache(monkeypatch) -> ResponseCache:
+    """Caching on, with an empty memory-only cache."""
+    cache = ResponseCache(max_entries=100, ttl_seconds=60)
+    monkeypatch.setattr(settings, "llm_cache_enabled", True)
+    monkeypatch.setattr(llm_cache, "_cache", cache)
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_after_their_ttl():
+    cache = ResponseCache(max_entries=10, ttl_seconds=0.05)
+    await cache.set("key", "value")
+
+    assert await cache.get("key") == "value"
+    await asyncio.sleep(0.1)
+    assert await cache.get("key") is None
+    assert cache.stats()["memory_entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+    await cache.set("a", "1")
+    await cache.set("b", "2")
+    await cache.get("a")
+
+    await cache.set("c", "3")
+
+    assert await cache.get("a") == "1"
+    assert await cache.get("b") is None
+    assert await cache.get("c") == "3"
+
+
+@pytest.mark.asyncio
+async def test_sqlite_tier_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer = ResponseCache(max_entries=10, ttl_seconds=60, path=path)
+    reader = ResponseCache(max_entries=10, ttl_seconds=60, path=path)
+    short_lived = ResponseCache(max_entries=10, ttl_seconds=0.05, path=path)
+
+    await writer.set("key", "value")
+    await short_lived.set("expiring", "value")
+    await asyncio.sleep(0.1)
+
+    assert await reader.get("key") == "value"
+    assert await reader.get("expiring") is None
+    assert reader.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "hit_rate": 0.5,
+        "memory_entries": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_repeated_calls_are_served_from_the_cache(cache):
+    for _ in range(2):
+        await call_llm(ENVIRONMENT_SYSTEM_PROMPT, "Request: cache", stage="environment")
+
+    assert fake_llm.calls["environment"] == 1
+    assert cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_key_includes_the_model(cache, monkeypatch):
+    await call_llm(ENVIRONMENT_SYSTEM_PROMPT, "Request: model", stage="environment")
+    monkeypatch.setattr(settings, "llm_model", "another-model")
+
+    await call_llm(ENVIRONMENT_SYSTEM_PROMPT, "Request: model", stage="environment")
+
+    assert fake_llm.calls["environment"] == 2
+
+
+@pytest.mark.asyncio
+async def test_bypassed_calls_neither_read_nor_write_the_cache(cache):
+    await call_llm(ENVIRONMENT_SYSTEM_PROMPT, "Request: bypass", stage="environment")
+
+    with bypass_cache():
+        await call_llm(ENVIRONMENT_SYSTEM_PROMPT, "Request: bypass", stage="environment")
+        await call_llm(ENVIRONMENT_SYSTEM_PROMPT, "Request: other", stage="environment")
+
+    assert fake_llm.calls["environment"] == 3
+    assert cache.stats()["memory_entries"] == 1
+
+
+@pytest.fixture
+def environment_without_state(monkeypatch):
+    """The fake leaves out current_state; its correction call adds it back."""
+    handlers = fake_llm._handlers()
+    name, environment = handlers[ENVIRONMENT_SYSTEM_PROMPT]
+    repair_name, repair = handlers[REPAIR_SYSTEM_PROMPT]
+
+    def broken_environment(user_prompt, rng):
+        generated = environment(user_prompt, rng)
+        del generated["current_state"]
+        return generated
+
+    def fixing_repair(user_prompt, rng):
+        return {"current_state": "Corrected", **repair(user_prompt, rng)}
+
+    monkeypatch.setitem(handlers, ENVIRONMENT_SYSTEM_PROMPT, (name, broken_environment))
+    monkeypatch.setitem(handlers, REPAIR_SYSTEM_PROMPT, (repair_name, fixing_repair))
+
+
+@pytest.mark.asyncio
+async def test_responses_that_fail_validation_are_not_cached(
+    cache, environment_without_state
+):
+    for _ in range(2):
+        environment = await call_llm_structured(
+            ENVIRONMENT_SYSTEM_PROMPT, "Request: invalid", Environment, stage="environment"
+        )
+
+    assert environment.current_state == "Corrected"
+    assert fake_llm.calls["environment"] == 2
+    # The correction validates, so the second re-ask is a cache hit.
+    assert fake_llm.calls["repair"] == 1
+
+
+@pytest.mark.asyncio
+async def test_streams_are_cached_only_if_they_pass_the_check(cache):
+    for cacheable in (lambda text: False, lambda text: True, lambda text: True):
+        chunks = stream_llm(
+            ACTIONS_SYSTEM_PROMPT, "Environment: stream", stage="actions", cacheable=cacheable
+        )
+        text = "".join([chunk async for chunk in chunks])
+
+    assert text
+    assert fake_llm.calls["actions"] == 2
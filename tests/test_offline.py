@@ -0,0 +1,103 @@
+import asyncio
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from src.config import settings
+from src.offline import run_offline
+from src.routers.environment import ENVIRONMENT_SYSTEM_PROMPT
+from src.utils import fake_llm
+
+ITEMS = [
+    {"request": "Reduce customer churn", "min_actions": 3},
+    {"request": "Open a second office", "min_actions": 3},
+    {"request": "Hire a CFO", "min_actions": 99},
+]
+
+
+@pytest.fixture
+def offline_dirs(tmp_path, monkeypatch) -> Path:
+    monkeypatch.setattr(settings, "offline_batch_dir", str(tmp_path / "batches"))
+    monkeypatch.setattr(settings, "offline_journal_dir", str(tmp_path / "journal"))
+    monkeypatch.setattr(settings, "offline_collect_seconds", 0.05)
+    monkeypatch.setattr(settings, "offline_poll_seconds", 0.01)
+    monkeypatch.setattr(settings, "offline_file_turnaround_seconds", 0.0)
+    return tmp_path
+
+
+def _submitted_calls(batches: Path) -> list[dict]:
+    return [
+        json.loads(line)
+        for path in batches.glob("*/input.jsonl")
+        for line in path.read_text().splitlines()
+    ]
+
+
+def _results(path: Path) -> dict[int, int]:
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    return {line["index"]: line["status_code"] for line in lines}
+
+
+@pytest.mark.asyncio
+async def test_offline_run_answers_every_request(client, offline_dirs):
+    output = offline_dirs / "results.ndjson"
+
+    statuses = await run_offline(ITEMS, output, "run")
+
+    assert statuses == {200: 2, 422: 1}
+    assert _results(output) == {0: 200, 1: 200, 2: 422}
+    # Every LLM call went through a batch.
+    assert len(_submitted_calls(offline_dirs / "batches")) == sum(fake_llm.calls.values())
+
+
+@pytest.mark.asyncio
+async def test_interrupted_run_resumes_without_resubmitting(
+    client, offline_dirs, monkeypatch
+):
+    # The backend never answers, so the run stops at its first batch.
+    monkeypatch.setattr(settings, "offline_file_turnaround_seconds", -1.0)
+    output = offline_dirs / "results.ndjson"
+    interrupted = asyncio.create_task(run_offline(ITEMS, output, "nightly"))
+    journal = offline_dirs / "journal" / "nightly.sqlite3"
+    while not journal.exists() or not _journaled_batches(journal):
+        await asyncio.sleep(0.01)
+    interrupted.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await interrupted
+    first_batches = {p.name for p in (offline_dirs / "batches").iterdir()}
+
+    monkeypatch.setattr(settings, "offline_file_turnaround_seconds", 0.0)
+    statuses = await run_offline(ITEMS, output, "nightly")
+
+    assert statuses == {200: 2, 422: 1}
+    assert len(first_batches) == 1
+    environment_calls = [
+        call
+        for call in _submitted_calls(offline_dirs / "batches")
+        if call["system_prompt"] == ENVIRONMENT_SYSTEM_PROMPT
+    ]
+    assert len(environment_calls) == len(ITEMS)
+
+
+@pytest.mark.asyncio
+async def test_finished_run_replays_from_its_journal(client, offline_dirs):
+    output = offline_dirs / "results.ndjson"
+    await run_offline(ITEMS, output, "run")
+    batches = {p.name for p in (offline_dirs / "batches").iterdir()}
+    fake_llm.reset_calls()
+
+    statuses = await run_offline(ITEMS, output, "run")
+
+    assert statuses == {200: 2, 422: 1}
+    assert {p.name for p in (offline_dirs / "batches").iterdir()} == batches
+    assert sum(fake_llm.calls.values()) == 0
+
+
+def _journaled_batches(journal: Path) -> int:
+    with sqlite3.connect(journal) as conn:
+        try:
+            return conn.execute("SELECT COUNT(*) FROM batches").fetchone()[0]
+        except sqlite3.OperationalError:
+            return 0
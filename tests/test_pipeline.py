@@ -0,0 +1,80 @@
+import pytest
+
+from src.config import settings
+from src.utils import fake_llm
+
+
+@pytest.fixture
+def call_log(monkeypatch):
+    """Order in which fake provider calls start, and the actions stream ends."""
+    log: list[str] = []
+    complete, stream = fake_llm.complete, fake_llm.stream
+
+    async def logged_complete(system_prompt, user_prompt):
+        log.append(fake_llm._handlers()[system_prompt][0])
+        return await complete(system_prompt, user_prompt)
+
+    async def logged_stream(system_prompt, user_prompt):
+        log.append(fake_llm._handlers()[system_prompt][0])
+        async for chunk in stream(system_prompt, user_prompt):
+            yield chunk
+        log.append("actions.end")
+
+    monkeypatch.setattr(fake_llm, "complete", logged_complete)
+    monkeypatch.setattr(fake_llm, "stream", logged_stream)
+    return log
+
+
+@pytest.mark.asyncio
+async def test_safety_starts_while_actions_are_still_streaming(client, monkeypatch, call_log):
+    monkeypatch.setattr(settings, "fake_llm_latency_ms", 200.0)
+
+    r = await client.post(
+        "/api/v1/ease", json={"request": "Reduce customer churn", "min_actions": 5}
+    )
+
+    assert r.status_code == 200
+    assert call_log.index("safety.improve") < call_log.index("actions.end")
+
+
+@pytest.mark.asyncio
+async def test_batched_safety_waits_for_every_action(client, monkeypatch, call_log):
+    monkeypatch.setattr(settings, "fake_llm_latency_ms", 50.0)
+
+    r = await client.post(
+        "/api/v1/ease",
+        json={"request": "Reduce customer churn", "min_actions": 5, "mode": "batched"},
+    )
+
+    assert r.status_code == 200
+    assert call_log.index("actions.end") < call_log.index("safety.batch.improve")
+
+
+@pytest.mark.parametrize("mode", ["thorough", "fast", "batched"])
+@pytest.mark.asyncio
+async def test_evaluations_follow_the_order_of_the_actions(client, monkeypatch, mode):
+    # Uneven latencies make evaluations finish out of order.
+    monkeypatch.setattr(settings, "fake_llm_latency_ms", 30.0)
+    monkeypatch.setattr(settings, "fake_llm_latency_stddev_ms", 25.0)
+    monkeypatch.setattr(settings, "fake_llm_latency_distribution", "uniform")
+
+    r = await client.post(
+        "/api/v1/ease",
+        json={"request": "Reduce customer churn", "min_actions": 6, "mode": mode},
+    )
+
+    assert r.status_code == 200
+    body = r.json()
+    action_ids = [a["id"] for a in body["actions"]]
+    assert [e["action_id"] for e in body["evaluations"]] == action_ids
+    assert body["election"]["elected_action"]["id"] in action_ids
+
+
+@pytest.mark.asyncio
+async def test_stream_reports_each_stage_in_order(client):
+    r = await client.post(
+        "/api/v1/ease/stream", json={"request": "Reduce customer churn", "min_actions": 3}
+    )
+
+    events = [line[len("event: "):] for line in r.text.splitlines() if line.startswith("event: ")]
+    assert events == ["environment", "actions", *["evaluation"] * 4, "election", "done"]
@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+
+from src.utils.llm_providers import (
+    LLMUsage,
+    PromptSegment,
+    _anthropic_request,
+    _anthropic_usage,
+    _google_request,
+    _openai_request,
+    _openai_usage,
+    prompt_text,
+)
+
+SYSTEM = "You are a careful assistant."
+ENVIRONMENT = PromptSegment("Environment: shared\n\n", cacheable=True)
+
+
+def _prompt(action: str) -> list[PromptSegment]:
+    return [ENVIRONMENT, PromptSegment(f"Action: {action}")]
+
+
+def test_anthropic_breakpoints_on_the_system_prompt_and_the_static_prefix():
+    request = _anthropic_request("m", SYSTEM, _prompt("a"), max_tokens=100)
+
+    assert request["system"] == [
+        {"type": "text", "text": SYSTEM, "cache_control": {"type": "ephemeral"}}
+    ]
+    assert request["messages"][0]["content"] == [
+        {
+            "type": "text",
+            "text": ENVIRONMENT.text,
+            "cache_control": {"type": "ephemeral"},
+        },
+        {"type": "text", "text": "Action: a"},
+    ]
+
+
+def test_anthropic_breakpoint_goes_on_the_last_cacheable_segment():
+    prompt = [PromptSegment("one", cacheable=True), ENVIRONMENT, PromptSegment("tail")]
+
+    request = _anthropic_request("m", SYSTEM, prompt, max_tokens=100)
+    content = request["messages"][0]["content"]
+
+    assert ["cache_control" in block for block in content] == [False, True, False]
+
+
+def test_anthropic_plain_prompt_has_no_user_breakpoint():
+    request = _anthropic_request("m", SYSTEM, "Request", max_tokens=100)
+
+    assert request["messages"][0]["content"] == [{"type": "text", "text": "Request"}]
+
+
+def test_openai_cache_key_follows_the_static_prefix():
+    first = _openai_request("m", SYSTEM, _prompt("a"), max_tokens=100)
+    second = _openai_request("m", SYSTEM, _prompt("b"), max_tokens=100)
+    other = _openai_request(
+        "m", SYSTEM, [PromptSegment("Environment: other", cacheable=True)], max_tokens=100
+    )
+
+    assert first["prompt_cache_key"] == second["prompt_cache_key"]
+    assert first["prompt_cache_key"] != other["prompt_cache_key"]
+    assert first["input"] == prompt_text(_prompt("a")) == ENVIRONMENT.text + "Action: a"
+
+
+def test_google_sends_the_static_segments_first():
+    request = _google_request("m", SYSTEM, _prompt("a"), max_tokens=100)
+
+    assert request["contents"] == [ENVIRONMENT.text, "Action: a"]
+    assert request["config"].system_instruction == SYSTEM
+
+
+def test_anthropic_usage_counts_cache_reads_and_writes_as_input():
+    usage = LLMUsage()
+    raw = SimpleNamespace(
+        input_tokens=10,
+        cache_read_input_tokens=200,
+        cache_creation_input_tokens=30,
+        output_tokens=5,
+    )
+
+    _anthropic_usage(raw, usage)
+
+    assert usage == LLMUsage(
+        input_tokens=240, cached_input_tokens=200, cache_write_tokens=30, output_tokens=5
+    )
+    assert usage.uncached_input_tokens == 40
+
+
+def test_openai_usage_reads_cached_tokens():
+    usage = LLMUsage()
+    raw = SimpleNamespace(
+        input_tokens=300,
+        input_tokens_details=SimpleNamespace(cached_tokens=256),
+        output_tokens=7,
+    )
+
+    _openai_usage(raw, usage)
+
+    assert (usage.cached_input_tokens, usage.uncached_input_tokens) == (256, 44)
@@ -0,0 +1,81 @@
+import json
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel
+
+from src.config import settings
+from src.utils.llm_providers import PromptSegment
+from src.utils.prompt_encoding import encode, segment, tokens_saved
+
+
+class _Step(BaseModel):
+    id: str
+    cost: int
+    owner: Optional[str] = None
+
+
+DATA = {
+    "name": "Churn",
+    "notes": "",
+    "tags": [],
+    "steps": [_Step(id="a1", cost=2), "call back"],
+    "meta": {"ok": True, "owner": None},
+}
+
+
+def test_pretty_keeps_every_field():
+    text = encode(DATA, "pretty")
+
+    assert json.loads(text)["steps"][0] == {"id": "a1", "cost": 2, "owner": None}
+    assert text == json.dumps(json.loads(text), indent=2)
+    assert text.tokens_saved == 0
+
+
+def test_compact_drops_empty_fields_and_counts_the_saving():
+    text = encode(DATA, "compact")
+
+    assert text == (
+        '{"name":"Churn","steps":[{"id":"a1","cost":2},"call back"],"meta":{"ok":true}}'
+    )
+    assert text.tokens_saved > 0
+
+
+def test_terse_renders_key_value_lines():
+    text = encode(DATA, "terse")
+
+    assert text.splitlines() == [
+        "name: Churn",
+        "steps:",
+        "  - id: a1",
+        "    cost: 2",
+        "  - call back",
+        "meta:",
+        "  ok: true",
+    ]
+    assert text.tokens_saved > encode(DATA, "compact").tokens_saved
+
+
+def test_encoding_defaults_to_the_setting(monkeypatch):
+    monkeypatch.setattr(settings, "prompt_encoding", "pretty")
+
+    assert encode(DATA) == encode(DATA, "pretty")
+
+
+def test_unknown_encoding_is_rejected():
+    with pytest.raises(ValueError, match="Unknown prompt encoding"):
+        encode(DATA, "yaml")
+
+
+def test_segments_carry_the_saving_of_their_encoded_parts():
+    first = encode(DATA, "compact")
+    second = encode([DATA], "terse")
+
+    cached = segment("Data:\n", first, cacheable=True)
+    rest = segment("More:\n", second, "\n")
+
+    assert cached == PromptSegment(f"Data:\n{first}", True, first.tokens_saved)
+    assert rest.text == f"More:\n{second}\n" and not rest.cacheable
+    assert tokens_saved([cached, rest]) == first.tokens_saved + second.tokens_saved
+    assert tokens_saved(first) == first.tokens_saved
+    assert tokens_saved("plain text") == 0
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+import pytest
+
+from src.config import settings
+from src.utils.rate_limit import LLMLimiter, ProviderLimits
+
+# Holds one slot of provider "shared" until stdin closes, like another worker.
+_OTHER_WORKER = """
+import asyncio, sys
+from src.utils.rate_limit import LLMLimiter
+
+async def main():
+    async with LLMLimiter(sys.argv[1], lease_seconds=60, poll_seconds=0.01).slot("shared", 1):
+        print("held", flush=True)
+        await asyncio.to_thread(sys.stdin.read)
+
+asyncio.run(main())
+"""
+
+_NO_LIMITS = {"max_in_flight": 0, "requests_per_minute": 0, "tokens_per_minute": 0}
+
+
+@pytest.fixture
+def limiter(tmp_path) -> LLMLimiter:
+    return LLMLimiter(str(tmp_path / "limits.sqlite3"), lease_seconds=60, poll_seconds=0.01)
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    def set_limits(provider: str, **limits: int) -> dict:
+        limits = {**_NO_LIMITS, **limits}
+        monkeypatch.setitem(settings.llm_provider_limits, provider, limits)
+        return limits
+
+    return set_limits
+
+
+async def _blocks(limiter: LLMLimiter, provider: str, tokens: int = 1) -> bool:
+    """Whether a slot for ``provider`` is still unavailable after a short wait."""
+    try:
+        await asyncio.wait_for(limiter.slot(provider, tokens).__aenter__(), timeout=0.2)
+    except TimeoutError:
+        return True
+    return False
+
+
+@pytest.mark.asyncio
+async def test_in_flight_calls_are_capped(limiter, limits):
+    limits("capped", max_in_flight=2)
+    running, peak = 0, 0
+
+    async def call() -> None:
+        nonlocal running, peak
+        async with limiter.slot("capped", 1):
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05)
+            running -= 1
+
+    await asyncio.gather(*(call() for _ in range(6)))
+
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_in_arrival_order(limiter, limits):
+    limits("fifo", max_in_flight=1)
+    order = []
+
+    async def call(name: str) -> None:
+        async with limiter.slot("fifo", 1):
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    async with limiter.slot("fifo", 1):
+        waiters = []
+        for name in "abcd":
+            waiters.append(asyncio.create_task(call(name)))
+            await asyncio.sleep(0.02)
+    await asyncio.gather(*waiters)
+
+    assert order == list("abcd")
+
+
+@pytest.mark.asyncio
+async def test_requests_per_minute_bucket(limiter, limits):
+    limits("rpm", requests_per_minute=2)
+    for _ in range(2):
+        async with limiter.slot("rpm", 1):
+            pass
+
+    assert await _blocks(limiter, "rpm")
+    wait = limiter._try_acquire("rpm", "probe", 1, ProviderLimits(0, 2, 0))
+    assert 25 < wait <= 30  # one request refills every 30 s
+
+
+@pytest.mark.asyncio
+async def test_tokens_per_minute_bucket_settles_actual_usage(limiter, limits):
+    limits("tpm", tokens_per_minute=100)
+    async with limiter.slot("tpm", 80) as slot:
+        slot.actual_tokens = 10
+
+    # 80 tokens were reserved but only 10 used: 90 are left.
+    async with limiter.slot("tpm", 85):
+        pass
+    assert await _blocks(limiter, "tpm", 50)
+
+
+@pytest.mark.asyncio
+async def test_oversized_call_takes_the_whole_bucket(limiter, limits):
+    limits("big", tokens_per_minute=100)
+
+    async with limiter.slot("big", 10_000) as slot:
+        assert slot.estimated_tokens == 100
+
+
+@pytest.mark.asyncio
+async def test_cancelled_acquisition_does_not_leak_its_lease(limiter, limits, monkeypatch):
+    limits("cancelled", max_in_flight=1)
+    try_acquire = limiter._try_acquire
+
+    def slow_try_acquire(*args):
+        time.sleep(0.1)  # the caller is cancelled meanwhile
+        return try_acquire(*args)
+
+    monkeypatch.setattr(limiter, "_try_acquire", slow_try_acquire)
+    with pytest.raises(TimeoutError):
+        await asyncio.wait_for(limiter.slot("cancelled", 1).__aenter__(), timeout=0.02)
+    monkeypatch.setattr(limiter, "_try_acquire", try_acquire)
+    await asyncio.sleep(0.2)
+
+    assert not await _blocks(limiter, "cancelled")
+
+
+@pytest.mark.asyncio
+async def test_leases_are_shared_with_other_processes(limiter, limits):
+    shared = limits("shared", max_in_flight=1)
+    other = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-c",
+        _OTHER_WORKER,
+        limiter.path,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        env={**os.environ, "LLM_PROVIDER_LIMITS": json.dumps({"shared": shared})},
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    try:
+        assert await asyncio.wait_for(other.stdout.readline(), timeout=10) == b"held\n"
+        assert await _blocks(limiter, "shared")
+    finally:
+        other.stdin.close()
+        await other.wait()
+
+    started = time.monotonic()
+    async with limiter.slot("shared", 1):
+        pass
+    assert time.monotonic() - started < 1
+
+
+@pytest.mark.asyncio
+async def test_providers_without_limits_skip_the_store(tmp_path, limits):
+    limits("free")
+    limiter = LLMLimiter(str(tmp_path / "limits.sqlite3"), lease_seconds=60, poll_seconds=0.01)
+    os.remove(limiter.path)
+
+    async with limiter.slot("free", 1):
+        pass
+
+    assert not os.path.exists(limiter.path)
@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+from pydantic import TypeAdapter, ValidationError
+
+from src.config import settings
+from src.models.actions import Action
+from src.utils import fake_llm
+from src.utils.json_stream import iter_json_array
+from src.utils.structured_output import validate_repaired
+
+ACTION = {
+    "id": "A1",
+    "name": "Retention campaign",
+    "description": "Reach out to customers at risk of churning.",
+    "prerequisites": [],
+    "expected_outcomes": [],
+    "resources_required": [],
+    "reversibility": "high",
+    "time_to_effect": "1 month",
+}
+
+
+def test_local_fixes():
+    data = {
+        **ACTION,
+        "id": "Action 3",
+        "reversibility": "Moderate",
+        "goal_achievement_score": "8/10",
+        "resource_efficiency_score": 12,
+    }
+
+    action, repaired = validate_repaired(data, TypeAdapter(Action))
+
+    assert repaired
+    assert action.id == "A3"
+    assert action.reversibility == "medium"
+    assert action.goal_achievement_score == 8.0
+    assert action.resource_efficiency_score == 10
+
+
+def test_unfixable_errors_are_raised():
+    data = {key: value for key, value in ACTION.items() if key != "name"}
+
+    with pytest.raises(ValidationError):
+        validate_repaired(data, TypeAdapter(Action))
+
+
+async def _chunks(text: str, size: int):
+    for i in range(0, len(text), size):
+        yield text[i : i + size]
+
+
+@pytest.mark.asyncio
+async def test_streamed_elements_tolerate_fences_and_trailing_commas():
+    text = '```json\n[{"id": "A1", "tags": ["x", "y",],}, {"id": "A2"},]\n```'
+
+    items = [item async for item in iter_json_array(_chunks(text, 5))]
+
+    assert items == [{"id": "A1", "tags": ["x", "y"]}, {"id": "A2"}]
+
+
+@pytest.mark.asyncio
+async def test_unclosed_stream_raises():
+    with pytest.raises(ValueError):
+        [item async for item in iter_json_array(_chunks('[{"id": "A1"}, {"id"', 4))]
+
+
+@pytest.mark.asyncio
+async def test_malformed_responses_are_repaired_locally(client, monkeypatch):
+    monkeypatch.setattr(settings, "fake_llm_malformed_rate", 1.0)
+
+    r = await client.post(
+        "/api/v1/ease", json={"request": "Reduce customer churn", "min_actions": 3}
+    )
+
+    assert r.status_code == 200
+    assert [a["id"] for a in r.json()["actions"]] == ["A1", "A2", "A3", "A0"]
+    assert fake_llm.calls["repair"] == 0
+
+
+@pytest.fixture
+def first_action_without_name(monkeypatch):
+    """The fake drops A1's name; its correction call puts one back."""
+    actions, repair = fake_llm._actions, fake_llm._repair
+
+    def broken_actions(user_prompt, rng):
+        generated = actions(user_prompt, rng)
+        del generated[0]["name"]
+        return generated
+
+    def fixing_repair(user_prompt, rng):
+        fixed = repair(user_prompt, rng)
+        for item in fixed if isinstance(fixed, list) else [fixed]:
+            item.setdefault("name", "Corrected")
+        return fixed
+
+    monkeypatch.setattr(fake_llm, "_actions", broken_actions)
+    monkeypatch.setattr(fake_llm, "_repair", fixing_repair)
+    fake_llm._handlers.cache_clear()
+    yield
+    fake_llm._handlers.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_streamed_action_is_re_asked_after_the_stream(
+    client, monkeypatch, first_action_without_name
+):
+    # With one call in flight, re-asking while the stream still holds
+    # the slot would wait forever.
+    monkeypatch.setattr(settings, "llm_max_in_flight", 1)
+    environment = (
+        await client.post("/api/v1/environment", json={"request": "Reduce customer churn"})
+    ).json()
+
+    r = await asyncio.wait_for(
+        client.post(
+            "/api/v1/actions", json={"environment": environment, "min_actions": 3}
+        ),
+        timeout=10,
+    )
+
+    assert r.status_code == 200
+    actions = {a["id"]: a["name"] for a in r.json()["actions"]}
+    assert actions["A1"] == "Corrected"
+    assert sorted(actions) == ["A0", "A1", "A2", "A3"]
+    assert fake_llm.calls["repair"] == 1
@@ -0,0 +1,111 @@
+import httpx
+import pytest
+
+from src.routers.environment import ENVIRONMENT_SYSTEM_PROMPT
+from src.utils import fake_llm
+from src.utils.call_llm import call_llm
+from src.utils.fake_llm import FakeProviderError
+from src.utils.retry import RETRIES, RetryPolicy, classify, retry_after, with_retry
+
+POLICY = RetryPolicy(max_attempts=3, base_delay=0.01, max_delay=0.02, deadline_seconds=5)
+
+
+@pytest.mark.parametrize(
+    "status, reason",
+    [(429, "429"), (500, "500"), (503, "503"), (529, "529"), (400, None), (401, None)],
+)
+def test_classify_by_status_code(status, reason):
+    assert classify(FakeProviderError(status)) == reason
+
+
+def test_classify_timeouts_and_connection_errors():
+    assert classify(TimeoutError()) == "timeout"
+    assert classify(ConnectionError()) == "connection"
+    assert classify(ValueError("bad schema")) is None
+
+
+def _rate_limited(retry_after_header: str) -> FakeProviderError:
+    error = FakeProviderError(429)
+    error.response = httpx.Response(429, headers={"retry-after": retry_after_header})
+    return error
+
+
+@pytest.mark.parametrize(
+    "header, expected", [("2", 2.0), ("Wed, 21 Oct 2015 07:28:00 GMT", 0.0), ("soon", None)]
+)
+def test_retry_after_header(header, expected):
+    assert retry_after(_rate_limited(header)) == expected
+
+
+def _flaky(errors: list[Exception]):
+    attempts = []
+
+    async def call() -> str:
+        attempts.append(len(attempts) + 1)
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    return call, attempts
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried():
+    call, attempts = _flaky([FakeProviderError(529), FakeProviderError(429)])
+
+    assert await with_retry(call, "environment", POLICY) == "ok"
+    assert len(attempts) == 3
+
+
+@pytest.mark.asyncio
+async def test_permanent_errors_are_not_retried():
+    call, attempts = _flaky([FakeProviderError(400)])
+
+    with pytest.raises(FakeProviderError):
+        await with_retry(call, "environment", POLICY)
+    assert len(attempts) == 1
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_after_max_attempts():
+    call, attempts = _flaky([FakeProviderError(503)] * 5)
+
+    with pytest.raises(FakeProviderError):
+        await with_retry(call, "environment", POLICY)
+    assert len(attempts) == 3
+
+
+@pytest.mark.asyncio
+async def test_malformed_retry_after_falls_back_to_backoff():
+    call, attempts = _flaky([_rate_limited("soon"), _rate_limited("")])
+
+    assert await with_retry(call, "environment", POLICY) == "ok"
+    assert len(attempts) == 3
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_at_the_deadline():
+    call, attempts = _flaky([FakeProviderError(503)] * 5)
+    policy = RetryPolicy(max_attempts=5, base_delay=1.0, max_delay=1.0, deadline_seconds=0)
+
+    with pytest.raises(FakeProviderError):
+        await with_retry(call, "environment", policy)
+    assert len(attempts) == 1
+
+
+@pytest.mark.asyncio
+async def test_call_llm_retries_a_failing_provider(monkeypatch):
+    failures = [FakeProviderError(529), FakeProviderError(529)]
+
+    def maybe_fail() -> None:
+        if failures:
+            raise failures.pop(0)
+
+    monkeypatch.setattr(fake_llm, "_maybe_fail", maybe_fail)
+    retried = RETRIES.value(stage="environment", reason="529")
+
+    text = await call_llm(ENVIRONMENT_SYSTEM_PROMPT, "Request: retry", stage="environment")
+
+    assert text
+    assert fake_llm.calls["environment"] == 1
+    assert RETRIES.value(stage="environment", reason="529") == retried + 2
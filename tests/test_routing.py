@@ -0,0 +1,85 @@
+import pytest
+
+from src.config import settings
+from src.utils.routing import Route, check_routes, current_routes, route_for, use_routes
+
+
+@pytest.fixture
+def stage_routes(monkeypatch):
+    monkeypatch.setattr(
+        settings,
+        "llm_stage_routes",
+        {"safety": {"model": "safety-model"}, "election": {"provider": "openai", "model": "o"}},
+    )
+
+
+def test_default_route(monkeypatch):
+    monkeypatch.setattr(settings, "llm_model", "default-model")
+
+    assert route_for("environment") == Route("fake", "default-model")
+
+
+def test_stage_routes_match_by_prefix(stage_routes):
+    assert route_for("safety.principles") == Route("fake", "safety-model")
+    assert route_for("election") == Route("openai", "o")
+
+
+def test_request_routes_take_precedence_and_are_restored(stage_routes):
+    with use_routes({"safety.principles": {"model": "request-model"}}):
+        assert route_for("safety.principles") == Route("fake", "request-model")
+        assert route_for("safety.risk_assessment") == Route("fake", "safety-model")
+        with use_routes({"safety": {"model": "inner-model"}}):
+            assert route_for("safety.risk_assessment") == Route("fake", "inner-model")
+        assert route_for("safety.risk_assessment") == Route("fake", "safety-model")
+
+    assert current_routes() == {}
+
+
+def test_empty_request_routes_keep_the_outer_ones():
+    with use_routes({"actions": {"model": "outer"}}), use_routes(None):
+        assert route_for("actions").model == "outer"
+
+
+@pytest.mark.parametrize(
+    "setting, value, message",
+    [
+        ("llm_stage_routes", {"safety": {"provider": "fake"}}, "must set a model"),
+        ("llm_stage_routes", {"safety": {"provider": "x", "model": "m"}}, "unsupported"),
+        ("llm_hedge_stages", {"actions": {"provider": "x"}}, "unsupported"),
+        ("llm_failover_chain", [{"provider": "openai"}], "must set a provider and a model"),
+        ("llm_failover_chain", [{"provider": "x", "model": "m"}], "unsupported"),
+    ],
+)
+def test_check_routes_rejects_bad_entries(monkeypatch, setting, value, message):
+    monkeypatch.setattr(settings, setting, value)
+
+    with pytest.raises(ValueError, match=message):
+        check_routes()
+
+
+@pytest.mark.asyncio
+async def test_requests_cannot_route_to_unconfigured_providers(client):
+    for provider in ("openai", "anthropic"):
+        r = await client.post(
+            "/api/v1/environment",
+            json={
+                "request": "Reduce customer churn",
+                "routes": {"environment": {"provider": provider, "model": "m"}},
+            },
+        )
+
+        assert r.status_code == 422
+        assert "not configured" in r.text
+
+
+@pytest.mark.asyncio
+async def test_requests_can_route_to_configured_providers(client):
+    r = await client.post(
+        "/api/v1/environment",
+        json={
+            "request": "Reduce customer churn",
+            "routes": {"environment": {"provider": "fake", "model": "other"}},
+        },
+    )
+
+    assert r.status_code == 200
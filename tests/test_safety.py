@@ -0,0 +1,97 @@
+import pytest
+import pytest_asyncio
+
+from src.routers import safety
+from src.utils import fake_llm
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def safety_request(client) -> dict:
+    environment = (
+        await client.post("/api/v1/environment", json={"request": "Reduce customer churn"})
+    ).json()
+    actions = (
+        await client.post(
+            "/api/v1/actions",
+            json={"environment": environment, "min_actions": 3, "include_null": False},
+        )
+    ).json()["actions"]
+    fake_llm.reset_calls()
+    return {"environment": environment, "actions": actions, "auto_improve": False}
+
+
+@pytest.mark.asyncio
+async def test_fast_mode_makes_one_call_per_action(client, safety_request):
+    r = await client.post("/api/v1/safety", json={**safety_request, "mode": "fast"})
+
+    assert r.status_code == 200
+    assert [e["action_id"] for e in r.json()] == ["A1", "A2", "A3"]
+    assert dict(fake_llm.calls) == {"safety.fast": 3}
+
+
+@pytest.mark.asyncio
+async def test_fast_mode_keeps_the_requested_action_id(client, safety_request, monkeypatch):
+    evaluation = fake_llm._fast_evaluation
+    monkeypatch.setattr(
+        fake_llm,
+        "_fast_evaluation",
+        lambda user_prompt, rng: {**evaluation(user_prompt, rng), "action_id": "A9"},
+    )
+    fake_llm._handlers.cache_clear()
+
+    r = await client.post("/api/v1/safety", json={**safety_request, "mode": "fast"})
+    fake_llm._handlers.cache_clear()
+
+    assert [e["action_id"] for e in r.json()] == ["A1", "A2", "A3"]
+
+
+@pytest.mark.asyncio
+async def test_thorough_mode_makes_four_calls_per_action(client, safety_request):
+    r = await client.post("/api/v1/safety", json=safety_request)
+
+    assert r.status_code == 200
+    assert dict(fake_llm.calls) == {
+        "safety.stakeholder_impacts": 3,
+        "safety.risk_assessment": 3,
+        "safety.principles": 3,
+        "safety.synthesis": 3,
+    }
+
+
+@pytest.mark.asyncio
+async def test_batched_mode_makes_one_call_per_sub_step(client, safety_request):
+    r = await client.post(
+        "/api/v1/safety", json={**safety_request, "mode": "batched", "auto_improve": True}
+    )
+
+    assert r.status_code == 200
+    assert [e["action_id"] for e in r.json()] == ["A1", "A2", "A3"]
+    assert dict(fake_llm.calls) == {
+        "safety.batch.improve": 1,
+        "safety.batch.stakeholder_impacts": 1,
+        "safety.batch.risk_assessment": 1,
+        "safety.batch.principles": 1,
+        "safety.batch.synthesis": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_actions_missing_from_a_batch_are_run_on_their_own(
+    client, safety_request, monkeypatch
+):
+    prompt = safety.BATCHED_RISK_ASSESSMENT_SYSTEM_PROMPT
+    name, risks = fake_llm._handlers()[prompt]
+
+    def without_a2(user_prompt, rng):
+        answer = risks(user_prompt, rng)
+        del answer["A2"]
+        return answer
+
+    monkeypatch.setitem(fake_llm._handlers(), prompt, (name, without_a2))
+
+    r = await client.post("/api/v1/safety", json={**safety_request, "mode": "batched"})
+
+    assert r.status_code == 200
+    assert [e["action_id"] for e in r.json()] == ["A1", "A2", "A3"]
+    assert fake_llm.calls["safety.batch.risk_assessment"] == 1
+    assert fake_llm.calls["safety.risk_assessment"] == 1
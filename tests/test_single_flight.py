@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from src.config import settings
+from src.utils import fake_llm
+from src.utils.single_flight import FlightStore
+
+
+@pytest.fixture
+def slow_llm(monkeypatch):
+    monkeypatch.setattr(settings, "fake_llm_latency_ms", 100.0)
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_in_flight_share_one_run(client, slow_llm):
+    body = {"request": "Reduce customer churn"}
+
+    first, second = await asyncio.gather(
+        client.post("/api/v1/environment", json=body),
+        client.post("/api/v1/environment", json=body),
+    )
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert fake_llm.calls["environment"] == 1
+
+
+@pytest.mark.asyncio
+async def test_request_after_the_run_finished_runs_afresh(client, slow_llm):
+    body = {"request": "Reduce customer churn", "no_cache": True}
+
+    await client.post("/api/v1/environment", json=body)
+    await client.post("/api/v1/environment", json=body)
+
+    assert fake_llm.calls["environment"] == 2
+
+
+@pytest.mark.asyncio
+async def test_different_requests_do_not_share(client, slow_llm):
+    await asyncio.gather(
+        client.post("/api/v1/environment", json={"request": "Reduce customer churn"}),
+        client.post("/api/v1/environment", json={"request": "Open a second office"}),
+    )
+
+    assert fake_llm.calls["environment"] == 2
+
+
+def test_store_hands_results_only_to_waiting_workers(tmp_path):
+    store = FlightStore(str(tmp_path / "flights.sqlite3"), lease_seconds=30, result_ttl_seconds=5)
+
+    assert store.claim("key", "leader") == "leader"
+    assert store.claim("key", "waiter") == "leader"
+    assert store.poll("key", "leader") == ("running", None)
+
+    store.finish("key", "leader", "succeeded", '{"ok": true}')
+
+    assert store.poll("key", "leader") == ("succeeded", '{"ok": true}')
+    assert store.claim("key", "late") == "late"
+
+
+def test_store_lets_a_waiter_take_over_an_abandoned_flight(tmp_path):
+    store = FlightStore(str(tmp_path / "flights.sqlite3"), lease_seconds=30, result_ttl_seconds=5)
+    store.claim("key", "leader")
+
+    store.abandon("key", "leader")
+
+    assert store.poll("key", "leader") == ("gone", None)
+    assert store.claim("key", "waiter") == "waiter"
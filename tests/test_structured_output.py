@@ -0,0 +1,45 @@
+import pytest
+from pydantic import TypeAdapter
+
+from src.models.actions import Action
+from src.utils.structured_output import (
+    WRAPPER_KEY,
+    extract_json,
+    load_response,
+    response_schema,
+)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '{"a": [1, 2]}',
+        '```json\n{"a": [1, 2]}\n```',
+        'Here is the result:\n{"a": [1, 2]}\nHope this helps.',
+        '{"a": [1, 2,],}',
+        '```\n{"a": [1, 2],}\n```',
+    ],
+)
+def test_extract_json_tolerates_fences_prose_and_trailing_commas(text):
+    assert extract_json(text) == {"a": [1, 2]}
+
+
+def test_extract_json_without_json_raises():
+    with pytest.raises(ValueError):
+        extract_json("I cannot help with that.")
+
+
+def test_non_object_responses_are_wrapped():
+    schema, wrapped = response_schema(TypeAdapter(list[Action]))
+
+    assert wrapped
+    assert schema["required"] == [WRAPPER_KEY]
+    assert load_response('{"result": [1]}', wrapped) == [1]
+    assert load_response("[1]", wrapped) == [1]
+
+
+def test_object_responses_are_not_wrapped():
+    schema, wrapped = response_schema(TypeAdapter(Action))
+
+    assert not wrapped
+    assert "$ref" not in str(schema)
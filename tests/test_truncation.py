@@ -0,0 +1,69 @@
+import pytest
+
+from src.config import settings
+from src.routers.environment import ENVIRONMENT_SYSTEM_PROMPT
+from src.utils import fake_llm
+from src.utils.call_llm import TRUNCATIONS, call_llm, larger_budget
+from src.utils.llm_providers import OutputTruncatedError
+
+
+@pytest.fixture
+def small_budgets(monkeypatch):
+    monkeypatch.setattr(
+        settings,
+        "llm_stage_output_tokens",
+        {**settings.llm_stage_output_tokens, "environment": 50, "actions": 150},
+    )
+
+
+def test_budget_doubles_up_to_the_ceiling(monkeypatch):
+    monkeypatch.setattr(settings, "llm_max_output_tokens_ceiling", 1000)
+
+    assert larger_budget("actions", 300) == 600
+    assert larger_budget("actions", 600) == 1000
+    assert larger_budget("actions", 1000) is None
+
+
+@pytest.mark.asyncio
+async def test_truncated_call_is_retried_with_a_larger_budget(small_budgets):
+    truncations = TRUNCATIONS.value(stage="environment")
+
+    text = await call_llm(ENVIRONMENT_SYSTEM_PROMPT, "Request: budget", stage="environment")
+
+    assert text.endswith("}")
+    assert TRUNCATIONS.value(stage="environment") > truncations
+
+
+@pytest.mark.asyncio
+async def test_call_truncated_at_the_ceiling_raises(small_budgets, monkeypatch):
+    monkeypatch.setattr(settings, "llm_max_output_tokens_ceiling", 50)
+
+    with pytest.raises(OutputTruncatedError):
+        await call_llm(ENVIRONMENT_SYSTEM_PROMPT, "Request: budget", stage="environment")
+
+
+@pytest.mark.asyncio
+async def test_truncated_action_stream_is_streamed_again(client, small_budgets):
+    r = await client.post(
+        "/api/v1/ease", json={"request": "Reduce customer churn", "min_actions": 5}
+    )
+
+    assert r.status_code == 200
+    assert [a["id"] for a in r.json()["actions"]] == ["A1", "A2", "A3", "A4", "A5", "A0"]
+    assert fake_llm.calls["actions"] > 1
+
+
+@pytest.mark.asyncio
+async def test_action_stream_truncated_at_the_ceiling_is_a_502(
+    client, small_budgets, monkeypatch
+):
+    monkeypatch.setattr(settings, "llm_max_output_tokens_ceiling", 300)
+    environment = (
+        await client.post("/api/v1/environment", json={"request": "Reduce customer churn"})
+    ).json()
+
+    r = await client.post(
+        "/api/v1/actions", json={"environment": environment, "min_actions": 5}
+    )
+
+    assert r.status_code == 502